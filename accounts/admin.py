@@ -1,5 +1,148 @@
 from django.contrib import admin
-from .models import Category, Product
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Avg, Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
 
-admin.site.register(Category)
-admin.site.register(Product)
\ No newline at end of file
+from .changes import record_changes
+from .models import Category, Enquiry, Product, ProductReview, Promotion, Store
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for big tables: an unfiltered changelist gets its row count
+    from a cheap estimate instead of COUNT(*) over the whole table. Filtered
+    or searched lists, and tables below EXACT_BELOW rows, are counted exactly.
+    """
+    EXACT_BELOW = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimate_row_count(self.object_list.model, self.object_list.db)
+            if estimate is not None and estimate >= self.EXACT_BELOW:
+                return estimate
+        return super().count
+
+
+def estimate_row_count(model, using='default'):
+    """Planner statistics on PostgreSQL; MAX(rowid), an index lookup, on SQLite."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+        else:
+            return None
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Skip the second COUNT(*) behind "N results (M total)" on filtered lists.
+    show_full_result_count = False
+    list_per_page = 50
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ['name', 'product_count']
+    search_fields = ['name']
+    ordering = ['name']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(num_products=Count('product'))
+
+    @admin.display(description='Products', ordering='num_products')
+    def product_count(self, obj):
+        return obj.num_products
+
+
+@admin.register(Product)
+class ProductAdmin(LargeTableAdmin):
+    list_display = ['name', 'category', 'price', 'is_available', 'rating', 'reviews']
+    list_select_related = ['category']
+    list_filter = ['is_available', 'category']
+    search_fields = ['name']
+    autocomplete_fields = ['category']
+    ordering = ['-id']
+
+    def get_queryset(self, request):
+        # Correlated subqueries are evaluated for the rows on the page only;
+        # a JOIN + GROUP BY would aggregate every review before paginating.
+        reviews = ProductReview.objects.filter(product=OuterRef('pk')).order_by().values('product')
+        return super().get_queryset(request).annotate(
+            avg_rating=Subquery(reviews.annotate(avg=Avg('rating')).values('avg')),
+            num_reviews=Coalesce(
+                Subquery(reviews.annotate(n=Count('pk')).values('n'), output_field=IntegerField()), 0
+            ),
+        )
+
+    @admin.display(description='Rating', ordering='avg_rating')
+    def rating(self, obj):
+        return f'{obj.avg_rating:.1f}' if obj.avg_rating is not None else '-'
+
+    @admin.display(description='Reviews', ordering='num_reviews')
+    def reviews(self, obj):
+        return obj.num_reviews
+
+
+@admin.register(ProductReview)
+class ProductReviewAdmin(LargeTableAdmin):
+    list_display = ['product', 'user', 'rating', 'created_at']
+    list_select_related = ['product', 'user']
+    list_filter = ['rating', 'created_at']
+    search_fields = ['product__name', 'user__username']
+    autocomplete_fields = ['product', 'user']
+
+    # Reviews have no post_delete receiver (see accounts/signals.py), so the
+    # admin logs its deletes for the change feed itself.
+    def delete_model(self, request, obj):
+        pk = obj.pk
+        super().delete_model(request, obj)
+        record_changes(ProductReview, [pk], deleted=True)
+
+    def delete_queryset(self, request, queryset):
+        ids = list(queryset.values_list('pk', flat=True))
+        super().delete_queryset(request, queryset)
+        record_changes(ProductReview, ids, deleted=True)
+
+
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+    list_display = ['name', 'kind', 'percent_off', 'bundle_quantity', 'bundle_price', 'starts_at', 'ends_at', 'is_active']
+    list_filter = ['kind', 'is_active']
+    search_fields = ['name']
+    autocomplete_fields = ['products', 'categories']
+
+
+@admin.register(Store)
+class StoreAdmin(admin.ModelAdmin):
+    list_display = ['name', 'address', 'phone', 'latitude', 'longitude', 'is_active']
+    list_filter = ['is_active']
+    search_fields = ['name', 'address']
+    autocomplete_fields = ['unavailable_products']
+
+
+@admin.register(Enquiry)
+class EnquiryAdmin(LargeTableAdmin):
+    """The staff inbox; the enquiry digest links to each enquiry here."""
+    list_display = ['name', 'email', 'inquiry_type', 'created_at', 'has_photo', 'is_resolved']
+    list_filter = ['is_resolved', 'inquiry_type', 'created_at']
+    search_fields = ['email', 'name', 'message']
+    date_hierarchy = 'created_at'
+    readonly_fields = ['created_at', 'confirmation_sent_at', 'confirmation_attempts', 'confirmation_error', 'notified_at']
+    actions = ['mark_resolved']
+
+    @admin.display(description='Photo', boolean=True)
+    def has_photo(self, obj):
+        return bool(obj.photo)
+
+    @admin.action(description='Mark selected enquiries as resolved')
+    def mark_resolved(self, request, queryset):
+        queryset.update(is_resolved=True)
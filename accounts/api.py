@@ -0,0 +1,307 @@
+# accounts/api.py
+"""
+Read-only JSON catalog API (/api/v1/...) for mobile clients and partner
+integrations.
+
+- ?fields=id,name,price returns only those fields (and only selects those
+  columns); rating/review_count are computed only when asked for.
+- Lists are keyset-paginated on id: follow `next` (?after=<last id>), which
+  stays fast at any depth, unlike OFFSET.
+- Rows are read with values_list(), so no model instances are built, and
+  serialised with orjson when it is installed.
+- /api/v1/changes/ is a feed of what changed after a cursor, with
+  deletions as tombstones, so clients sync deltas instead of rescanning.
+- Every response carries the catalog version as its ETag: a client that
+  sends it back in If-None-Match gets a 304 until something changes, and
+  the body of a repeated request comes from the cache.
+- /api/v1/stores/nearest/ answers from an in-memory spatial index
+  (accounts/stores.py) and is versioned by the stores instead.
+"""
+import functools
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Avg, Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
+
+from .catalog import CATALOG_CACHE_TIMEOUT, catalog_key, catalog_version
+from .changes import MODELS, CursorExpired, changes_since, latest_cursor
+from .models import Category, Product, ProductReview
+from .stores import store_index, stores_version
+
+try:
+    import orjson
+except ImportError:  # optional; dumps() gives the same bytes without it, slower
+    orjson = None
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+MAX_STORES = 50
+
+_reviews = ProductReview.objects.filter(product=OuterRef('pk')).order_by().values('product')
+
+# Public field name -> column (or expression) for values_list(), and the
+# fields a request without ?fields= gets.
+RESOURCES = {
+    'categories': {
+        'fields': {'id': 'id', 'name': 'name', 'updated_at': 'updated_at'},
+        'default': ['id', 'name', 'updated_at'],
+    },
+    'products': {
+        'fields': {
+            'id': 'id', 'name': 'name', 'category': 'category_id', 'price': 'price',
+            'description': 'description', 'image': 'image', 'is_available': 'is_available',
+            'updated_at': 'updated_at',
+            # correlated subqueries: evaluated for the rows on the page only
+            'rating': Subquery(_reviews.annotate(avg=Avg('rating')).values('avg')),
+            'review_count': Coalesce(
+                Subquery(_reviews.annotate(n=Count('pk')).values('n'), output_field=IntegerField()), 0
+            ),
+        },
+        'default': ['id', 'name', 'category', 'price', 'description', 'image', 'is_available', 'updated_at'],
+    },
+    'reviews': {
+        'fields': {
+            'id': 'id', 'product': 'product_id', 'rating': 'rating', 'comment': 'comment',
+            'photo': 'photo', 'created_at': 'created_at', 'updated_at': 'updated_at',
+        },
+        'default': ['id', 'product', 'rating', 'comment', 'photo', 'created_at', 'updated_at'],
+    },
+}
+# Change log kinds (accounts/changes.py) and the resource their rows are read as.
+CHANGE_RESOURCES = {'category': 'categories', 'product': 'products', 'review': 'reviews'}
+# Stored file names, returned as URLs.
+FILE_FIELDS = {'image', 'photo'}
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+_encoder = DjangoJSONEncoder()
+
+
+def dumps(data):
+    # orjson hands datetimes, Decimals and the like to DjangoJSONEncoder, so
+    # both paths write e.g. "2024-05-01T09:30:00.123Z" (milliseconds, Z).
+    if orjson is not None:
+        return orjson.dumps(data, default=_encoder.default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def json_response(body, status=200):
+    response = HttpResponse(body, content_type='application/json', status=status)
+    # Always revalidate; the ETag makes that a 304 with no body.
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def catalog_etag(request, *args, **kwargs):
+    return f'catalog-{catalog_version()}'
+
+
+def parse_fields(request, resource):
+    available = RESOURCES[resource]['fields']
+    requested = request.GET.get('fields')
+    names = [name.strip() for name in requested.split(',') if name.strip()] if requested else []
+    names = list(dict.fromkeys(names)) or RESOURCES[resource]['default']
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ApiError(f"Unknown field(s) {', '.join(unknown)}; choose from {', '.join(available)}")
+    return names, [available[name] for name in names]
+
+
+def parse_int(request, name, default=None, minimum=0):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ApiError(f'{name} must be a whole number')
+    if number < minimum:
+        raise ApiError(f'{name} must be at least {minimum}')
+    return number
+
+
+def parse_float(request, name, minimum, maximum):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        raise ApiError(f'{name} is required')
+    try:
+        number = float(value)
+    except ValueError:
+        raise ApiError(f'{name} must be a number')
+    if not minimum <= number <= maximum:
+        raise ApiError(f'{name} must be between {minimum} and {maximum}')
+    return number
+
+
+def serialise(names, rows):
+    files = [i for i, name in enumerate(names) if name in FILE_FIELDS]
+    data = []
+    for row in rows:
+        if files:
+            row = list(row)
+            for i in files:
+                row[i] = default_storage.url(row[i]) if row[i] else None
+        data.append(dict(zip(names, row)))
+    return data
+
+
+def keyset_page(request, resource, queryset):
+    """One page of `queryset` ordered by id, starting after ?after=."""
+    names, columns = parse_fields(request, resource)
+    limit = min(parse_int(request, 'limit', PAGE_SIZE, minimum=1), MAX_PAGE_SIZE)
+    after = parse_int(request, 'after')
+    if after is not None:
+        queryset = queryset.filter(pk__gt=after)
+    # `id` is always selected for the cursor, even when not asked for.
+    rows = list(queryset.order_by('pk').values_list('pk', *columns)[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    next_url = None
+    if more:
+        params = request.GET.copy()
+        params['after'] = rows[-1][0]
+        next_url = f'{request.path}?{params.urlencode()}'
+    return {'data': serialise(names, (row[1:] for row in rows)), 'next': next_url}
+
+
+def cached_api_view(build):
+    """
+    GET/HEAD view returning build(request, ...) as JSON, with the catalog
+    version as ETag and the encoded body cached per URL and version.
+    """
+    @functools.wraps(build)
+    @require_safe
+    @condition(etag_func=catalog_etag)
+    def view(request, *args, **kwargs):
+        digest = hashlib.sha1(request.get_full_path().encode()).hexdigest()
+        key = catalog_key(f'api:{digest}')
+        body = cache.get(key)
+        if body is None:
+            try:
+                body = dumps(build(request, *args, **kwargs))
+            except ApiError as e:
+                return json_response(dumps({'error': str(e)}), status=e.status)
+            cache.set(key, body, CATALOG_CACHE_TIMEOUT)
+        return json_response(body)
+    return view
+
+
+# ===== ENDPOINTS =====
+@cached_api_view
+def categories(request):
+    """GET /api/v1/categories/"""
+    return keyset_page(request, 'categories', Category.objects.all())
+
+
+@cached_api_view
+def products(request):
+    """GET /api/v1/products/?category=<id>&available=true|false"""
+    queryset = Product.objects.all()
+    category = parse_int(request, 'category')
+    if category is not None:
+        queryset = queryset.filter(category_id=category)
+    available = request.GET.get('available')
+    if available:
+        if available not in ('true', 'false'):
+            raise ApiError('available must be true or false')
+        queryset = queryset.filter(is_available=available == 'true')
+    return keyset_page(request, 'products', queryset)
+
+
+@cached_api_view
+def product(request, product_id):
+    """GET /api/v1/products/<id>/"""
+    names, columns = parse_fields(request, 'products')
+    row = Product.objects.filter(pk=product_id).values_list(*columns).first()
+    if row is None:
+        raise ApiError('Product not found', status=404)
+    return {'data': serialise(names, [row])[0]}
+
+
+@cached_api_view
+def product_reviews(request, product_id):
+    """GET /api/v1/products/<id>/reviews/"""
+    queryset = ProductReview.objects.filter(product_id=product_id)
+    return keyset_page(request, 'reviews', queryset)
+
+
+@cached_api_view
+def changes(request):
+    """
+    GET /api/v1/changes/?since=<cursor>
+
+    Objects saved or deleted after `since`, oldest first, each once with
+    its current fields or as a tombstone ({"deleted": true}). Store the
+    returned cursor and pass it next time. To start syncing, take
+    ?since=latest, then fetch the full lists; replaying a change that
+    already made it into a list is harmless.
+    """
+    if request.GET.get('since') == 'latest':
+        return {'data': [], 'cursor': latest_cursor(), 'next': None}
+    since = parse_int(request, 'since', 0)
+    limit = min(parse_int(request, 'limit', PAGE_SIZE, minimum=1), MAX_PAGE_SIZE)
+    try:
+        objects, cursor, more = changes_since(since, limit)
+    except CursorExpired:
+        raise ApiError('Changes after this cursor are no longer kept; fetch the full catalog again', status=410)
+
+    current = {}
+    for kind in {kind for kind, _ in objects}:
+        resource = CHANGE_RESOURCES[kind]
+        names = RESOURCES[resource]['default']
+        columns = [RESOURCES[resource]['fields'][name] for name in names]
+        ids = [object_id for k, object_id in objects if k == kind]
+        rows = list(MODELS[kind].objects.filter(pk__in=ids).values_list('pk', *columns))
+        for row, data in zip(rows, serialise(names, (row[1:] for row in rows))):
+            current[kind, row[0]] = data
+
+    data = []
+    for kind, object_id in objects:
+        # Whatever the last log entry says, the row's presence decides.
+        if (kind, object_id) in current:
+            data.append({'type': kind, 'id': object_id, 'deleted': False, 'data': current[kind, object_id]})
+        else:
+            data.append({'type': kind, 'id': object_id, 'deleted': True})
+    next_url = None
+    if more:
+        params = request.GET.copy()
+        params['since'] = cursor
+        next_url = f'{request.path}?{params.urlencode()}'
+    return {'data': data, 'cursor': cursor, 'next': next_url}
+
+
+def stores_etag(request, *args, **kwargs):
+    return f'stores-{stores_version()}'
+
+
+@require_safe
+@condition(etag_func=stores_etag)
+def nearest_stores(request):
+    """
+    GET /api/v1/stores/nearest/?lat=<latitude>&lon=<longitude>&limit=5&product=<id>
+
+    The nearest active stores, nearest first, with their distance in km.
+    With ?product=, only stores that sell that product.
+    """
+    try:
+        latitude = parse_float(request, 'lat', -90, 90)
+        longitude = parse_float(request, 'lon', -180, 180)
+        limit = min(parse_int(request, 'limit', 5, minimum=1), MAX_STORES)
+        product_id = parse_int(request, 'product')
+    except ApiError as e:
+        return json_response(dumps({'error': str(e)}), status=e.status)
+    found = store_index().nearest(latitude, longitude, limit, product=product_id)
+    data = [{**store, 'distance_km': round(distance, 2)} for store, distance in found]
+    return json_response(dumps({'data': data}))
@@ -0,0 +1,305 @@
+# accounts/assets.py
+"""
+Concatenate and minify the CSS/JS bundles listed in settings.ASSET_BUNDLES,
+and extract each CSS bundle's critical rules for inlining (see
+critical_css below).
+"""
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+BUNDLE_DIR = 'bundles'
+BASE_TEMPLATE = 'base.html'
+
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+CSS_STRING_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'')
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+CSS_BUNDLE_TAG_RE = re.compile(r'{%\s*css_bundle\s+[\'"]([\w-]+)[\'"]\s*%}')
+INCLUDE_TAG_RE = re.compile(r'{%\s*include\s+[\'"]([^\'"]+)[\'"]')
+TEMPLATE_TAG_RE = re.compile(r'{%.*?%}|{#.*?#}', re.S)
+TEMPLATE_VAR_RE = re.compile(r'{{.*?}}', re.S)
+CLASS_ATTR_RE = re.compile(r'\bclass(?:Name)?\s*=\s*([\'"`])(.*?)\1', re.S)
+ID_ATTR_RE = re.compile(r'\bid\s*=\s*([\'"`])(.*?)\1', re.S)
+CLASS_LIST_RE = re.compile(r'classList\.(?:add|remove|toggle|replace|contains)\(([^)]*)\)')
+QUOTED_RE = re.compile(r'([\'"`])([\w-]+)\1')
+SELECTOR_NAME_RE = re.compile(r'([.#])(-?[_a-zA-Z][\w-]*)')
+# States that only exist after the visitor does something.
+INTERACTION_RE = re.compile(r':(?:hover|focus|focus-within|focus-visible|active|visited)\b')
+
+
+def bundle_path(name, kind):
+    return f'{BUNDLE_DIR}/{name}.{kind}'
+
+
+def critical_path(name):
+    return f'{BUNDLE_DIR}/{name}.critical.css'
+
+
+def bundle_sources(name, kind):
+    return settings.ASSET_BUNDLES.get(name, {}).get(kind, [])
+
+
+# ===== MINIFIERS =====
+def minify_css(css):
+    """Strip comments and whitespace; quoted strings are otherwise left untouched."""
+    strings = []
+
+    def stash(match):
+        strings.append(match.group(0))
+        return f'"\x00{len(strings) - 1}\x00"'
+
+    # Comments go first: they may contain apostrophes ("don't") that would
+    # otherwise be taken for the start of a string.
+    css = CSS_COMMENT_RE.sub('', css)
+    css = CSS_STRING_RE.sub(stash, css)
+    css = re.sub(r'\s+', ' ', css)
+    # A space before ':' is significant in selectors ("a :hover"), so only
+    # the punctuation that can never need it is tightened.
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    css = css.replace(';}', '}').strip()
+    return re.sub(r'"\x00(\d+)\x00"', lambda m: strings[int(m.group(1))], css)
+
+
+def minify_js(js):
+    """
+    Conservative JS minifier: drops comments and indentation and collapses
+    blank lines, but keeps one newline wherever there was one so automatic
+    semicolon insertion behaves exactly as in the source.
+    """
+    out = []
+    i, n = 0, len(js)
+    pending_space = pending_newline = False
+    last = ''
+
+    def is_word(ch):
+        return ch.isalnum() or ch in '_$'
+
+    while i < n:
+        ch = js[i]
+        nxt = js[i + 1] if i + 1 < n else ''
+        if ch in ' \t\r\n':
+            if ch == '\n':
+                pending_newline = True
+            else:
+                pending_space = True
+            i += 1
+            continue
+        if ch == '/' and nxt == '/':
+            end = js.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        if ch == '/' and nxt == '*':
+            end = js.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            pending_space = True
+            continue
+
+        if pending_newline and out:
+            out.append('\n')
+        elif pending_space and out and is_word(last) and is_word(ch):
+            out.append(' ')
+        elif pending_space and out and last in '+-' and ch == last:
+            out.append(' ')  # keep "a + +b" from becoming "a++b"
+        pending_space = pending_newline = False
+
+        if ch in '"\'`':
+            start = i
+            i += 1
+            while i < n and js[i] != ch:
+                i += 2 if js[i] == '\\' else 1
+            i += 1
+            out.append(js[start:i])
+            last = ch
+            continue
+        if ch == '/' and (not last or last in '(,=:[!&|?{};\n+-*%<>~^'):
+            # Regular expression literal: copy through to the closing slash.
+            start = i
+            i += 1
+            in_class = False
+            while i < n and (js[i] != '/' or in_class):
+                if js[i] == '\\':
+                    i += 1
+                elif js[i] == '[':
+                    in_class = True
+                elif js[i] == ']':
+                    in_class = False
+                i += 1
+            i += 1
+            while i < n and js[i].isalpha():
+                i += 1
+            out.append(js[start:i])
+            last = '/'
+            continue
+
+        out.append(ch)
+        last = ch
+        i += 1
+    return ''.join(out).strip() + '\n'
+
+
+def _rebase_css_urls(css, source, target):
+    """Rewrite relative url() references in `source` so they work from `target`."""
+    source_dir = posixpath.dirname(source)
+    target_dir = posixpath.dirname(target)
+
+    def rebase(match):
+        quote, ref = match.groups()
+        if ref.startswith(('/', '#', 'data:', 'http:', 'https:')):
+            return match.group(0)
+        resolved = posixpath.normpath(posixpath.join(source_dir, ref))
+        return f'url({quote}{posixpath.relpath(resolved, target_dir or ".")}{quote})'
+
+    return CSS_URL_RE.sub(rebase, css)
+
+
+# ===== CRITICAL CSS =====
+# A page's critical CSS is inlined in its <head> so it can paint before any
+# stylesheet arrives; the full bundle then loads without blocking. It keeps
+# the bundle's rules whose classes and ids all occur in the page's
+# templates (base.html, the templates rendering the bundle and whatever
+# they include) or are toggled by the site scripts, like the .active tab.
+# Hover and focus states and @keyframes are left to the full bundle, which
+# repeats every rule in the same order, so the cascade ends up as before.
+def _markup_names(text):
+    """{('.', class), ('#', id)} used in template or script source."""
+    text = TEMPLATE_VAR_RE.sub('\x00', TEMPLATE_TAG_RE.sub(' ', text))
+    names = set()
+    for prefix, regex in (('.', CLASS_ATTR_RE), ('#', ID_ATTR_RE)):
+        for _, value in regex.findall(text):
+            names.update((prefix, token) for token in value.split() if '\x00' not in token and '$' not in token)
+    for args in CLASS_LIST_RE.findall(text):
+        names.update(('.', token) for _, token in QUOTED_RE.findall(args))
+    return names
+
+
+def _split_top_level(text, separator):
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        if ch in '([':
+            depth += 1
+        elif ch in ')]':
+            depth -= 1
+        elif ch == separator and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _css_blocks(css):
+    """(prelude, body) for each top-level rule of minified CSS; body is None for @import and the like."""
+    i, n = 0, len(css)
+    while i < n:
+        brace = css.find('{', i)
+        semicolon = css.find(';', i)
+        if brace == -1:
+            break
+        if css[i:].lstrip().startswith('@') and -1 < semicolon < brace:
+            yield css[i:semicolon].strip(), None
+            i = semicolon + 1
+            continue
+        depth, j = 1, brace + 1
+        while j < n and depth:
+            depth += {'{': 1, '}': -1}.get(css[j], 0)
+            j += 1
+        yield css[i:brace].strip(), css[brace + 1:j - 1]
+        i = j
+
+
+def selector_is_critical(selector, names):
+    if INTERACTION_RE.search(selector):
+        return False
+    return all(name in names for name in SELECTOR_NAME_RE.findall(selector))
+
+
+def critical_css(css, names):
+    """The rules of minified `css` that can apply to markup using `names` before any interaction."""
+    out = []
+    for prelude, body in _css_blocks(css):
+        if body is None:
+            out.append(f'{prelude};')
+        elif prelude.startswith(('@media', '@supports')):
+            inner = critical_css(body, names)
+            if inner:
+                out.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@font-face'):
+            out.append(f'{prelude}{{{body}}}')
+        elif not prelude.startswith('@'):  # @keyframes can wait
+            selectors = [s for s in _split_top_level(prelude, ',') if selector_is_critical(s, names)]
+            if selectors:
+                out.append(f"{','.join(selectors)}{{{body}}}")
+    return ''.join(out)
+
+
+def bundle_markup(storage):
+    """{css bundle name: names used by the templates that render it, base.html and the scripts}."""
+    from .warmup import project_template_names, template_root
+
+    sources = {}
+    for name in project_template_names():
+        sources[name] = (template_root() / name).read_text(encoding='utf-8')
+    shared = _markup_names(sources.get(BASE_TEMPLATE, ''))
+    for kinds in settings.ASSET_BUNDLES.values():
+        for source in kinds.get('js', []):
+            with storage.open(source) as fh:
+                shared |= _markup_names(fh.read().decode('utf-8'))
+    def template_names(name, seen):
+        seen.add(name)
+        source = sources.get(name, '')
+        names = _markup_names(source)
+        for included in INCLUDE_TAG_RE.findall(source):
+            if included not in seen:
+                names |= template_names(included, seen)
+        return names
+
+    markup = {}
+    for name, source in sources.items():
+        for bundle in set(CSS_BUNDLE_TAG_RE.findall(source)):
+            markup.setdefault(bundle, set(shared))
+            if name != BASE_TEMPLATE:
+                markup[bundle] |= template_names(name, set())
+    return markup
+
+
+# ===== BUILD =====
+def build_bundle(storage, name, kind):
+    """Write one minified bundle into `storage` and return its path."""
+    target = bundle_path(name, kind)
+    parts = []
+    for source in bundle_sources(name, kind):
+        with storage.open(source) as fh:
+            text = fh.read().decode('utf-8')
+        if kind == 'css':
+            parts.append(minify_css(_rebase_css_urls(text, source, target)))
+        else:
+            # Each script keeps its own statement boundary when concatenated.
+            parts.append(minify_js(text).rstrip('\n') + ';')
+    if storage.exists(target):
+        storage.delete(target)
+    storage.save(target, ContentFile('\n'.join(parts).encode('utf-8')))
+    return target
+
+
+def build_critical(storage, name, names):
+    with storage.open(bundle_path(name, 'css')) as fh:
+        css = fh.read().decode('utf-8')
+    target = critical_path(name)
+    if storage.exists(target):
+        storage.delete(target)
+    storage.save(target, ContentFile(critical_css(css, names).encode('utf-8')))
+    return target
+
+
+def build_bundles(storage):
+    built = []
+    for name, kinds in settings.ASSET_BUNDLES.items():
+        for kind in kinds:
+            built.append(build_bundle(storage, name, kind))
+    markup = bundle_markup(storage)
+    for name, kinds in settings.ASSET_BUNDLES.items():
+        if 'css' in kinds and name in markup:
+            built.append(build_critical(storage, name, markup[name]))
+    return built
@@ -0,0 +1,378 @@
+# accounts/benchmark.py
+"""Seeded datasets and view timings used by the benchmark commands."""
+import json
+import platform
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from .catalog import schedule_catalog_bump
+from .changes import record_changes
+from .models import Category, Product, ProductReview
+
+# Everything the seeder creates carries these prefixes so it can be cleared
+# again without touching real catalog data.
+SEED_CATEGORY_PREFIX = 'Bench '
+SEED_USER_PREFIX = 'bench_user_'
+SEED_IMAGE = 'products/bench.jpg'
+BATCH_SIZE = 5000
+
+ADJECTIVES = ['Classic', 'Honey', 'Matcha', 'Butter', 'Choco', 'Almond', 'Berry', 'Sesame', 'Maple', 'Yuzu']
+NOUNS = ['Croissant', 'Melon Pan', 'Shokupan', 'Tart', 'Roll', 'Cake', 'Bagel', 'Danish', 'Scone', 'Cookie']
+COMMENTS = [
+    'Lovely texture, will buy again.',
+    'A bit too sweet for me.',
+    'Fresh and fluffy, perfect with coffee.',
+    'Good value for the price.',
+    'My kids loved it!',
+]
+
+
+# ===== SEEDING =====
+def clear_seed_data():
+    """Delete everything created by seed_catalog (reviews cascade)."""
+    Category.objects.filter(name__startswith=SEED_CATEGORY_PREFIX).delete()
+    User.objects.filter(username__startswith=SEED_USER_PREFIX).delete()
+    schedule_catalog_bump()
+
+
+def _batched(iterable, size=BATCH_SIZE):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed_catalog(categories=50, products=10000, reviews=100000, users=500, seed=1, stdout=None):
+    """Create a reproducible catalog: the same arguments always give the same rows."""
+    rng = random.Random(seed)
+
+    def log(message):
+        if stdout is not None:
+            stdout.write(message)
+
+    with transaction.atomic():
+        Category.objects.bulk_create(
+            Category(name=f'{SEED_CATEGORY_PREFIX}Category {i + 1}') for i in range(categories)
+        )
+        category_ids = list(
+            Category.objects.filter(name__startswith=SEED_CATEGORY_PREFIX)
+            .order_by('id').values_list('id', flat=True)
+        )
+        log(f'Created {len(category_ids)} categories')
+
+        def product_rows():
+            for i in range(products):
+                name = f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} #{i + 1}'
+                yield Product(
+                    name=name,
+                    category_id=rng.choice(category_ids),
+                    price=rng.randrange(150, 3000, 10),
+                    description=f'{name} baked fresh every morning. ' * 3,
+                    image=SEED_IMAGE,
+                    is_available=rng.random() > 0.05,
+                )
+
+        for batch in _batched(product_rows()):
+            Product.objects.bulk_create(batch)
+        product_ids = list(
+            Product.objects.filter(category_id__in=category_ids)
+            .order_by('id').values_list('id', flat=True)
+        )
+        log(f'Created {len(product_ids)} products')
+
+        # One unusable hash shared by every bench user keeps seeding cheap.
+        password = make_password(None)
+        for batch in _batched(
+            User(username=f'{SEED_USER_PREFIX}{i + 1}', email=f'{SEED_USER_PREFIX}{i + 1}@example.com',
+                 first_name='Bench', last_name=f'User {i + 1}', password=password)
+            for i in range(users)
+        ):
+            User.objects.bulk_create(batch)
+        user_ids = list(
+            User.objects.filter(username__startswith=SEED_USER_PREFIX)
+            .order_by('id').values_list('id', flat=True)
+        )
+        log(f'Created {len(user_ids)} users')
+
+        created = 0
+        review_ids = []
+        if product_ids and user_ids:
+            review_rows = (
+                ProductReview(
+                    product_id=rng.choice(product_ids),
+                    user_id=rng.choice(user_ids),
+                    rating=rng.randint(1, 5),
+                    comment=rng.choice(COMMENTS),
+                )
+                for _ in range(reviews)
+            )
+            for batch in _batched(review_rows):
+                review_ids.extend(review.pk for review in ProductReview.objects.bulk_create(batch))
+                created += len(batch)
+                if created % (BATCH_SIZE * 20) == 0:
+                    log(f'  ... {created} reviews')
+        log(f'Created {created} reviews')
+        # bulk_create sends no signals: log the new rows for the change feed
+        # (which also invalidates the catalog cache).
+        record_changes(Category, category_ids)
+        record_changes(Product, product_ids)
+        record_changes(ProductReview, review_ids)
+
+    return {
+        'categories': len(category_ids),
+        'products': len(product_ids),
+        'users': len(user_ids),
+        'reviews': created,
+        'seed': seed,
+    }
+
+
+def dataset_summary():
+    return {
+        'categories': Category.objects.count(),
+        'products': Product.objects.count(),
+        'reviews': ProductReview.objects.count(),
+        'users': User.objects.count(),
+    }
+
+
+# ===== MEASURING =====
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _set_cart(client, product_ids, size):
+    """Put `size` products (quantity 1-3) in the client's session cart."""
+    session = client.session
+    cart = {str(pid): (i % 3) + 1 for i, pid in enumerate(product_ids[:size])}
+    prices = dict(Product.objects.filter(id__in=product_ids[:size]).values_list('id', 'price'))
+    session['cart'] = cart
+    session['cart_count'] = sum(cart.values())
+    session['cart_total'] = sum(prices.get(int(pid), 0) * qty for pid, qty in cart.items())
+    session.save()
+    return cart
+
+
+def measure(client, name, method, url, repeat=20, data=None, setup=None, **extra):
+    """Time `repeat` requests (after one warm-up) and count their SQL queries."""
+    timings = []
+    query_counts = []
+    response = None
+    for i in range(repeat + 1):
+        if setup is not None:
+            setup()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            if method == 'POST':
+                response = client.post(url, data=data, content_type='application/json', **extra)
+            else:
+                response = client.get(url, data=data, **extra)
+            elapsed = (time.perf_counter() - start) * 1000
+        if i == 0:
+            continue  # warm-up: template compilation, first session load
+        timings.append(elapsed)
+        query_counts.append(len(queries))
+
+    return {
+        'name': name,
+        'method': method,
+        'url': url,
+        'status': response.status_code,
+        'bytes': len(response.content),
+        'queries': max(query_counts),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'p50_ms': round(_percentile(timings, 50), 3),
+        'p95_ms': round(_percentile(timings, 95), 3),
+        'max_ms': round(max(timings), 3),
+        'repeat': repeat,
+    }
+
+
+# Every scenario repeats one endpoint from one client, far above the throttle
+# limits; snapshots are off so the anonymous page views are actually rendered.
+@override_settings(THROTTLE_ENABLED=False, SNAPSHOTS_ENABLED=False)
+def run_benchmarks(repeat=20, cart_sizes=(1, 10, 50), search_term='Butter'):
+    """Drive every hot view through the test client and return one row per scenario."""
+    products = list(Product.objects.order_by('id').values_list('id', flat=True)[:max(cart_sizes)])
+    if not products:
+        raise ValueError('No products in the database - run seed_catalog first.')
+    busiest = (
+        Product.objects.annotate(num_reviews=Count('reviews'))
+        .order_by('-num_reviews', 'id').values_list('id', flat=True).first()
+    )
+    busiest_category = (
+        Category.objects.annotate(num_products=Count('product'))
+        .order_by('-num_products', 'id').values_list('id', flat=True).first()
+    )
+    shopper, _ = User.objects.get_or_create(
+        username=f'{SEED_USER_PREFIX}shopper',
+        defaults={'email': 'shopper@example.com', 'first_name': 'Bench', 'password': make_password(None)},
+    )
+
+    client = Client(SERVER_NAME='localhost')
+    results = [
+        measure(client, 'shopnow', 'GET', reverse('shopnow'), repeat),
+        measure(client, 'shopnow_products', 'GET', reverse('shopnow_products', args=[busiest_category]), repeat,
+                data={'after': 0}),
+        measure(client, 'product_detail', 'GET', reverse('product_detail', args=[busiest]), repeat),
+        measure(client, 'search_ajax', 'GET', reverse('search_ajax'), repeat, data={'q': search_term}),
+    ]
+
+    for size in cart_sizes:
+        def reset_cart(size=size):
+            _set_cart(client, products, size)
+
+        reset_cart()
+        first_id = products[0]
+        suffix = f'[cart={size}]'
+        results += [
+            measure(client, f'cart_page{suffix}', 'GET', reverse('cart_page'), repeat),
+            measure(client, f'cart_data_api{suffix}', 'GET', reverse('cart_data_api'), repeat),
+            measure(client, f'update_cart_item{suffix}', 'POST', reverse('update_cart_item'), repeat,
+                    data={'item_id': first_id, 'quantity': 2}, setup=reset_cart),
+            measure(client, f'remove_cart_item{suffix}', 'POST', reverse('remove_cart_item'), repeat,
+                    data={'item_id': first_id}, setup=reset_cart),
+        ]
+
+    shopper_client = Client(SERVER_NAME='localhost')
+    shopper_client.force_login(shopper)
+    for size in cart_sizes:
+        _set_cart(shopper_client, products, size)
+        results.append(
+            measure(shopper_client, f'payment_page[cart={size}]', 'GET', reverse('payment_page'), repeat)
+        )
+    return results
+
+
+LOGIN_PASSWORD = 'bench-Passw0rd!'
+
+
+def hasher_available(path):
+    """False if the hasher needs a library (argon2-cffi, bcrypt) that isn't installed."""
+    hasher = import_string(path)()
+    if hasher.library is None:  # PBKDF2, scrypt: stdlib only
+        return True
+    try:
+        hasher._load_library()
+    except ValueError:
+        return False
+    return True
+
+
+def measure_logins(profile, hashers, repeat=10):
+    """
+    CPU and wall time of `repeat` successful POSTs to the login view, with
+    `hashers` as PASSWORD_HASHERS, next to the cost of a single password
+    check. A login costing about one check means the password is hashed once.
+    """
+    with override_settings(PASSWORD_HASHERS=hashers, THROTTLE_ENABLED=False):
+        user, _ = User.objects.get_or_create(
+            username=f'{SEED_USER_PREFIX}login', defaults={'email': 'login@example.com', 'first_name': 'Bench'}
+        )
+        user.set_password(LOGIN_PASSWORD)  # hashed with this profile's first hasher
+        user.save(update_fields=['password'])
+        hasher = get_hasher()
+
+        check_cpu = []
+        for _ in range(repeat):
+            start = time.process_time()
+            check_password(LOGIN_PASSWORD, user.password)
+            check_cpu.append((time.process_time() - start) * 1000)
+
+        url = reverse('login')
+        cpu, wall = [], []
+        status = None
+        for i in range(repeat + 1):
+            client = Client(SERVER_NAME='localhost')  # a fresh visitor each time
+            start_cpu, start_wall = time.process_time(), time.perf_counter()
+            response = client.post(url, {'username': user.username, 'password': LOGIN_PASSWORD})
+            elapsed_cpu = (time.process_time() - start_cpu) * 1000
+            elapsed_wall = (time.perf_counter() - start_wall) * 1000
+            status = response.status_code
+            if i == 0:
+                continue  # warm-up
+            cpu.append(elapsed_cpu)
+            wall.append(elapsed_wall)
+
+    cpu_ms = statistics.fmean(cpu)
+    return {
+        'profile': profile,
+        'hasher': hasher.algorithm,
+        'status': status,
+        'check_cpu_ms': round(statistics.fmean(check_cpu), 3),
+        'login_cpu_ms': round(cpu_ms, 3),
+        'login_p50_ms': round(_percentile(wall, 50), 3),
+        'logins_per_sec_per_core': round(1000 / cpu_ms, 1) if cpu_ms else None,
+        'repeat': repeat,
+    }
+
+
+def run_login_benchmarks(profiles=None, repeat=10):
+    """measure_logins() for every PASSWORD_HASHER_PROFILES entry whose hasher is installed."""
+    results, skipped = [], []
+    for profile, hashers in settings.PASSWORD_HASHER_PROFILES.items():
+        if profiles and profile not in profiles:
+            continue
+        if hasher_available(hashers[0]):
+            results.append(measure_logins(profile, hashers, repeat))
+        else:
+            skipped.append(profile)
+    return results, skipped
+
+
+def build_report(results):
+    return {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'dataset': dataset_summary(),
+        },
+        'results': results,
+    }
+
+
+def compare_reports(baseline, current, threshold=0.25):
+    """Return scenarios that run more queries, or are `threshold` slower at p50, than the baseline."""
+    previous = {row['name']: row for row in baseline.get('results', [])}
+    regressions = []
+    for row in current['results']:
+        before = previous.get(row['name'])
+        if before is None:
+            continue
+        if row['queries'] > before['queries']:
+            regressions.append(f"{row['name']}: queries {before['queries']} -> {row['queries']}")
+        if before['p50_ms'] and row['p50_ms'] > before['p50_ms'] * (1 + threshold):
+            regressions.append(f"{row['name']}: p50 {before['p50_ms']}ms -> {row['p50_ms']}ms")
+    return regressions
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def save_report(report, path):
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(report, fh, indent=2)
+        fh.write('\n')
@@ -0,0 +1,125 @@
+# accounts/bootstats.py
+"""Cold start time and per-worker memory of gunicorn started with gunicorn.conf.py."""
+import http.client
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+
+# ===== /proc READERS (Linux) =====
+def process_memory(pid):
+    """
+    RSS, PSS and shared memory of `pid` in KiB. PSS splits pages shared
+    with other processes between them, so it is the number that shows what
+    preload_app saves; RSS counts shared pages in full for every worker.
+    Returns None where /proc is not available.
+    """
+    fields = {'Rss': 'rss_kb', 'Pss': 'pss_kb', 'Shared_Clean': 'shared_kb', 'Shared_Dirty': 'shared_kb'}
+    memory = {'rss_kb': 0, 'pss_kb': 0, 'shared_kb': 0}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as fh:
+            for line in fh:
+                key, _, rest = line.partition(':')
+                if key in fields:
+                    memory[fields[key]] += int(rest.split()[0])
+    except OSError:
+        try:
+            with open(f'/proc/{pid}/status') as fh:
+                for line in fh:
+                    if line.startswith('VmRSS:'):
+                        return {'rss_kb': int(line.split()[1]), 'pss_kb': None, 'shared_kb': None}
+        except OSError:
+            return None
+    return memory
+
+
+def child_pids(pid):
+    children = []
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children') as fh:
+                children += [int(c) for c in fh.read().split()]
+    except OSError:
+        pass
+    return sorted(children)
+
+
+# ===== MEASURING =====
+def _get(port, path, timeout=5):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        conn.request('GET', path, headers={'Host': 'localhost'})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def measure_boot(port=8765, workers=2, worker_class='sync', preload=True, path='/', requests=20, timeout=60):
+    """
+    Start gunicorn, time how long until `path` first answers, warm every
+    worker with `requests` requests, then read each process's memory.
+    """
+    env = dict(
+        os.environ,
+        GUNICORN_BIND=f'127.0.0.1:{port}',
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_WORKER_CLASS=worker_class,
+        GUNICORN_PRELOAD='1' if preload else '0',
+        GUNICORN_ACCESSLOG='',
+        GUNICORN_LOGLEVEL='warning',
+    )
+    config = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', config],
+        cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        cold_start_ms = None
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError('gunicorn exited during boot:\n' + server.stderr.read().decode(errors='replace'))
+            try:
+                status = _get(port, path)
+            except OSError:
+                time.sleep(0.02)
+                continue
+            cold_start_ms = (time.perf_counter() - start) * 1000
+            break
+        if cold_start_ms is None:
+            raise RuntimeError(f'gunicorn did not answer {path} within {timeout}s')
+
+        # Wait for the full set of workers, then give each some traffic so
+        # their memory reflects a serving process rather than a fresh fork.
+        while len(child_pids(server.pid)) < workers and time.perf_counter() - start < timeout:
+            time.sleep(0.05)
+        for _ in range(requests * workers):
+            _get(port, path)
+
+        master = process_memory(server.pid)
+        worker_rows = [{'pid': pid, **(process_memory(pid) or {})} for pid in child_pids(server.pid)]
+        pss = [row['pss_kb'] for row in worker_rows if row.get('pss_kb') is not None]
+        return {
+            'worker_class': worker_class,
+            'preload': preload,
+            'workers': len(worker_rows),
+            'first_status': status,
+            'cold_start_ms': round(cold_start_ms, 1),
+            'master': master,
+            'worker_memory': worker_rows,
+            'total_pss_kb': sum(pss) + (master or {}).get('pss_kb', 0) if pss else None,
+        }
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+        server.stderr.close()
@@ -0,0 +1,78 @@
+# accounts/catalog.py
+"""
+Cached catalog reads. Every cached entry is keyed by the catalog version,
+which is bumped after any change to categories, products or reviews
+commits, so stale entries are simply never read again.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Category, Product, with_review_stats
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_CACHE_TIMEOUT = 60 * 60
+# Products per category rendered with the shopnow page, and per fragment
+# after that (accounts/views.py: shopnow_products).
+SHOP_PAGE_SIZE = 12
+
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Start from the clock, not 1, so a version key lost to eviction can
+        # never come back as a number that older entries were stored under.
+        cache.add(CATALOG_VERSION_KEY, time.time_ns() // 1000, None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        return catalog_version()
+
+
+def schedule_catalog_bump():
+    """Bump the version once the current transaction commits (once per transaction)."""
+    connection = transaction.get_connection()
+    savepoints = set(connection.savepoint_ids)
+    # A hook registered under the same (or an enclosing) savepoint already
+    # covers this change: it survives every rollback this one would.
+    if any(func is bump_catalog_version and sids <= savepoints
+           for sids, func, _ in connection.run_on_commit):
+        return
+    transaction.on_commit(bump_catalog_version)
+
+
+def catalog_key(name):
+    return f'catalog:{catalog_version()}:{name}'
+
+
+def shop_categories():
+    """Categories for the shopnow tabs, without their products (see shop_page)."""
+    key = catalog_key('shop')
+    categories = cache.get(key)
+    if categories is None:
+        categories = list(Category.objects.order_by('id'))
+        cache.set(key, categories, CATALOG_CACHE_TIMEOUT)
+    return categories
+
+
+def shop_page(category_id, after=None):
+    """
+    Up to SHOP_PAGE_SIZE products of a category (with review stats), the
+    ones after product id `after`. Returns (products, whether more follow).
+    """
+    key = catalog_key(f'shop:{category_id}:{after or 0}')
+    page = cache.get(key)
+    if page is None:
+        products = with_review_stats(Product.objects.filter(category_id=category_id)).order_by('id')
+        if after is not None:
+            products = products.filter(id__gt=after)
+        products = list(products[:SHOP_PAGE_SIZE + 1])
+        page = products[:SHOP_PAGE_SIZE], len(products) > SHOP_PAGE_SIZE
+        cache.set(key, page, CATALOG_CACHE_TIMEOUT)
+    return page
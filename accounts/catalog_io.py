@@ -0,0 +1,305 @@
+# accounts/catalog_io.py
+"""Streaming product import/export (CSV or JSON Lines) for the catalog commands."""
+import csv
+import json
+import os
+import posixpath
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+from .benchmark import _batched
+from .catalog import schedule_catalog_bump
+from .changes import record_changes
+from .models import Category, Product
+
+FIELDS = ['id', 'name', 'category', 'price', 'description', 'image', 'is_available']
+UPDATE_FIELDS = ['name', 'category', 'price', 'description', 'image', 'is_available', 'updated_at']
+FORMATS = ('csv', 'jsonl')
+BATCH_SIZE = 1000
+IMAGE_UPLOAD_TO = 'products/'
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'off', ''}
+
+
+def guess_format(path, default='csv'):
+    ext = os.path.splitext(path or '')[1].lower()
+    if ext in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if ext == '.csv':
+        return 'csv'
+    return default
+
+
+# ===== EXPORT =====
+def export_rows(batch_size=BATCH_SIZE):
+    """Every product as a dict, fetched in chunks so memory stays flat."""
+    rows = (
+        Product.objects.order_by('id')
+        .values_list('id', 'name', 'category__name', 'price', 'description', 'image', 'is_available')
+        .iterator(chunk_size=batch_size)
+    )
+    for row in rows:
+        yield dict(zip(FIELDS, row))
+
+
+def export_catalog(fh, fmt='csv', batch_size=BATCH_SIZE):
+    """Write the catalog to the text stream `fh`; returns the number of products."""
+    count = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(fh, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in export_rows(batch_size):
+            row['is_available'] = 'true' if row['is_available'] else 'false'
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in export_rows(batch_size):
+            fh.write(json.dumps(row, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+# ===== IMPORT =====
+def read_rows(fh, fmt='csv'):
+    """Yield (line number, dict or error message) from a CSV or JSON Lines stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(fh)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(fh, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, f'invalid JSON: {e}'
+            continue
+        yield number, row if isinstance(row, dict) else 'expected a JSON object'
+
+
+def clean_row(raw):
+    """Validate one input row; returns a dict of typed values or an error message."""
+    row = {key: ('' if value is None else value) for key, value in raw.items() if key in FIELDS}
+    name = str(row.get('name', '')).strip()
+    category = str(row.get('category', '')).strip()
+    if not name:
+        return 'name is required'
+    if not category:
+        return 'category is required'
+    if len(name) > 200 or len(category) > 100:
+        return 'name or category is too long'
+    try:
+        price = int(row.get('price'))
+    except (TypeError, ValueError):
+        return f"price must be a whole number, got {row.get('price')!r}"
+    available = row.get('is_available', True)
+    if not isinstance(available, bool):
+        text = str(available).strip().lower()
+        if text not in TRUE_VALUES | FALSE_VALUES:
+            return f'is_available must be true or false, got {available!r}'
+        available = text in TRUE_VALUES
+    product_id = str(row.get('id', '')).strip()
+    if product_id and not product_id.isdigit():
+        return f'id must be a number, got {product_id!r}'
+    return {
+        'id': int(product_id) if product_id else None,
+        'name': name,
+        'category': category,
+        'price': price,
+        'description': str(row.get('description', '')),
+        'image': str(row.get('image', '')).strip(),
+        'is_available': available,
+    }
+
+
+def needs_ingest(image, images_dir):
+    """URLs and files under images_dir are copied into media storage; anything else is a stored name."""
+    if image.startswith(('http://', 'https://')):
+        return True
+    return bool(images_dir) and os.path.isfile(os.path.join(images_dir, image))
+
+
+def ingest_image(source, images_dir=None, storage=None, timeout=30):
+    """Copy one image into media storage and return its stored name."""
+    storage = storage or default_storage
+    if source.startswith(('http://', 'https://')):
+        with urlopen(source, timeout=timeout) as response:
+            data = response.read()
+        filename = posixpath.basename(urlsplit(source).path) or 'image.jpg'
+    else:
+        with open(os.path.join(images_dir, source), 'rb') as fh:
+            data = fh.read()
+        filename = os.path.basename(source)
+    return storage.save(IMAGE_UPLOAD_TO + filename, ContentFile(data))
+
+
+class _DryRun(Exception):
+    pass
+
+
+def import_catalog(fh, fmt='csv', batch_size=BATCH_SIZE, images_dir=None, workers=8, dry_run=False,
+                   atomic=False, stdout=None):
+    """
+    Create or update products from a CSV/JSONL stream, `batch_size` rows at
+    a time. Rows with an id update that product; rows without one match on
+    (category, name). Unknown categories are created. Invalid rows are
+    skipped and reported.
+
+    Each batch's images are fetched first, with no transaction open, and
+    the batch is then written in a transaction of its own, so SQLite's write
+    lock is only held while rows are written. With `atomic` (and for a dry
+    run) the whole import is one transaction instead: all or nothing, but
+    holding the lock from the first batch to the last. Either way the
+    catalog cache is invalidated once, at the end.
+    """
+    def log(message):
+        if stdout is not None:
+            stdout.write(message)
+
+    stats = {'created': 0, 'updated': 0, 'unchanged': 0, 'categories': 0, 'images': 0, 'errors': []}
+    # Category names are not unique: the oldest category with a name wins.
+    categories = {}
+    for category_id, name in Category.objects.order_by('-id').values_list('id', 'name'):
+        categories[name] = category_id
+    ingested = {}
+
+    try:
+        with transaction.atomic() if atomic or dry_run else nullcontext(), \
+                ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            try:
+                for batch in _batched(read_rows(fh, fmt), batch_size):
+                    rows = []
+                    for number, raw in batch:
+                        cleaned = raw if isinstance(raw, str) else clean_row(raw)
+                        if isinstance(cleaned, str):
+                            stats['errors'].append((number, cleaned))
+                        else:
+                            rows.append((number, cleaned))
+                    failed = _fetch_images(rows, ingested, pool, images_dir, dry_run, stats)
+                    with transaction.atomic():
+                        _import_batch(rows, categories, ingested, failed, stats)
+                    log(f"  ... {stats['created']} created, {stats['updated']} updated")
+            finally:
+                # Batches committed before a failure are live too.
+                if stats['created'] or stats['updated'] or stats['categories']:
+                    schedule_catalog_bump()
+            if dry_run:
+                raise _DryRun
+    except _DryRun:
+        pass
+    return stats
+
+
+def _fetch_images(rows, ingested, pool, images_dir, dry_run, stats):
+    """
+    Copy the batch's new images into media storage, in parallel and each
+    distinct source only once per import. Returns {source: error}.
+    """
+    sources = sorted({
+        row['image'] for _, row in rows
+        if row['image'] and row['image'] not in ingested and needs_ingest(row['image'], images_dir)
+    })
+    failed = {}
+    if dry_run:
+        ingested.update((source, source) for source in sources)
+    else:
+        futures = {source: pool.submit(ingest_image, source, images_dir) for source in sources}
+        for source, future in futures.items():
+            try:
+                ingested[source] = future.result()
+            except (OSError, ValueError) as e:
+                failed[source] = str(e)
+    stats['images'] += len(sources) - len(failed)
+    return failed
+
+
+def _import_batch(rows, categories, ingested, failed, stats):
+    new_names = sorted({row['category'] for _, row in rows} - set(categories))
+    if new_names:
+        created = Category.objects.bulk_create(Category(name=name) for name in new_names)
+        for category in created:
+            categories[category.name] = category.pk
+        record_changes(Category, [category.pk for category in created], bump=False)
+        stats['categories'] += len(new_names)
+
+    by_id = Product.objects.in_bulk([row['id'] for _, row in rows if row['id']])
+    keyed = [(categories[row['category']], row['name']) for _, row in rows if not row['id']]
+    by_key = {}
+    if keyed:
+        matches = Product.objects.filter(
+            category_id__in={key[0] for key in keyed}, name__in={key[1] for key in keyed}
+        ).order_by('-id')
+        by_key = {(p.category_id, p.name): p for p in matches}
+
+    to_create, to_update = {}, {}
+    for number, row in rows:
+        if row['image'] in failed:
+            stats['errors'].append((number, f"image {row['image']!r}: {failed[row['image']]}"))
+            continue
+        if row['image'] in ingested:
+            row['image'] = ingested[row['image']]
+        category_id = categories[row['category']]
+        values = {
+            'name': row['name'],
+            'category_id': category_id,
+            'price': row['price'],
+            'description': row['description'],
+            'is_available': row['is_available'],
+        }
+        if row['image']:
+            values['image'] = row['image']
+        product = by_id.get(row['id']) if row['id'] else by_key.get((category_id, row['name']))
+        if product is None:
+            key = row['id'] or (category_id, row['name'])
+            # An update without an image keeps the one it has; a new product needs one.
+            if not row['image'] and key not in to_create:
+                stats['errors'].append((number, 'image is required for a new product'))
+                continue
+            product = to_create.setdefault(key, Product(id=row['id']))
+        elif all(getattr(product, field) == value for field, value in values.items()):
+            stats['unchanged'] += 1  # re-imports mostly repeat what is already there
+            continue
+        else:
+            to_update[product.pk] = product
+        for field, value in values.items():
+            setattr(product, field, value)
+
+    created = Product.objects.bulk_create(to_create.values())
+    _update_products(to_update.values())
+    # bulk writes send no signals; import_catalog bumps the cache once at the end
+    record_changes(Product, [product.pk for product in created] + list(to_update), bump=False)
+    stats['created'] += len(to_create)
+    stats['updated'] += len(to_update)
+
+
+def _update_products(products):
+    """
+    Save UPDATE_FIELDS of `products` with one parameterised UPDATE run
+    through executemany. bulk_update() would do the same job with CASE/WHEN
+    expressions, but building those cost about 3 ms per row on a 5,000-row
+    import, against microseconds here.
+    """
+    if not products:
+        return
+    meta = Product._meta
+    fields = [meta.get_field(name) for name in UPDATE_FIELDS]
+    quote = connection.ops.quote_name
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        quote(meta.db_table),
+        ', '.join(f'{quote(field.column)} = %s' for field in fields),
+        quote(meta.pk.column),
+    )
+    params = [
+        # pre_save() fills in updated_at, as save() would
+        [field.get_db_prep_save(field.pre_save(product, False), connection) for field in fields] + [product.pk]
+        for product in products
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
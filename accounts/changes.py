@@ -0,0 +1,65 @@
+# accounts/changes.py
+"""
+The catalog change log behind /api/v1/changes/.
+
+Saves and deletes made through the ORM are logged by accounts/signals.py;
+bulk writes (imports, seeding, admin bulk deletes) call record_changes()
+themselves. Reviews removed with their product are not logged one by
+one: a product tombstone means its reviews are gone too, and a category
+tombstone its products. Reviews removed with their author are logged,
+since nothing else in the feed says they went.
+"""
+from django.db.models import Max, Min
+
+from .catalog import schedule_catalog_bump
+from .models import CatalogChange, Category, Product, ProductReview
+
+KINDS = {Category: 'category', Product: 'product', ProductReview: 'review'}
+MODELS = {kind: model for model, kind in KINDS.items()}
+BATCH_SIZE = 5000
+
+
+class CursorExpired(Exception):
+    """The log entries after this cursor were purged; the client has to resync."""
+
+
+def record_changes(model, ids, deleted=False, bump=True):
+    """
+    Log saves (or deletes) of the `model` rows `ids`, and invalidate the
+    catalog cache, unless `bump` is False because the caller does that itself.
+    """
+    CatalogChange.objects.bulk_create(
+        [CatalogChange(kind=KINDS[model], object_id=pk, deleted=deleted) for pk in ids],
+        batch_size=BATCH_SIZE,
+    )
+    if bump:
+        schedule_catalog_bump()
+
+
+def latest_cursor():
+    return CatalogChange.objects.aggregate(latest=Max('id'))['latest'] or 0
+
+
+def changes_since(cursor, limit):
+    """
+    Read the next `limit` log entries after `cursor` and keep only the last
+    one per object. Returns ([(kind, object_id), ...], new cursor, more),
+    in the order the objects last changed.
+
+    Cursors rely on ids being handed out in commit order, which holds on
+    SQLite, where writers are serialised.
+    """
+    oldest = CatalogChange.objects.aggregate(oldest=Min('id'))['oldest']
+    if oldest is not None and cursor < oldest - 1:
+        raise CursorExpired(cursor)
+    entries = list(
+        CatalogChange.objects.filter(id__gt=cursor).order_by('id')
+        .values_list('id', 'kind', 'object_id')[:limit + 1]
+    )
+    more = len(entries) > limit
+    entries = entries[:limit]
+    latest = {}
+    for _, kind, object_id in entries:
+        latest.pop((kind, object_id), None)
+        latest[kind, object_id] = True
+    return list(latest), entries[-1][0] if entries else cursor, more
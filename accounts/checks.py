@@ -0,0 +1,23 @@
+# accounts/checks.py
+"""System checks, run by manage.py commands (runserver, migrate, check --deploy)."""
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+@register()
+def check_password_hasher(app_configs, **kwargs):
+    # New passwords are hashed with the first hasher. Without its library,
+    # every sign-up and password change would fail at request time.
+    from .benchmark import hasher_available
+
+    hashers = getattr(settings, 'PASSWORD_HASHERS', [])
+    if not hashers or hasher_available(hashers[0]):
+        return []
+    return [Error(
+        f'{hashers[0]} is the first password hasher, but the library it needs is not installed.',
+        hint=(
+            f"Install it (argon2-cffi for Argon2, bcrypt for BCrypt), or choose another PASSWORD_HASHER_PROFILE than "
+            f"{getattr(settings, 'PASSWORD_HASHER_PROFILE', '')!r}."
+        ),
+        id='accounts.E001',
+    )]
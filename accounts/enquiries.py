@@ -0,0 +1,131 @@
+# accounts/enquiries.py
+"""
+Batched mail for contact-form enquiries.
+
+The enquiry view only saves an Enquiry; nothing is sent while the
+customer waits. `manage.py send_enquiry_mail` (run every minute or so)
+sends each waiting customer their confirmation, and with --digest (run
+hourly, say) one message to staff listing every enquiry since the last
+digest. Each run uses a single SMTP connection however much it sends.
+Photos are not attached. They are kept with the enquiry, which staff
+read in the admin inbox.
+
+A message is marked sent as soon as the server accepts it. If a run fails
+partway, the next run carries on from the first message that was not
+accepted, so nobody gets a confirmation twice. A confirmation the server
+refuses (a bad address, say) is counted against its enquiry and the run
+moves on to the next one; after MAX_ATTEMPTS refusals the enquiry gets no
+more tries. The digest goes out either way.
+"""
+import smtplib
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.urls import reverse
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Enquiry
+
+# Enquiries handled per run; anything over waits for the next run.
+BATCH_SIZE = 500
+# Refused confirmations before an enquiry is given up on.
+MAX_ATTEMPTS = 5
+
+
+def from_email():
+    return getattr(settings, 'DEFAULT_FROM_EMAIL', 'utm2577239@stu.o-hara.ac.jp')
+
+
+def digest_recipients():
+    return getattr(settings, 'ENQUIRY_DIGEST_RECIPIENTS', None) or [from_email()]
+
+
+def confirmation_message(enquiry):
+    return EmailMessage(
+        subject='Thank you for your enquiry - WENDY WOO',
+        body=f"""Dear {enquiry.name},
+
+Thank you for contacting WENDY WOO. We have received your enquiry regarding {enquiry.get_inquiry_type_display()}.
+
+We will get back to you within 24-48 hours.
+
+Your message:
+{enquiry.message}
+
+Best regards,
+WENDY WOO Team""",
+        from_email=from_email(),
+        to=[enquiry.email],
+    )
+
+
+def digest_message(enquiries):
+    sections = []
+    for enquiry in enquiries:
+        sections.append(f"""Inquiry Type: {enquiry.get_inquiry_type_display()}
+Name: {enquiry.name}
+Email: {enquiry.email}
+Received: {timezone.localtime(enquiry.created_at):%Y-%m-%d %H:%M}
+Photo: {'YES (see the inbox)' if enquiry.photo else 'No'}
+Inbox: {getattr(settings, 'SITE_URL', '')}{reverse('admin:accounts_enquiry_change', args=[enquiry.pk])}
+
+Message:
+{enquiry.message}""")
+    count = len(enquiries)
+    return EmailMessage(
+        subject=f"{count} new enquir{'y' if count == 1 else 'ies'} - WENDY WOO",
+        body=f'{count} NEW ENQUIR{"Y" if count == 1 else "IES"}\n\n' + '\n\n---\n\n'.join(sections),
+        from_email=from_email(),
+        to=digest_recipients(),
+    )
+
+
+def send_confirmations(connection, enquiries):
+    """Returns (how many were sent, how many the server refused)."""
+    sent, refused = [], 0
+    try:
+        for enquiry in enquiries:
+            try:
+                connection.send_messages([confirmation_message(enquiry)])
+            except smtplib.SMTPServerDisconnected:
+                raise  # not this message's fault; the next run retries
+            except smtplib.SMTPException as exc:
+                refused += 1
+                Enquiry.objects.filter(pk=enquiry.pk).update(
+                    confirmation_attempts=F('confirmation_attempts') + 1,
+                    confirmation_error=str(exc)[:255],
+                )
+                continue
+            sent.append(enquiry.pk)
+    finally:
+        if sent:
+            Enquiry.objects.filter(pk__in=sent).update(confirmation_sent_at=timezone.now())
+    return len(sent), refused
+
+
+def send_digest(connection, enquiries):
+    connection.send_messages([digest_message(enquiries)])
+    Enquiry.objects.filter(pk__in=[enquiry.pk for enquiry in enquiries]).update(notified_at=timezone.now())
+    return len(enquiries)
+
+
+def waiting(**unsent):
+    return list(Enquiry.objects.filter(**unsent).order_by('created_at')[:BATCH_SIZE])
+
+
+def send_enquiry_mail(digest=False):
+    """
+    Send waiting confirmations, and with `digest` the staff digest, over one
+    SMTP connection (none is opened when there is nothing to send).
+    """
+    confirmations = waiting(confirmation_sent_at__isnull=True, confirmation_attempts__lt=MAX_ATTEMPTS)
+    listed = waiting(notified_at__isnull=True) if digest else []
+    counts = {'confirmations': 0, 'refused': 0, 'digest': 0}
+    if not confirmations and not listed:
+        return counts
+    with get_connection(fail_silently=False) as connection:
+        counts['confirmations'], counts['refused'] = send_confirmations(connection, confirmations)
+        if listed:
+            counts['digest'] = send_digest(connection, listed)
+    return counts
@@ -2,13 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.core.validators import FileExtensionValidator
-from django.core.mail import send_mail
-from django.conf import settings
-from django.contrib.auth.tokens import default_token_generator
-from django.utils.http import urlsafe_base64_encode
-from django.utils.encoding import force_bytes
-from django.urls import reverse
-from .models import ProductReview
+from .models import Enquiry, ProductReview
 
 
 class SignUpForm(UserCreationForm):
@@ -47,6 +41,14 @@ class SignUpForm(UserCreationForm):
         return user
 
     def send_verification_email(self, user):
+        # Imported here: only sign-up needs mail and token machinery.
+        from django.conf import settings
+        from django.contrib.auth.tokens import default_token_generator
+        from django.core.mail import send_mail
+        from django.urls import reverse
+        from django.utils.encoding import force_bytes
+        from django.utils.http import urlsafe_base64_encode
+
         token = default_token_generator.make_token(user)
         uid = urlsafe_base64_encode(force_bytes(user.pk))
         
@@ -99,12 +101,7 @@ class ReviewForm(forms.ModelForm):
     )
 
 class EnquiryForm(forms.Form):
-    INQUIRY_TYPES = [
-        ('', 'Please select one'),
-        ('orders', 'Orders'),
-        ('product_ingredients', 'Product Ingredients'),
-        ('others', 'Others'),
-    ]
+    INQUIRY_TYPES = [('', 'Please select one'), *Enquiry.TYPE_CHOICES]
     
     inquiry_type = forms.ChoiceField(
         choices=INQUIRY_TYPES,
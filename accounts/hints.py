@@ -0,0 +1,102 @@
+# accounts/hints.py
+"""
+Preload hints for what a page needs before it can render.
+
+The {% css_bundle %}, {% js_bundle %} and {% preload_static %} tags record
+the assets they render with add_preload(). PreloadMiddleware sends them,
+plus a preconnect to each PRECONNECT_ORIGINS entry, as a `Link` header,
+and remembers that header per URL name.
+
+Under ASGI, EarlyHintsMiddleware replays the remembered links as a
+`103 Early Hints` response the moment a request comes in. The browser then
+fetches the CSS and JS while the view is still querying the database. Only
+servers implementing the ASGI `http.response.early_hint` extension
+(e.g. Hypercorn) can send one; under any other server, and under WSGI,
+pages still get the `Link` header, which CDNs such as Cloudflare turn into
+Early Hints themselves.
+"""
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+EARLY_HINT = 'http.response.early_hint'
+PRELOAD_ATTR = '_preload_links'
+
+# URL name -> Link header values of its last rendered page, per process.
+_learned = {}
+
+
+def add_preload(request, url, kind):
+    """Ask for `url` to be preloaded as `kind` (style, script, image, font) with this response."""
+    if request is not None:
+        request.__dict__.setdefault(PRELOAD_ATTR, {}).setdefault(url, kind)
+
+
+def link_values(preloads):
+    links = [
+        f'<{origin}>; rel=preconnect' + ('; crossorigin' if cors else '')
+        for origin, cors in getattr(settings, 'PRECONNECT_ORIGINS', [])
+    ]
+    links += [f'<{url}>; rel=preload; as={kind}' for url, kind in preloads.items()]
+    return links
+
+
+def url_name(path):
+    try:
+        return resolve(path).url_name
+    except Resolver404:
+        return None
+
+
+def learned_links(path):
+    return _learned.get(url_name(path))
+
+
+# ===== MIDDLEWARE =====
+class PreloadMiddleware:
+    """
+    Goes before SnapshotMiddleware, so pages served from a snapshot get the
+    header their last rendering had.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.status_code != 200 or not response.get('Content-Type', '').startswith('text/html'):
+            return response
+        match = request.resolver_match
+        name = match.url_name if match is not None else url_name(request.path_info)
+        preloads = getattr(request, PRELOAD_ATTR, None)
+        if preloads:
+            links = link_values(preloads)
+            if name:
+                _learned[name] = links
+        else:
+            links = _learned.get(name)
+        if links:
+            existing = response.get('Link')
+            response['Link'] = ', '.join([existing, *links] if existing else links)
+        return response
+
+
+class EarlyHintsMiddleware:
+    """ASGI wrapper around the Django application (baseproject/asgi.py)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD')
+            and EARLY_HINT in (scope.get('extensions') or {})
+            and getattr(settings, 'EARLY_HINTS_ENABLED', False)
+        ):
+            path = scope['path']
+            root_path = scope.get('root_path', '')
+            if root_path and path.startswith(root_path):
+                path = path[len(root_path):]
+            links = learned_links(path)
+            if links:
+                await send({'type': EARLY_HINT, 'links': [link.encode('latin-1') for link in links]})
+        await self.app(scope, receive, send)
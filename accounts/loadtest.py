@@ -0,0 +1,232 @@
+# accounts/loadtest.py
+"""HTTP load generator that walks real shopper journeys against a running server."""
+import http.client
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html import unescape
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from .benchmark import _percentile
+
+PRODUCT_LINK_RE = re.compile(r'href="/product/(\d+)/"')
+PRODUCT_NAME_RE = re.compile(r'<h3 class="product-name">([^<]+)</h3>')
+SHOP_MORE_RE = re.compile(r'<div class="shop-more" data-url="([^"]+)"')
+# Product fragments (another tab, or further down one) loaded per journey.
+MORE_PAGES = 2
+
+STEPS = [
+    'login',
+    'shopnow',
+    'shopnow_products',
+    'product_detail',
+    'search_ajax',
+    'add_to_cart',
+    'cart_data_api',
+    'update_cart_item',
+    'payment_page',
+]
+
+
+class StepStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = {}
+        self.errors = {}
+
+    def record(self, step, elapsed_ms, ok):
+        with self.lock:
+            self.timings.setdefault(step, []).append(elapsed_ms)
+            if not ok:
+                self.errors[step] = self.errors.get(step, 0) + 1
+
+    def summary(self, wall_seconds):
+        rows = []
+        for step in STEPS:
+            samples = self.timings.get(step)
+            if not samples:
+                continue
+            rows.append({
+                'step': step,
+                'requests': len(samples),
+                'errors': self.errors.get(step, 0),
+                'rps': round(len(samples) / wall_seconds, 2),
+                'p50_ms': round(_percentile(samples, 50), 2),
+                'p90_ms': round(_percentile(samples, 90), 2),
+                'p99_ms': round(_percentile(samples, 99), 2),
+                'max_ms': round(max(samples), 2),
+            })
+        total = sum(row['requests'] for row in rows)
+        return {
+            'wall_seconds': round(wall_seconds, 3),
+            'requests': total,
+            'errors': sum(row['errors'] for row in rows),
+            'rps': round(total / wall_seconds, 2) if wall_seconds else 0,
+            'steps': rows,
+        }
+
+
+class VirtualUser:
+    """One shopper: a keep-alive connection plus its own cookies (session and CSRF)."""
+
+    def __init__(self, base_url, stats, rng, username=None, password=None, think_time=0.0, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.stats = stats
+        self.rng = rng
+        self.username = username
+        self.password = password
+        self.think_time = think_time
+        self.timeout = timeout
+        self.cookies = {}
+        self.conn = None
+        self.product_ids = []
+        self.search_words = []
+
+    # ----- transport -----
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self.conn = cls(self.host, self.port, timeout=self.timeout)
+
+    def _store_cookies(self, response):
+        # Cookies are kept even when flagged Secure: the harness usually talks
+        # plain HTTP to a local server while settings mark cookies secure.
+        for header in response.headers.get_all('Set-Cookie') or []:
+            jar = SimpleCookie()
+            jar.load(header)
+            for name, morsel in jar.items():
+                if morsel.value and morsel['max-age'] != '0':
+                    self.cookies[name] = morsel.value
+                else:
+                    self.cookies.pop(name, None)
+
+    def request(self, method, path, body=None, headers=None):
+        all_headers = {'User-Agent': 'wendywoo-loadtest', 'Accept': 'text/html,application/json'}
+        if self.cookies:
+            all_headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        all_headers.update(headers or {})
+        for attempt in (1, 2):
+            if self.conn is None:
+                self._connect()
+            try:
+                self.conn.request(method, path, body=body, headers=all_headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                # Server closed the keep-alive connection; reconnect once.
+                self.conn.close()
+                self.conn = None
+                if attempt == 2:
+                    raise
+        self._store_cookies(response)
+        if response.getheader('Connection', '').lower() == 'close':
+            self.conn.close()
+            self.conn = None
+        return response.status, data
+
+    def step(self, name, method, path, body=None, headers=None, expect=(200,)):
+        start = time.perf_counter()
+        try:
+            status, data = self.request(method, path, body, headers)
+        except (http.client.HTTPException, OSError):
+            status, data = 0, b''
+        self.stats.record(name, (time.perf_counter() - start) * 1000, status in expect)
+        if self.think_time:
+            time.sleep(self.rng.uniform(0, self.think_time))
+        return status, data
+
+    def csrf_headers(self):
+        return {'X-CSRFToken': self.cookies.get('csrftoken', '')}
+
+    # ----- journey -----
+    def login(self):
+        # The login page sets the csrftoken cookie that the cart API also needs.
+        self.request('GET', '/login/')
+        if not (self.username and self.password):
+            return
+        body = urlencode({
+            'username': self.username,
+            'password': self.password,
+            'csrfmiddlewaretoken': self.cookies.get('csrftoken', ''),
+        })
+        self.step('login', 'POST', '/login/', body,
+                  {'Content-Type': 'application/x-www-form-urlencoded', **self.csrf_headers()}, expect=(302,))
+
+    def journey(self):
+        status, html = self.step('shopnow', 'GET', '/shopnow/')
+        pages = [html.decode('utf-8', 'replace')] if status == 200 else []
+        # Only the first tab's first page comes with /shopnow/; the rest are
+        # fetched from the .shop-more sentinels as the shopper browses.
+        more = SHOP_MORE_RE.findall(pages[0]) if pages else []
+        for _ in range(MORE_PAGES):
+            if not more:
+                break
+            url = more.pop(self.rng.randrange(len(more)))
+            status, data = self.step('shopnow_products', 'GET', unescape(url))
+            if status == 200:
+                pages.append(data.decode('utf-8', 'replace'))
+                more += SHOP_MORE_RE.findall(pages[-1])
+        self.product_ids = sorted({pk for page in pages for pk in PRODUCT_LINK_RE.findall(page)})
+        self.search_words = [
+            w for page in pages for name in PRODUCT_NAME_RE.findall(page) for w in name.split() if len(w) > 3
+        ]
+        if not self.product_ids:
+            return
+
+        product_id = self.rng.choice(self.product_ids)
+        self.step('product_detail', 'GET', f'/product/{product_id}/')
+
+        # Typing in the search box fires a request from the third character on.
+        word = self.rng.choice(self.search_words) if self.search_words else 'cake'
+        for length in range(3, min(len(word), 6) + 1):
+            self.step('search_ajax', 'GET', '/api/search/?' + urlencode({'q': word[:length]}))
+
+        self.step('add_to_cart', 'GET', f'/add-to-cart/{product_id}/', expect=(302,))
+        self.step('cart_data_api', 'GET', '/api/cart/data/')
+        body = json.dumps({'item_id': product_id, 'quantity': self.rng.randint(1, 4)})
+        self.step('update_cart_item', 'POST', '/api/cart/update/', body,
+                  {'Content-Type': 'application/json', **self.csrf_headers()})
+        # Anonymous shoppers are redirected to the login page here.
+        expect = (200,) if self.username else (302,)
+        self.step('payment_page', 'GET', '/checkout/payment/', expect=expect)
+
+    def run(self, deadline=None, iterations=None):
+        self.login()
+        done = 0
+        while True:
+            if iterations is not None and done >= iterations:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            self.journey()
+            done += 1
+        if self.conn is not None:
+            self.conn.close()
+        return done
+
+
+def run_load_test(base_url, users=10, duration=None, iterations=None, username=None, password=None,
+                  think_time=0.0, seed=1):
+    """Run `users` concurrent shoppers until `duration` seconds pass or each finishes `iterations` journeys."""
+    if duration is None and iterations is None:
+        iterations = 1
+    stats = StepStats()
+    rng = random.Random(seed)
+    shoppers = [
+        VirtualUser(base_url, stats, random.Random(rng.random()), username, password, think_time)
+        for _ in range(users)
+    ]
+    start = time.monotonic()
+    deadline = start + duration if duration else None
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        journeys = sum(pool.map(lambda shopper: shopper.run(deadline, iterations), shoppers))
+    report = stats.summary(time.monotonic() - start)
+    report.update({'base_url': base_url, 'users': users, 'journeys': journeys})
+    return report
@@ -0,0 +1,205 @@
+# accounts/maintenance.py
+"""
+Chunked clean-up jobs behind `manage.py purge_stale`.
+
+- sessions: expired sessions (what `clearsessions` deletes).
+- carts: anonymous sessions holding a cart nobody has touched for
+  ABANDONED_CART_AGE seconds.
+- signups: accounts that never verified their email (SignUpView creates
+  them inactive) and are older than UNVERIFIED_SIGNUP_AGE.
+- changes: catalog change log entries older than CATALOG_CHANGES_RETENTION.
+  The newest entry is always kept, so a client with an older cursor gets a
+  410 from /api/v1/changes/ and resyncs.
+
+`clearsessions` deletes everything in one statement, and SQLite holds its
+single write lock for the whole of it. Here each job walks its table by an
+index (keyset, never OFFSET) and deletes at most `batch_size` rows per
+transaction, sleeping `pause` seconds between batches so that live
+requests get the lock in between. Verification and password-reset tokens
+are signed and not stored, so there is no token table to clean.
+"""
+import time
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .changes import latest_cursor
+from .models import CatalogChange
+
+BATCH_SIZE = 200
+PAUSE = 0.05
+DAY = 24 * 60 * 60
+
+
+def session_store():
+    return import_module(settings.SESSION_ENGINE).SessionStore
+
+
+def keyset(queryset, batch_size):
+    """Lists of at most batch_size pks of `queryset`, in pk order."""
+    after = None
+    while True:
+        page = queryset if after is None else queryset.filter(pk__gt=after)
+        ids = list(page.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        after = ids[-1]
+        yield ids
+        if len(ids) < batch_size:
+            return
+
+
+def session_rows(queryset, batch_size):
+    """Lists of (session_key, session_data), walked along the expire_date index."""
+    after = None
+    while True:
+        page = queryset
+        if after is not None:
+            page = page.filter(Q(expire_date__gt=after[0]) | Q(expire_date=after[0], session_key__gt=after[1]))
+        rows = list(
+            page.order_by('expire_date', 'session_key')
+            .values_list('expire_date', 'session_key', 'session_data')[:batch_size]
+        )
+        if not rows:
+            return
+        after = rows[-1][:2]
+        yield [row[1:] for row in rows]
+        if len(rows) < batch_size:
+            return
+
+
+# ===== SELECTIONS =====
+# What each job deletes. Rows are picked outside the delete transaction, so
+# the delete applies the same condition again: a session saved in between
+# (a visitor back at their cart) or an account verified in between is kept.
+def expired(now):
+    return Session.objects.filter(expire_date__lt=now)
+
+
+def idle_sessions(now):
+    # A session's expiry is reset to SESSION_COOKIE_AGE from its last save.
+    age = getattr(settings, 'ABANDONED_CART_AGE', 7 * DAY)
+    untouched_before = now + timedelta(seconds=settings.SESSION_COOKIE_AGE - age)
+    return Session.objects.filter(expire_date__gte=now, expire_date__lt=untouched_before)
+
+
+def stale_signups(now):
+    age = getattr(settings, 'UNVERIFIED_SIGNUP_AGE', 7 * DAY)
+    return User.objects.filter(
+        is_active=False, is_staff=False, last_login__isnull=True, date_joined__lt=now - timedelta(seconds=age),
+    )
+
+
+def stale_changes(now):
+    age = getattr(settings, 'CATALOG_CHANGES_RETENTION', 30 * DAY)
+    return CatalogChange.objects.filter(changed_at__lt=now - timedelta(seconds=age), pk__lt=latest_cursor())
+
+
+# ===== JOBS =====
+# Each job yields lists of primary keys to delete (possibly empty, when a
+# batch it read held nothing to delete).
+def expired_sessions(now, batch_size, dry_run):
+    queryset = expired(now)
+    if dry_run:
+        for rows in session_rows(queryset, batch_size):
+            yield [key for key, _ in rows]
+        return
+    # Everything read is deleted (or no longer expired), so each batch is
+    # just the oldest rows left: a plain range scan of the expire_date
+    # index, even when many sessions share an expiry time.
+    while True:
+        keys = list(queryset.order_by('expire_date').values_list('session_key', flat=True)[:batch_size])
+        if not keys:
+            return
+        yield keys
+        if len(keys) < batch_size:
+            return
+
+
+def abandoned_carts(now, batch_size, dry_run):
+    store = session_store()()
+    for rows in session_rows(idle_sessions(now), batch_size):
+        keys = []
+        for key, data in rows:
+            session = store.decode(data)
+            if session.get('cart') and SESSION_KEY not in session:
+                keys.append(key)
+        yield keys
+
+
+def unverified_signups(now, batch_size, dry_run):
+    yield from keyset(stale_signups(now), batch_size)
+
+
+def old_changes(now, batch_size, dry_run):
+    yield from keyset(stale_changes(now), batch_size)
+
+
+# Each delete runs inside the batch's transaction and returns how many of
+# `ids` it deleted.
+def delete_sessions(keys, now):
+    return expired(now).filter(session_key__in=keys).delete()[0]
+
+
+def delete_carts(keys, now):
+    keys = list(idle_sessions(now).filter(session_key__in=keys).values_list('session_key', flat=True))
+    Session.objects.filter(session_key__in=keys).delete()
+    # cached_db keeps a copy of live sessions in the cache as well.
+    store = session_store()
+    if keys and hasattr(store, 'cache_key'):
+        caches[settings.SESSION_CACHE_ALIAS].delete_many([store(session_key=key).cache_key for key in keys])
+    return len(keys)
+
+
+def delete_users(ids, now):
+    return stale_signups(now).filter(pk__in=ids).delete()[1].get(User._meta.label, 0)
+
+
+def delete_changes(ids, now):
+    return stale_changes(now).filter(pk__in=ids).delete()[0]
+
+
+# name -> (batches, delete)
+JOBS = {
+    'sessions': (expired_sessions, delete_sessions),
+    'carts': (abandoned_carts, delete_carts),
+    'signups': (unverified_signups, delete_users),
+    'changes': (old_changes, delete_changes),
+}
+
+
+def run_job(name, batch_size=BATCH_SIZE, pause=PAUSE, dry_run=False, progress=None, now=None):
+    """
+    Run one job. Returns {'deleted', 'batches', 'slowest_ms'}, where
+    slowest_ms is the longest a delete transaction held the write lock.
+    progress(name, deleted so far, ms held by the last batch) is called
+    after each batch.
+    """
+    batches, delete = JOBS[name]
+    now = now or timezone.now()
+    stats = {'deleted': 0, 'batches': 0, 'slowest_ms': 0.0}
+    for ids in batches(now, batch_size, dry_run):
+        if not ids:
+            continue
+        held, deleted = 0.0, len(ids)
+        if not dry_run:
+            start = time.perf_counter()
+            with transaction.atomic():
+                deleted = delete(ids, now)
+            held = (time.perf_counter() - start) * 1000
+        stats['deleted'] += deleted
+        stats['batches'] += 1
+        stats['slowest_ms'] = max(stats['slowest_ms'], held)
+        if progress is not None:
+            progress(name, stats['deleted'], held)
+        if pause and not dry_run:
+            time.sleep(pause)
+    return stats
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.benchmark import build_report, run_login_benchmarks, save_report
+
+
+class Command(BaseCommand):
+    help = 'Measure the CPU cost of a login, and logins per second per core, for each password hasher profile.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10, help='Timed logins per profile.')
+        parser.add_argument('--profiles', help='Comma separated PASSWORD_HASHER_PROFILES to measure (default: all).')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+
+    def handle(self, *args, **options):
+        profiles = [name for name in (options['profiles'] or '').split(',') if name]
+        unknown = [name for name in profiles if name not in settings.PASSWORD_HASHER_PROFILES]
+        if unknown:
+            raise CommandError(
+                f"Unknown profile(s) {', '.join(unknown)}; "
+                f"choose from {', '.join(settings.PASSWORD_HASHER_PROFILES)}"
+            )
+
+        results, skipped = run_login_benchmarks(profiles, repeat=options['repeat'])
+        self.stdout.write(f'Active profile: {settings.PASSWORD_HASHER_PROFILE}')
+        self.stdout.write(
+            f"{'profile':<10}{'hasher':<16}{'status':>7}{'check ms':>10}{'login cpu ms':>14}"
+            f"{'login p50 ms':>14}{'logins/s/core':>15}"
+        )
+        for row in results:
+            self.stdout.write(
+                f"{row['profile']:<10}{row['hasher']:<16}{row['status']:>7}{row['check_cpu_ms']:>10.1f}"
+                f"{row['login_cpu_ms']:>14.1f}{row['login_p50_ms']:>14.1f}{row['logins_per_sec_per_core']:>15}"
+            )
+        for profile in skipped:
+            self.stdout.write(self.style.WARNING(f'Skipped {profile}: its hasher library is not installed'))
+
+        if options['output']:
+            save_report(build_report(results), options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
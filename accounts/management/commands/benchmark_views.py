@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.benchmark import build_report, compare_reports, load_report, run_benchmarks, save_report
+
+
+class Command(BaseCommand):
+    help = 'Measure latency and query counts of the hot views through the Django test client.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per scenario.')
+        parser.add_argument('--cart-sizes', default='1,10,50', help='Comma separated cart sizes to measure.')
+        parser.add_argument('--search', default='Butter', help='Search term for search_ajax.')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--compare', help='Previous JSON results to check for regressions.')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Allowed p50 slowdown against --compare (0.25 = 25%%).')
+
+    def handle(self, *args, **options):
+        try:
+            cart_sizes = tuple(int(size) for size in options['cart_sizes'].split(',') if size)
+        except ValueError:
+            raise CommandError('--cart-sizes must be a comma separated list of integers')
+
+        try:
+            results = run_benchmarks(repeat=options['repeat'], cart_sizes=cart_sizes, search_term=options['search'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        report = build_report(results)
+
+        self.stdout.write(f"Dataset: {report['meta']['dataset']}")
+        self.stdout.write(f"{'scenario':<32}{'status':>7}{'queries':>9}{'p50 ms':>10}{'p95 ms':>10}{'bytes':>10}")
+        for row in results:
+            self.stdout.write(
+                f"{row['name']:<32}{row['status']:>7}{row['queries']:>9}"
+                f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['bytes']:>10}"
+            )
+
+        if options['output']:
+            save_report(report, options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['compare']:
+            regressions = compare_reports(load_report(options['compare']), report, options['threshold'])
+            if regressions:
+                for line in regressions:
+                    self.stdout.write(self.style.ERROR(f'REGRESSION {line}'))
+                raise CommandError(f'{len(regressions)} regression(s) against {options["compare"]}')
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
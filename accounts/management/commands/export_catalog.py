@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from accounts.catalog_io import BATCH_SIZE, FORMATS, export_catalog, guess_format
+
+
+class Command(BaseCommand):
+    help = 'Stream every product to CSV or JSON Lines (stdout by default).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help='File to write; the format follows its extension.')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['output']
+        fmt = options['format'] or guess_format(path)
+        if path and path != '-':
+            with open(path, 'w', encoding='utf-8', newline='') as fh:
+                count = export_catalog(fh, fmt, options['batch_size'])
+            self.stderr.write(self.style.SUCCESS(f'Exported {count} products to {path}'))
+        else:
+            count = export_catalog(self.stdout, fmt, options['batch_size'])
+            self.stderr.write(self.style.SUCCESS(f'Exported {count} products'))
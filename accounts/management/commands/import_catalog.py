@@ -0,0 +1,54 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.catalog_io import BATCH_SIZE, FORMATS, guess_format, import_catalog
+
+
+class Command(BaseCommand):
+    help = 'Create or update products from a CSV or JSON Lines file (see export_catalog for the columns).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV/JSONL file, or '-' for stdin.")
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--images-dir', help='Directory that relative image paths in the file point into.')
+        parser.add_argument('--workers', type=int, default=8, help='Parallel image downloads/copies.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and roll back; no images are copied.')
+        parser.add_argument(
+            '--atomic', action='store_true',
+            help='Import everything or nothing, in one transaction. Blocks other writes until it finishes.',
+        )
+        parser.add_argument('--max-errors', type=int, default=20, help='Invalid rows listed in the output.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        kwargs = {
+            'fmt': fmt,
+            'batch_size': options['batch_size'],
+            'images_dir': options['images_dir'],
+            'workers': options['workers'],
+            'dry_run': options['dry_run'],
+            'atomic': options['atomic'],
+            'stdout': self.stdout,
+        }
+        if path == '-':
+            stats = import_catalog(sys.stdin, **kwargs)
+        else:
+            try:
+                with open(path, encoding='utf-8-sig', newline='') as fh:
+                    stats = import_catalog(fh, **kwargs)
+            except FileNotFoundError:
+                raise CommandError(f'No such file: {path}')
+
+        for number, error in stats['errors'][:options['max_errors']]:
+            self.stdout.write(self.style.WARNING(f'line {number}: {error}'))
+        if len(stats['errors']) > options['max_errors']:
+            self.stdout.write(self.style.WARNING(f"... and {len(stats['errors']) - options['max_errors']} more"))
+        prefix = 'Dry run: would have ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}created {stats['created']} and updated {stats['updated']} products "
+            f"({stats['unchanged']} unchanged), "
+            f"{stats['categories']} new categories, {stats['images']} images; {len(stats['errors'])} rows skipped"
+        ))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.benchmark import save_report
+from accounts.loadtest import run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive shopper journeys against a running server and report throughput and latency per step. '
+        'All shoppers share one IP, so start the server with THROTTLE_ENABLED=0.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server under test.')
+        parser.add_argument('--users', type=int, default=10, help='Concurrent virtual shoppers.')
+        parser.add_argument('--duration', type=float, help='Run for this many seconds.')
+        parser.add_argument('--iterations', type=int, help='Journeys per shopper (default 1 without --duration).')
+        parser.add_argument('--username', help='Log shoppers in with this account to reach payment_page.')
+        parser.add_argument('--password')
+        parser.add_argument('--think-time', type=float, default=0.0, help='Max random pause between steps (s).')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Write the report to this JSON file.')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('--users must be at least 1')
+        if bool(options['username']) != bool(options['password']):
+            raise CommandError('--username and --password go together')
+
+        report = run_load_test(
+            options['url'],
+            users=options['users'],
+            duration=options['duration'],
+            iterations=options['iterations'],
+            username=options['username'],
+            password=options['password'],
+            think_time=options['think_time'],
+            seed=options['seed'],
+        )
+
+        self.stdout.write(
+            f"{report['journeys']} journeys, {report['requests']} requests in {report['wall_seconds']}s "
+            f"({report['rps']} req/s, {report['errors']} errors) against {report['base_url']}"
+        )
+        self.stdout.write(f"{'step':<18}{'reqs':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}")
+        for row in report['steps']:
+            self.stdout.write(
+                f"{row['step']:<18}{row['requests']:>7}{row['errors']:>8}{row['rps']:>9}"
+                f"{row['p50_ms']:>9}{row['p90_ms']:>9}{row['p99_ms']:>9}"
+            )
+
+        if options['output']:
+            save_report(report, options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
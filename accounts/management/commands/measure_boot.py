@@ -0,0 +1,61 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.bootstats import measure_boot
+
+
+class Command(BaseCommand):
+    help = 'Start gunicorn with gunicorn.conf.py and report cold start time and per-worker memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--worker-class', default='sync', choices=['sync', 'gthread', 'uvicorn'])
+        parser.add_argument('--path', default='/', help='URL polled until the server answers.')
+        parser.add_argument('--requests', type=int, default=20, help='Warm-up requests per worker.')
+        parser.add_argument('--compare-preload', action='store_true',
+                            help='Measure with and without preload_app.')
+        parser.add_argument('--no-preload', action='store_true')
+        parser.add_argument('--output', help='Write the reports as JSON to this file.')
+
+    def handle(self, *args, **options):
+        if options['compare_preload']:
+            variants = [True, False]
+        else:
+            variants = [not options['no_preload']]
+
+        reports = []
+        for preload in variants:
+            try:
+                report = measure_boot(port=options['port'], workers=options['workers'],
+                                      worker_class=options['worker_class'], preload=preload,
+                                      path=options['path'], requests=options['requests'])
+            except RuntimeError as e:
+                raise CommandError(str(e))
+            reports.append(report)
+            self.print_report(report)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                json.dump(reports, fh, indent=2)
+                fh.write('\n')
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def print_report(self, report):
+        def mib(kb):
+            return '-' if kb is None else f'{kb / 1024:.1f}'
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['worker_class']} x{report['workers']}, preload={'on' if report['preload'] else 'off'}: "
+            f"first response (HTTP {report['first_status']}) after {report['cold_start_ms']} ms"
+        ))
+        self.stdout.write(f"{'process':<16}{'RSS MiB':>10}{'PSS MiB':>10}{'shared MiB':>12}")
+        rows = [('master', report['master'] or {})]
+        rows += [(f"worker {row['pid']}", row) for row in report['worker_memory']]
+        for label, memory in rows:
+            self.stdout.write(
+                f"{label:<16}{mib(memory.get('rss_kb')):>10}{mib(memory.get('pss_kb')):>10}"
+                f"{mib(memory.get('shared_kb')):>12}"
+            )
+        self.stdout.write(f"total PSS: {mib(report['total_pss_kb'])} MiB\n")
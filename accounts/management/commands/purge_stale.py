@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.maintenance import BATCH_SIZE, JOBS, PAUSE, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired sessions, abandoned anonymous carts, never-verified signups and old change log '
+        'entries in small batches with pauses in between (run periodically, e.g. nightly).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('jobs', nargs='*', metavar='job', help=f"Jobs to run: {', '.join(JOBS)} (default: all).")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows deleted per transaction.')
+        parser.add_argument('--pause', type=float, default=PAUSE, help='Seconds to sleep between batches.')
+        parser.add_argument('--dry-run', action='store_true', help='Count what would be deleted.')
+        parser.add_argument('--progress-every', type=int, default=10, help='Report every N batches.')
+
+    def handle(self, *args, **options):
+        unknown = [name for name in options['jobs'] if name not in JOBS]
+        if unknown:
+            raise CommandError(f"Unknown job(s) {', '.join(unknown)}; choose from {', '.join(JOBS)}")
+        every = max(options['progress_every'], 1)
+        batches = 0
+
+        def progress(name, deleted, held_ms):
+            nonlocal batches
+            batches += 1
+            if batches % every == 0:
+                self.stdout.write(f'  {name}: {deleted} so far (last batch held the lock {held_ms:.1f} ms)')
+
+        for name in options['jobs'] or JOBS:
+            batches = 0
+            start = time.perf_counter()
+            stats = run_job(
+                name, batch_size=options['batch_size'], pause=options['pause'],
+                dry_run=options['dry_run'], progress=progress,
+            )
+            verb = 'Would delete' if options['dry_run'] else 'Deleted'
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: {verb} {stats['deleted']} in {stats['batches']} batches "
+                f"(slowest {stats['slowest_ms']:.1f} ms) in {time.perf_counter() - start:.1f}s"
+            ))
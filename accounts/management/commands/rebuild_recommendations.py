@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.recommendations import rebuild_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recompute "customers also liked" and "top rated in category" (run periodically, e.g. nightly).'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        counts = rebuild_recommendations()
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {counts['related']} related-product and {counts['bestsellers']} bestseller rows "
+            f"in {time.perf_counter() - start:.1f}s"
+        ))
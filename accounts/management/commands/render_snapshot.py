@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.snapshots import render_snapshots, snapshot_key, snapshot_root
+
+
+class Command(BaseCommand):
+    help = 'Pre-render the anonymous main/menu/location/shopnow/product pages as precompressed HTML.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-products', action='store_true', help='Skip the product pages.')
+        parser.add_argument('--clear', action='store_true', help='Re-render pages that already have a snapshot.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        rendered, existing, skipped = render_snapshots(
+            products=not options['no_products'], clear=options['clear'],
+        )
+        if skipped:
+            self.stdout.write(self.style.WARNING(f'{skipped} pages could not be snapshotted (error or cookie set)'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {rendered} pages ({existing} already current) into '
+            f'{snapshot_root()}/{snapshot_key()} in {time.perf_counter() - start:.1f}s'
+        ))
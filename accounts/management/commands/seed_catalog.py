@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from accounts.benchmark import clear_seed_data, seed_catalog
+
+
+class Command(BaseCommand):
+    help = 'Seed a reproducible benchmark catalog (categories, products, users, reviews).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=50)
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--reviews', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=1, help='Random seed; same seed gives the same data.')
+        parser.add_argument('--clear', action='store_true', help='Remove previously seeded data first.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            clear_seed_data()
+            self.stdout.write('Cleared previous seed data')
+
+        summary = seed_catalog(
+            categories=options['categories'],
+            products=options['products'],
+            reviews=options['reviews'],
+            users=options['users'],
+            seed=options['seed'],
+            stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Seeded catalog: {summary}'))
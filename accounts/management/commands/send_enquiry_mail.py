@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from accounts.enquiries import send_enquiry_mail
+
+
+class Command(BaseCommand):
+    help = (
+        'Send waiting enquiry confirmations, and with --digest one staff digest of new enquiries, '
+        'over a single SMTP connection (run periodically, e.g. every minute and hourly with --digest).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--digest', action='store_true', help='Also send the staff digest.')
+
+    def handle(self, *args, **options):
+        counts = send_enquiry_mail(digest=options['digest'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {counts['confirmations']} confirmation(s) ({counts['refused']} refused); "
+            f"{counts['digest']} enquiry(ies) in the digest"
+        ))
@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.startup import TARGETS, measure_startup, slowest
+
+
+class Command(BaseCommand):
+    help = 'Measure interpreter startup with `python -X importtime` and list the slowest imports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', help=f"What to start: {', '.join(TARGETS)} (default: all).")
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per target; wall time is the median.')
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument('--self-time', action='store_true',
+                            help='Rank modules by their own import time instead of cumulative.')
+        parser.add_argument('--project-only', action='store_true', help='Only list accounts/baseproject modules.')
+        parser.add_argument('--output', help='Write the full reports as JSON to this file.')
+
+    def handle(self, *args, **options):
+        key = 'self_us' if options['self_time'] else 'cumulative_us'
+        targets = options['targets'] or list(TARGETS)
+        unknown = set(targets) - set(TARGETS)
+        if unknown:
+            raise CommandError(f"Unknown target(s): {', '.join(sorted(unknown))}")
+        reports = []
+        for target in targets:
+            try:
+                report = measure_startup(target, repeat=options['repeat'])
+            except RuntimeError as e:
+                raise CommandError(str(e))
+            reports.append(report)
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{target}: {report['wall_ms']} ms wall (median of {options['repeat']}), "
+                f"{report['import_ms']} ms importing {report['modules']} modules"
+            ))
+            if not report['bytecode_cache']:
+                self.stdout.write(self.style.WARNING(
+                    '  No up-to-date .pyc for the project: its modules are compiled on every start '
+                    '(run `python -m compileall -q .` as part of the build).'
+                ))
+            for row in slowest(report['imports'], key, options['top'], options['project_only']):
+                self.stdout.write(
+                    f"  {row['cumulative_us'] / 1000:8.1f} ms  {row['self_us'] / 1000:7.1f} ms self  {row['module']}"
+                )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                json.dump(reports, fh, indent=2)
+                fh.write('\n')
+            self.stdout.write(f"Report written to {options['output']}")
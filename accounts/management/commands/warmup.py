@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from accounts.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = 'Compile all templates and prime the catalog cache (what each worker does at boot).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-catalog', action='store_true', help='Only compile templates.')
+
+    def handle(self, *args, **options):
+        result = warm_up(prime=not options['no_catalog'])
+        for name, error in result['failed'].items():
+            self.stdout.write(self.style.WARNING(f'{name}: {error}'))
+        self.stdout.write(self.style.SUCCESS(
+            f"Compiled {len(result['templates'])} templates, cached {result['categories']} categories "
+            f"in {result['elapsed_ms']:.0f} ms"
+        ))
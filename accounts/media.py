@@ -0,0 +1,124 @@
+# accounts/media.py
+"""Serving uploaded media (product and review images) in production."""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+# Names written by HashedMediaStorage: "photo.<12 hex chars>.jpg".
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+class RangedFile:
+    """Read-only view of `length` bytes of an open file, starting at `start`."""
+
+    def __init__(self, fh, start, length):
+        self.fh = fh
+        self.remaining = length
+        fh.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fh.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.fh.close()
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single satisfiable byte range, None to ignore it, or 'invalid'."""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None  # multipart or malformed ranges: send the whole file
+    first, last = match.groups()
+    if first == '':
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return 'invalid'
+    return start, end
+
+
+def cache_control(name):
+    if HASHED_NAME_RE.search(name):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={getattr(settings, "MEDIA_MAX_AGE", 3600)}'
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve a MEDIA_ROOT file with ETag/Last-Modified revalidation and byte
+    ranges. Whole files go out as FileResponse so the WSGI server can use
+    sendfile(); with MEDIA_ACCEL_REDIRECT_PREFIX set, nginx sends the bytes
+    and this view only checks the path and sets the caching headers.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Media file not found')
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404('Media file not found')
+    if not os.path.isfile(full_path):
+        raise Http404('Media file not found')
+
+    etag = quote_etag(f'{stat.st_size:x}-{int(stat.st_mtime):x}')
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': cache_control(path),
+        'Accept-Ranges': 'bytes',
+    }
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        for key, value in headers.items():
+            not_modified[key] = value
+        return not_modified
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    accel_prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '')
+    if accel_prefix:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + path.lstrip('/')
+        for key, value in headers.items():
+            response[key] = value
+        return response
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and request.META.get('HTTP_IF_RANGE', etag) == etag:
+        byte_range = parse_range(range_header, stat.st_size)
+    if byte_range == 'invalid':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+
+    fh = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(fh, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(RangedFile(fh, start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    for key, value in headers.items():
+        response[key] = value
+    return response
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryBestseller',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bestsellers', to='accounts.category')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.product')),
+            ],
+            options={
+                'ordering': ['category', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('category', 'rank'), name='category_bestseller_rank_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_products', to='accounts.product')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.product')),
+            ],
+            options={
+                'ordering': ['product', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('product', 'rank'), name='related_product_rank_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:12
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_catalog_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('kind', models.CharField(choices=[('percent', 'Percentage off'), ('multibuy', 'Multi-buy (N for a fixed price)')], max_length=10)),
+                ('percent_off', models.PositiveSmallIntegerField(blank=True, help_text='Percentage off: e.g. 20 for 20% off.', null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(100)])),
+                ('bundle_quantity', models.PositiveSmallIntegerField(blank=True, help_text='Multi-buy: how many items make a bundle.', null=True, validators=[django.core.validators.MinValueValidator(2)])),
+                ('bundle_price', models.PositiveIntegerField(blank=True, help_text='Multi-buy: the price of one bundle, in yen.', null=True)),
+                ('starts_at', models.DateTimeField(blank=True, null=True)),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('categories', models.ManyToManyField(blank=True, related_name='promotions', to='accounts.category')),
+                ('products', models.ManyToManyField(blank=True, related_name='promotions', to='accounts.product')),
+            ],
+            options={
+                'ordering': ['-starts_at', 'name'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:16
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_promotions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Store',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('address', models.CharField(max_length=255)),
+                ('phone', models.CharField(blank=True, max_length=30)),
+                ('latitude', models.FloatField(validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)])),
+                ('longitude', models.FloatField(validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)])),
+                ('weekday_hours', models.CharField(blank=True, help_text='e.g. 9:00 AM - 8:00 PM', max_length=50)),
+                ('weekend_hours', models.CharField(blank=True, max_length=50)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('unavailable_products', models.ManyToManyField(blank=True, help_text='Products this store does not sell.', related_name='unavailable_at', to='accounts.product')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+    ]
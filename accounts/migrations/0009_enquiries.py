@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_stores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Enquiry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inquiry_type', models.CharField(choices=[('orders', 'Orders'), ('product_ingredients', 'Product Ingredients'), ('others', 'Others')], max_length=30)),
+                ('name', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254)),
+                ('message', models.TextField()),
+                ('photo', models.ImageField(blank=True, null=True, upload_to='enquiry_photos/')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('confirmation_sent_at', models.DateTimeField(blank=True, null=True)),
+                ('notified_at', models.DateTimeField(blank=True, null=True)),
+                ('is_resolved', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name_plural': 'enquiries',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('confirmation_sent_at__isnull', True)), fields=['created_at'], name='enquiry_unconfirmed_idx'), models.Index(condition=models.Q(('notified_at__isnull', True)), fields=['created_at'], name='enquiry_unnotified_idx')],
+            },
+        ),
+    ]
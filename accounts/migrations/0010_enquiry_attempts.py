@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_enquiries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enquiry',
+            name='confirmation_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='enquiry',
+            name='confirmation_error',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
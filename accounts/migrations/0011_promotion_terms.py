@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:47
+
+from django.db import migrations, models
+
+
+def deactivate_incomplete(apps, schema_editor):
+    # Rows saved outside the admin form may lack their terms; keep them, off.
+    Promotion = apps.get_model('accounts', 'Promotion')
+    complete = (
+        models.Q(kind='percent', percent_off__isnull=False, percent_off__gte=1, percent_off__lte=100)
+        | models.Q(kind='multibuy', bundle_quantity__isnull=False, bundle_quantity__gte=2, bundle_price__isnull=False)
+    )
+    Promotion.objects.filter(is_active=True).exclude(complete).update(is_active=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_enquiry_attempts'),
+    ]
+
+    operations = [
+        migrations.RunPython(deactivate_incomplete, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='promotion',
+            constraint=models.CheckConstraint(condition=models.Q(('is_active', False), models.Q(('kind', 'percent'), ('percent_off__gte', 1), ('percent_off__isnull', False), ('percent_off__lte', 100)), models.Q(('bundle_price__isnull', False), ('bundle_quantity__gte', 2), ('bundle_quantity__isnull', False), ('kind', 'multibuy')), _connector='OR'), name='promotion_terms_complete'),
+        ),
+    ]
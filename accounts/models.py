@@ -1,19 +1,23 @@
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.contrib.auth.models import User  # Add this import
 
 class Category(models.Model):
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.name
 
 class Product(models.Model):
-    name = models.CharField(max_length=200)
+    name = models.CharField(max_length=200, db_index=True)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     price = models.IntegerField()
     description = models.TextField()
     image = models.ImageField(upload_to='products/')
     is_available = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.name
@@ -23,15 +27,26 @@ class Product(models.Model):
         return reverse('product_detail', kwargs={'product_id': self.id})
 
     # Add these methods INSIDE the Product class
+    # Views annotate avg_rating / num_reviews (see with_review_stats) so that
+    # listing pages don't run two queries per product.
     def average_rating(self):
-        reviews = self.reviews.all()
-        if reviews:
-            return sum(review.rating for review in reviews) / len(reviews)
-        return 0
+        if hasattr(self, 'avg_rating'):
+            return self.avg_rating or 0
+        return self.reviews.aggregate(avg=models.Avg('rating'))['avg'] or 0
     
     def review_count(self):
+        if hasattr(self, 'num_reviews'):
+            return self.num_reviews
         return self.reviews.count()
 
+
+def with_review_stats(queryset):
+    """Annotate products with the values behind average_rating() and review_count()."""
+    return queryset.annotate(
+        avg_rating=models.Avg('reviews__rating'),
+        num_reviews=models.Count('reviews'),
+    )
+
 # Move ProductReview OUTSIDE the Product class
 class ProductReview(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
@@ -40,10 +55,187 @@ class ProductReview(models.Model):
     comment = models.TextField()
     photo = models.ImageField(upload_to='review_photos/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']  # Newest reviews first
+        # For the admin's rating filter and newest-first ordering.
+        indexes = [
+            models.Index(fields=['rating'], name='review_rating_idx'),
+            models.Index(fields=['created_at'], name='review_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.product.name} - {self.rating} Stars"
     
+
+
+# Recommendations are rebuilt in bulk by `manage.py rebuild_recommendations`
+# (see accounts/recommendations.py); product pages only read them.
+class RelatedProduct(models.Model):
+    """Customers who liked `product` also liked `related` (ranked from 1)."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_products')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['product', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='related_product_rank_uniq'),
+        ]
+
+
+class CategoryBestseller(models.Model):
+    """The best rated products of a category (ranked from 1)."""
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='bestsellers')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['category', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'rank'], name='category_bestseller_rank_uniq'),
+        ]
+
+
+class CatalogChange(models.Model):
+    """
+    One row per saved or deleted category, product or review, written in
+    the same transaction as the change itself (see accounts/changes.py).
+    The id only grows, so it doubles as the cursor of the change feed.
+    """
+    KIND_CHOICES = [('category', 'Category'), ('product', 'Product'), ('review', 'Review')]
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{'Deleted' if self.deleted else 'Saved'} {self.kind} {self.object_id}"
+
+
+class Promotion(models.Model):
+    """
+    A discount on the products it covers: the listed products, every product
+    of the listed categories, or the whole shop when both lists are empty.
+    A cart line gets the best promotion covering it; promotions don't stack.
+    Carts are priced by accounts/pricing.py.
+    """
+    PERCENT = 'percent'
+    MULTIBUY = 'multibuy'
+    KIND_CHOICES = [(PERCENT, 'Percentage off'), (MULTIBUY, 'Multi-buy (N for a fixed price)')]
+
+    name = models.CharField(max_length=100)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    percent_off = models.PositiveSmallIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(1), MaxValueValidator(100)],
+        help_text='Percentage off: e.g. 20 for 20% off.',
+    )
+    bundle_quantity = models.PositiveSmallIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(2)],
+        help_text='Multi-buy: how many items make a bundle.',
+    )
+    bundle_price = models.PositiveIntegerField(
+        null=True, blank=True, help_text='Multi-buy: the price of one bundle, in yen.',
+    )
+    products = models.ManyToManyField(Product, blank=True, related_name='promotions')
+    categories = models.ManyToManyField(Category, blank=True, related_name='promotions')
+    starts_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-starts_at', 'name']
+        # Pricing relies on these. An inactive promotion may be incomplete,
+        # but can't be switched on until it isn't. (The isnull tests matter:
+        # a CHECK that comes out NULL passes.)
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(is_active=False)
+                    | models.Q(kind='percent', percent_off__isnull=False, percent_off__gte=1, percent_off__lte=100)
+                    | models.Q(kind='multibuy', bundle_quantity__isnull=False, bundle_quantity__gte=2, bundle_price__isnull=False)
+                ),
+                name='promotion_terms_complete',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        if self.kind == self.PERCENT and not self.percent_off:
+            raise ValidationError({'percent_off': 'Required for a percentage discount.'})
+        if self.kind == self.MULTIBUY and not (self.bundle_quantity and self.bundle_price is not None):
+            raise ValidationError('A multi-buy needs a bundle quantity and a bundle price.')
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            raise ValidationError({'ends_at': 'Must be after the start.'})
+
+
+class Store(models.Model):
+    """A shop branch. The nearest ones are found through accounts/stores.py."""
+    name = models.CharField(max_length=100)
+    address = models.CharField(max_length=255)
+    phone = models.CharField(max_length=30, blank=True)
+    latitude = models.FloatField(validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    weekday_hours = models.CharField(max_length=50, blank=True, help_text='e.g. 9:00 AM - 8:00 PM')
+    weekend_hours = models.CharField(max_length=50, blank=True)
+    unavailable_products = models.ManyToManyField(
+        Product, blank=True, related_name='unavailable_at', help_text='Products this store does not sell.',
+    )
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class Enquiry(models.Model):
+    """
+    A contact-form enquiry. Nothing is mailed while the customer waits:
+    `manage.py send_enquiry_mail` sends the confirmations and the staff
+    digest in batches (accounts/enquiries.py).
+    """
+    TYPE_CHOICES = [
+        ('orders', 'Orders'),
+        ('product_ingredients', 'Product Ingredients'),
+        ('others', 'Others'),
+    ]
+
+    inquiry_type = models.CharField(max_length=30, choices=TYPE_CHOICES)
+    name = models.CharField(max_length=100)
+    email = models.EmailField()
+    message = models.TextField()
+    photo = models.ImageField(upload_to='enquiry_photos/', blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    confirmation_sent_at = models.DateTimeField(null=True, blank=True)
+    # Confirmations the mail server refused, and why the last one was.
+    confirmation_attempts = models.PositiveSmallIntegerField(default=0)
+    confirmation_error = models.CharField(max_length=255, blank=True)
+    # When the enquiry went out in a staff digest.
+    notified_at = models.DateTimeField(null=True, blank=True)
+    is_resolved = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = 'enquiries'
+        # The mail batches only ever look at what is still waiting.
+        indexes = [
+            models.Index(fields=['created_at'], condition=models.Q(confirmation_sent_at__isnull=True),
+                         name='enquiry_unconfirmed_idx'),
+            models.Index(fields=['created_at'], condition=models.Q(notified_at__isnull=True),
+                         name='enquiry_unnotified_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.get_inquiry_type_display()})'
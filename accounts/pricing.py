@@ -0,0 +1,146 @@
+# accounts/pricing.py
+"""
+Cart pricing: the one place line and order totals are worked out, shared
+by the cart page, checkout, the cart API and the cart sidebar.
+
+Live promotions are compiled into lookup tables (by product, by category,
+shop-wide) once per catalog version and cached. Pricing a cart is then a
+single pass over its lines, with dictionary lookups and integer maths and
+no queries beyond loading the cart's products. Start and end times are
+checked while pricing, so a promotion starts and stops on time whatever
+the cache holds.
+"""
+from django.core.cache import cache
+from django.utils import timezone
+
+from .catalog import CATALOG_CACHE_TIMEOUT, catalog_key
+from .models import Product, Promotion
+
+RULE_FIELDS = ['id', 'name', 'kind', 'percent_off', 'bundle_quantity', 'bundle_price', 'starts_at', 'ends_at']
+
+
+def cart_products(cart):
+    """Load every product in the session cart with one query, keyed by the cart's string ids."""
+    ids = []
+    for product_id in cart:
+        try:
+            ids.append(int(product_id))
+        except ValueError:
+            continue
+    return {str(pk): product for pk, product in Product.objects.in_bulk(ids).items()}
+
+
+# ===== RULES =====
+def compile_promotions():
+    """
+    {'products': {product id: [rule, ...]}, 'categories': {category id: [...]},
+    'all': [...]}, where a rule is a tuple of RULE_FIELDS. One query: the
+    joins give a row per (promotion, product, category).
+    """
+    rows = (
+        Promotion.objects.filter(is_active=True).exclude(ends_at__lte=timezone.now())
+        .order_by('id').values_list(*RULE_FIELDS, 'products', 'categories')
+    )
+    rules, scopes = {}, {}
+    for row in rows:
+        rule, product_id, category_id = row[:-2], row[-2], row[-1]
+        if not rule_is_complete(rule):
+            continue
+        rules[rule[0]] = rule
+        products, categories = scopes.setdefault(rule[0], (set(), set()))
+        if product_id is not None:
+            products.add(product_id)
+        if category_id is not None:
+            categories.add(category_id)
+
+    table = {'products': {}, 'categories': {}, 'all': []}
+    for promotion_id, rule in rules.items():
+        products, categories = scopes[promotion_id]
+        if not products and not categories:
+            table['all'].append(rule)
+        for product_id in products:
+            table['products'].setdefault(product_id, []).append(rule)
+        for category_id in categories:
+            table['categories'].setdefault(category_id, []).append(rule)
+    return table
+
+
+def rule_is_complete(rule):
+    """False for a rule missing the terms rule_discount needs (the database rejects these too)."""
+    _, _, kind, percent_off, bundle_quantity, bundle_price, _, _ = rule
+    if kind == Promotion.PERCENT:
+        return percent_off is not None and 1 <= percent_off <= 100
+    if kind == Promotion.MULTIBUY:
+        return bundle_quantity is not None and bundle_quantity >= 2 and bundle_price is not None
+    return False
+
+
+def promotion_rules():
+    key = catalog_key('promotions')
+    table = cache.get(key)
+    if table is None:
+        table = compile_promotions()
+        cache.set(key, table, CATALOG_CACHE_TIMEOUT)
+    return table
+
+
+def rule_discount(rule, price, quantity):
+    """Yen off `quantity` items at `price` under one rule."""
+    _, _, kind, percent_off, bundle_quantity, bundle_price, _, _ = rule
+    if kind == Promotion.PERCENT:
+        return price * quantity * percent_off // 100
+    bundles = quantity // bundle_quantity
+    return max(0, bundles * (price * bundle_quantity - bundle_price))
+
+
+# ===== CARTS =====
+def price_cart(cart, products=None):
+    """
+    Price a session cart ({product id: quantity}). Lines for products that
+    no longer exist are dropped. Returns {'lines', 'total_items',
+    'subtotal', 'discount', 'total'}, where each line has product,
+    quantity, unit_price, subtotal, discount, item_total and promotion
+    (the name of the promotion applied, or None).
+    """
+    if products is None:
+        products = cart_products(cart)
+    table = promotion_rules() if products else None
+    now = timezone.now()
+
+    lines = []
+    total_items = subtotal = discount = 0
+    for product_id, quantity in cart.items():
+        product = products.get(product_id)
+        if product is None or quantity <= 0:
+            continue
+        line_subtotal = product.price * quantity
+        best, applied = 0, None
+        for rule in (
+            *table['products'].get(product.id, ()), *table['categories'].get(product.category_id, ()),
+            *table['all'],
+        ):
+            starts_at, ends_at = rule[6], rule[7]
+            if (starts_at and starts_at > now) or (ends_at and ends_at <= now):
+                continue
+            off = min(rule_discount(rule, product.price, quantity), line_subtotal)
+            if off > best:
+                best, applied = off, rule[1]
+        lines.append({
+            'product': product,
+            'quantity': quantity,
+            'unit_price': product.price,
+            'subtotal': line_subtotal,
+            'discount': best,
+            'item_total': line_subtotal - best,
+            'promotion': applied,
+        })
+        total_items += quantity
+        subtotal += line_subtotal
+        discount += best
+    return {
+        'lines': lines,
+        'total_items': total_items,
+        'subtotal': subtotal,
+        'discount': discount,
+        'total': subtotal - discount,
+    }
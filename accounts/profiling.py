@@ -0,0 +1,120 @@
+# accounts/profiling.py
+"""Opt-in cProfile capture of single requests, for finding out why a page is slow."""
+import random
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+
+PROFILE_QUERY_FLAG = '__profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_NAME_RE = re.compile(r'^(\d{8}T\d{6}-\d{6})_([A-Z]+)_([\w.-]*)\.prof$')
+
+
+def profile_dir():
+    return Path(getattr(settings, 'PROFILER_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def _slug(path):
+    return re.sub(r'[^\w.-]+', '-', path.strip('/'))[:80] or 'root'
+
+
+def list_profiles():
+    """Newest first: dicts with name, method, page slug, size and creation time."""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for entry in directory.iterdir():
+        match = PROFILE_NAME_RE.match(entry.name)
+        if not match:
+            continue
+        stamp, method, slug = match.groups()
+        profiles.append({
+            'name': entry.name,
+            'method': method,
+            'page': slug,
+            'size': entry.stat().st_size,
+            'created': datetime.strptime(stamp, '%Y%m%dT%H%M%S-%f').replace(tzinfo=timezone.utc),
+        })
+    profiles.sort(key=lambda p: p['name'], reverse=True)
+    return profiles
+
+
+def get_profile_path(name):
+    """Path of a stored profile, or None for unknown / unsafe names."""
+    if not PROFILE_NAME_RE.match(name):
+        return None
+    path = profile_dir() / name
+    return path if path.is_file() else None
+
+
+def profile_as_text(path, limit=60):
+    import io
+    import pstats
+
+    out = io.StringIO()
+    stats = pstats.Stats(str(path), stream=out)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+def _prune(directory, keep):
+    stored = sorted(p for p in directory.iterdir() if PROFILE_NAME_RE.match(p.name))
+    for old in stored[:-keep]:
+        old.unlink(missing_ok=True)
+
+
+# ===== MIDDLEWARE =====
+class RequestProfilerMiddleware:
+    """
+    Profile a request when a staff user asks for it (?__profile or an
+    X-Profile header) or when it falls in PROFILER_SAMPLE_RATE. Everything
+    below this middleware is covered: the view, ORM queries and template
+    rendering. Requests that are not profiled only pay for a dict lookup
+    and a substring check.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = float(getattr(settings, 'PROFILER_SAMPLE_RATE', 0) or 0)
+        self.keep = int(getattr(settings, 'PROFILER_KEEP', 50))
+
+    def __call__(self, request):
+        if self.should_profile(request):
+            return self.profile(request)
+        return self.get_response(request)
+
+    def should_profile(self, request):
+        if PROFILE_HEADER in request.META or PROFILE_QUERY_FLAG in request.META.get('QUERY_STRING', ''):
+            return request.user.is_staff
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def profile(self, request):
+        import cProfile
+
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S-%f')
+        name = f'{stamp}_{request.method}_{_slug(request.path)}.prof'
+        profiler.dump_stats(directory / name)
+        _prune(directory, self.keep)
+
+        response['X-Profile-Id'] = name
+        response['Server-Timing'] = f'app;dur={elapsed_ms:.1f}, db;desc="{len(queries)} queries"'
+        return response
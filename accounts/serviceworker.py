@@ -0,0 +1,101 @@
+# accounts/serviceworker.py
+"""
+The service worker at /sw.js, generated from the static manifest.
+
+- Every asset bundle (hashed by collectstatic) is precached when the
+  worker installs, and hashed static files are served cache-first.
+- Uploaded images have content-hashed names (HashedMediaStorage) and are
+  served cache-first too, keeping the MEDIA_CACHE_ENTRIES most recent.
+- Catalog pages (main, menu, shopnow and its fragments, location, product
+  pages) and /api/cart/data/ are stale-while-revalidate: a repeat visit
+  renders from the local copy at once while a fresh copy is fetched for
+  next time. Offline, previously seen pages still open.
+
+Cached pages show who is signed in and what is in the cart. So the worker
+drops them on any request that changes either: every non-GET request, and
+a GET to one of the STATE_URLS.
+
+The worker's version is the manifest hash. A deploy with new assets
+installs a new worker, which deletes the previous version's caches.
+Browsers always revalidate /sw.js itself, so it is sent with no-cache and
+an ETag.
+"""
+import functools
+import hashlib
+import json
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.templatetags.static import static
+from django.urls import NoReverseMatch, reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
+
+from .templatetags.assets import bundle_files
+
+MEDIA_CACHE_ENTRIES = 200
+# URL names of catalog pages (stale-while-revalidate).
+CATALOG_URLS = ['main', 'menu', 'shopnow', 'shopnow_products', 'location', 'product_detail', 'cart_data_api']
+# URL names of GET requests that change the session; they empty the page cache.
+STATE_URLS = ['add_to_cart', 'logout', 'verify_email', 'password_reset_confirm']
+# Stands in for a URL's arguments while turning it into a pattern.
+_PLACEHOLDER = '8675309'
+
+
+def url_pattern(name):
+    """A JavaScript regex source matching every URL of `name`."""
+    for args in ([], [_PLACEHOLDER], [_PLACEHOLDER, _PLACEHOLDER]):
+        try:
+            path = reverse(name, args=args)
+        except NoReverseMatch:
+            continue
+        return '^' + re.escape(path).replace(_PLACEHOLDER, '[^/]+') + '$'
+    raise ValueError(f'Cannot reverse {name!r}')
+
+
+def precache_urls():
+    urls = []
+    for name in settings.ASSET_BUNDLES:
+        for kind in ('css', 'js'):
+            urls += [static(path) for path in bundle_files(name, kind)]
+    return list(dict.fromkeys(urls))
+
+
+def worker_version():
+    manifest_hash = getattr(staticfiles_storage, 'manifest_hash', '') or ''
+    if manifest_hash:
+        return manifest_hash[:12]
+    return hashlib.sha1('\n'.join(precache_urls()).encode()).hexdigest()[:12]
+
+
+@functools.lru_cache(maxsize=4)
+def _render(version):
+    config = {
+        'version': version,
+        'precache': precache_urls(),
+        'staticUrl': settings.STATIC_URL,
+        'mediaUrl': settings.MEDIA_URL,
+        'mediaEntries': MEDIA_CACHE_ENTRIES,
+        'catalog': [url_pattern(name) for name in CATALOG_URLS],
+        'state': [url_pattern(name) for name in STATE_URLS],
+    }
+    return render_to_string('sw.js', {'config': json.dumps(config, indent=2)})
+
+
+def build_service_worker():
+    return _render(worker_version())
+
+
+def service_worker_etag(request):
+    return f'sw-{worker_version()}'
+
+
+@require_safe
+@condition(etag_func=service_worker_etag)
+def service_worker(request):
+    response = HttpResponse(build_service_worker(), content_type='application/javascript; charset=utf-8')
+    patch_cache_control(response, no_cache=True)
+    return response
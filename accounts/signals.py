@@ -0,0 +1,50 @@
+# accounts/signals.py
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .catalog import schedule_catalog_bump
+from .changes import record_changes
+from .models import Category, Product, ProductReview, Promotion, Store
+from .stores import schedule_stores_bump
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductReview)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Product)
+def catalog_changed(sender, instance, signal, **kwargs):
+    # No post_delete for ProductReview on purpose: a delete receiver stops
+    # Django from fast-deleting reviews when a product goes away. Code that
+    # deletes reviews directly calls record_changes(..., deleted=True) itself.
+    record_changes(sender, [instance.pk], deleted=signal is post_delete)
+
+
+@receiver(pre_delete, sender=User)
+def author_deleted(sender, instance, **kwargs):
+    # The user's reviews are about to go through ProductReview.user's
+    # CASCADE, which sends no signal for them. This runs in the delete's
+    # transaction, so the log entries commit (or roll back) with it.
+    ids = list(ProductReview.objects.filter(user=instance).values_list('pk', flat=True))
+    if ids:
+        record_changes(ProductReview, ids, deleted=True)
+
+
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+@receiver(m2m_changed, sender=Promotion.products.through)
+@receiver(m2m_changed, sender=Promotion.categories.through)
+def promotions_changed(sender, **kwargs):
+    # Compiled promotion rules are cached under the catalog version.
+    schedule_catalog_bump()
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+@receiver(m2m_changed, sender=Store.unavailable_products.through)
+def stores_changed(sender, **kwargs):
+    # Each process rebuilds its nearest-store index on the next lookup. The
+    # catalog bump retires the location page's snapshot (accounts/snapshots.py).
+    schedule_stores_bump()
+    schedule_catalog_bump()
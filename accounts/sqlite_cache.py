@@ -0,0 +1,240 @@
+# accounts/sqlite_cache.py
+"""
+A cache backend in a local SQLite file (WAL mode), shared by every worker
+process on the box without running a cache server:
+
+    CACHES = {'default': {
+        'BACKEND': 'accounts.sqlite_cache.SQLiteCache',
+        'LOCATION': '/path/to/cache.sqlite3',
+        'OPTIONS': {'MAX_ENTRIES': 20000, 'MAX_SIZE': 256 * 1024 * 1024},
+    }}
+
+- Integers are stored as SQLite integers, so incr() is a single
+  UPDATE ... RETURNING: atomic across processes, never a lost update.
+- Eviction is least-recently-used once MAX_ENTRIES or MAX_SIZE (bytes) is
+  exceeded. Reads refresh an entry's access time at most once every
+  ACCESS_RESOLUTION seconds, so a hot key isn't a write on every get().
+- The bound is checked every CULL_EVERY writes, not on each one, so the
+  file can briefly hold a few more entries than MAX_ENTRIES.
+
+Bulk invalidation works as with any Django cache: through key versions
+(VERSION / incr_version()) or a version kept in the cache itself, as the
+catalog does (accounts/catalog.py).
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+ACCESS_RESOLUTION = 60
+CULL_EVERY = 64
+BUSY_TIMEOUT = 5  # seconds to wait for another process's write lock
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires REAL,
+        accessed REAL NOT NULL,
+        size INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+'''
+INT_RANGE = range(-2 ** 63, 2 ** 63)
+
+
+def encode(value):
+    """(stored value, size in bytes). Plain ints stay SQLite integers so incr() can run in SQL."""
+    if type(value) is int and value in INT_RANGE:
+        return value, 8
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    return data, len(data)
+
+
+def decode(value):
+    return value if isinstance(value, int) else pickle.loads(value)
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = os.fspath(location)
+        self.max_size = int(options.get('MAX_SIZE', 256 * 1024 * 1024))
+        self._local = threading.local()
+        self._writes = 0
+
+    # ===== CONNECTION =====
+    @property
+    def db(self):
+        """This thread's connection; reopened in a forked child (gunicorn --preload)."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit: each statement is its own transaction, which is all
+            # a cache needs; the few multi-statement updates use BEGIN IMMEDIATE.
+            db = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode = WAL')
+            # Losing the last writes on power failure is fine for a cache.
+            db.execute('PRAGMA synchronous = NORMAL')
+            db.executescript(SCHEMA)
+            local.db, local.pid = db, os.getpid()
+        return local.db
+
+    def _row(self, sql, params):
+        # fetchall(), not fetchone(): a statement left unfinished keeps its
+        # transaction (and, for a write, the file's write lock) open.
+        rows = self.db.execute(sql, params).fetchall()
+        return rows[0] if rows else None
+
+    def close(self, **kwargs):
+        # Called after every request; the connection is kept open on purpose.
+        pass
+
+    # ===== READS =====
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        row = self._row(
+            'SELECT value, accessed FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, now)
+        )
+        if row is None:
+            return default
+        if now - row[1] > ACCESS_RESOLUTION:
+            self.db.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return decode(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not keys:
+            return {}
+        placeholders = ', '.join('?' * len(keys))
+        rows = self.db.execute(
+            f'SELECT key, value FROM cache WHERE key IN ({placeholders}) AND (expires IS NULL OR expires > ?)',
+            [*keys, time.time()],
+        ).fetchall()
+        return {keys[key]: decode(value) for key, value in rows}
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._row(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ) is not None
+
+    # ===== WRITES =====
+    def _store(self, key, value, timeout, only_if_missing=False):
+        now = time.time()
+        value, size = encode(value)
+        sql = (
+            'INSERT INTO cache (key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires, '
+            'accessed = excluded.accessed, size = excluded.size'
+        )
+        params = [key, value, self.get_backend_timeout(timeout), now, size]
+        if only_if_missing:
+            sql += ' WHERE cache.expires IS NOT NULL AND cache.expires <= ?'
+            params.append(now)
+        return self.db.execute(sql, params).rowcount == 1
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._store(key, value, timeout)
+        self._wrote()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        stored = self._store(key, value, timeout, only_if_missing=True)
+        if stored:
+            self._wrote()
+        return stored
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            for key, value in data.items():
+                self._store(self.make_and_validate_key(key, version=version), value, timeout)
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        self._wrote(len(data))
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        return self.db.execute(
+            'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), now, key, now),
+        ).rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        row = self._row(
+            'UPDATE cache SET value = value + ?, accessed = ? '
+            "WHERE key = ? AND typeof(value) = 'integer' AND (expires IS NULL OR expires > ?) "
+            'RETURNING value',
+            (delta, now, key, now),
+        )
+        if row is not None:
+            return row[0]
+        # Missing, or not stored as an integer: same errors as the other backends.
+        row = self._row(
+            'SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, now)
+        )
+        if row is None:
+            raise ValueError(f"Key '{key}' not found")
+        new_value = decode(row[0]) + delta
+        self.db.execute('UPDATE cache SET value = ?, size = ? WHERE key = ?', (*encode(new_value), key))
+        return new_value
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.db.execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            self.db.execute(f"DELETE FROM cache WHERE key IN ({', '.join('?' * len(keys))})", keys)
+
+    def clear(self):
+        self.db.execute('DELETE FROM cache')
+
+    # ===== EVICTION =====
+    def _wrote(self, count=1):
+        before, self._writes = self._writes, self._writes + count
+        if before // CULL_EVERY != self._writes // CULL_EVERY:
+            self.cull()
+
+    def cull(self):
+        """Drop expired entries, then the least recently used until both bounds hold."""
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))
+            entries, size = db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache').fetchall()[0]
+            if (entries > self._max_entries or size > self.max_size) and self._cull_frequency == 0:
+                db.execute('DELETE FROM cache')
+            elif entries > self._max_entries or size > self.max_size:
+                # Like the other backends, free 1/CULL_FREQUENCY of the room at once.
+                entries_over = entries - self._max_entries + self._max_entries // self._cull_frequency
+                size_over = size - self.max_size + self.max_size // self._cull_frequency
+                victims = []
+                for key, entry_size in db.execute('SELECT key, size FROM cache ORDER BY accessed').fetchall():
+                    if entries_over <= 0 and size_over <= 0:
+                        break
+                    victims.append((key,))
+                    entries_over -= 1
+                    size_over -= entry_size
+                db.executemany('DELETE FROM cache WHERE key = ?', victims)
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
@@ -0,0 +1,98 @@
+# accounts/startup.py
+"""
+Process startup cost, measured with `python -X importtime` in fresh interpreters.
+
+importtime only sees `import` statements: modules loaded through
+importlib.import_module (INSTALLED_APPS, their models and admin modules,
+the root URLconf) are not listed themselves, although what they import is.
+The wall time covers everything.
+"""
+import importlib.util
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+# What each kind of process imports before it can do any work.
+TARGETS = {
+    # every manage.py command
+    'setup': 'import django; django.setup()',
+    # a gunicorn worker (wsgi.py's warm-up is switched off for this run)
+    'wsgi': 'import baseproject.wsgi',
+    # the first request, runserver and any command that runs system checks
+    'urls': 'import django; django.setup(); from django.urls import get_resolver; get_resolver().url_patterns',
+}
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+PROJECT_PACKAGES = ('accounts', 'baseproject')
+
+
+def parse_importtime(text):
+    """Rows of module, self_us, cumulative_us and nesting depth from -X importtime output."""
+    rows = []
+    for line in text.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            rows.append({
+                'module': module,
+                'self_us': int(own),
+                'cumulative_us': int(cumulative),
+                'depth': (len(indent) - 1) // 2,
+            })
+    return rows
+
+
+def run_target(target):
+    """Run one fresh interpreter; returns (wall ms, importtime rows)."""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'baseproject.settings'),
+               WARMUP_ON_BOOT='0')
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', TARGETS[target]],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f'{target} failed:\n{result.stderr[-2000:]}')
+    return wall_ms, parse_importtime(result.stderr)
+
+
+def has_bytecode_cache():
+    """
+    Whether the project's .pyc files are current. Without them (e.g. under
+    PYTHONDONTWRITEBYTECODE with no compileall step) every project module is
+    compiled from source on each start.
+    """
+    source = os.path.join(settings.BASE_DIR, 'accounts', 'views.py')
+    cached = importlib.util.cache_from_source(source)
+    try:
+        return os.path.getmtime(cached) >= os.path.getmtime(source)
+    except OSError:
+        return False
+
+
+def measure_startup(target, repeat=5):
+    walls = []
+    for _ in range(repeat):
+        wall_ms, rows = run_target(target)
+        walls.append(wall_ms)
+    top_level = [row for row in rows if row['depth'] == 0]
+    return {
+        'target': target,
+        'wall_ms': round(statistics.median(walls), 1),
+        'import_ms': round(sum(row['cumulative_us'] for row in top_level) / 1000, 1),
+        'modules': len(rows),
+        'bytecode_cache': has_bytecode_cache(),
+        'imports': rows,
+    }
+
+
+def slowest(rows, key='cumulative_us', limit=15, project_only=False):
+    if project_only:
+        rows = [row for row in rows if row['module'].split('.')[0] in PROJECT_PACKAGES]
+    return sorted(rows, key=lambda row: row[key], reverse=True)[:limit]
@@ -0,0 +1,139 @@
+# accounts/stores.py
+"""
+Nearest-store lookups for the store locator (/api/v1/stores/nearest/).
+
+Active stores are put in a KD-tree held in memory by each process. Points
+are stored as unit vectors on the sphere rather than as raw latitude and
+longitude, so straight-line distance orders stores the same way as
+distance over the Earth's surface, including across the date line. A
+nearest-N query visits O(log n) nodes instead of every store.
+
+Saving or deleting a store, or changing what it sells, sets a new version
+in the shared cache. Every process rebuilds its tree the next time it
+answers a query (two queries).
+"""
+import heapq
+import math
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Store
+
+EARTH_RADIUS_KM = 6371.0
+STORES_VERSION_KEY = 'stores:version'
+STORE_FIELDS = ['id', 'name', 'address', 'phone', 'latitude', 'longitude', 'weekday_hours', 'weekend_hours']
+
+# (version, StoreIndex) for this process.
+_index = None
+
+
+def unit_vector(latitude, longitude):
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def chord_to_km(squared_chord):
+    """Great-circle distance for a squared straight-line distance between unit vectors."""
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(squared_chord) / 2))
+
+
+class KDTree:
+    """Static 3-d tree; nodes are (point index, axis, left, right) tuples."""
+
+    def __init__(self, points):
+        self.points = points
+        self.root = self._build(list(range(len(points))), 0)
+
+    def _build(self, indexes, depth):
+        if not indexes:
+            return None
+        axis = depth % 3
+        indexes.sort(key=lambda i: self.points[i][axis])
+        middle = len(indexes) // 2
+        return (
+            indexes[middle], axis,
+            self._build(indexes[:middle], depth + 1), self._build(indexes[middle + 1:], depth + 1),
+        )
+
+    def nearest(self, point, n, accept=None):
+        """[(squared distance, index)] of the n points nearest `point` that accept(index) allows, nearest first."""
+        best = []  # max-heap of (-squared distance, index): the furthest kept is on top
+        if n <= 0:
+            return []
+
+        def visit(node):
+            if node is None:
+                return
+            index, axis, left, right = node
+            other = self.points[index]
+            distance = (point[0] - other[0]) ** 2 + (point[1] - other[1]) ** 2 + (point[2] - other[2]) ** 2
+            if accept is None or accept(index):
+                if len(best) < n:
+                    heapq.heappush(best, (-distance, index))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, index))
+            offset = point[axis] - other[axis]
+            near, far = (left, right) if offset < 0 else (right, left)
+            visit(near)
+            # The far side can only hold something nearer if the splitting plane is.
+            if len(best) < n or offset * offset < -best[0][0]:
+                visit(far)
+
+        visit(self.root)
+        return sorted((-distance, index) for distance, index in best)
+
+
+class StoreIndex:
+    def __init__(self, stores, unavailable):
+        self.stores = stores
+        self.unavailable = unavailable
+        self.tree = KDTree([unit_vector(store['latitude'], store['longitude']) for store in stores])
+
+    def nearest(self, latitude, longitude, n=5, product=None):
+        """[(store, distance in km)] of the n nearest stores, only those selling `product` if given."""
+        accept = None
+        if product is not None:
+            def accept(i):
+                return product not in self.unavailable.get(self.stores[i]['id'], ())
+        found = self.tree.nearest(unit_vector(latitude, longitude), n, accept)
+        return [(self.stores[i], chord_to_km(distance)) for distance, i in found]
+
+
+def build_index():
+    stores = [
+        dict(zip(STORE_FIELDS, row))
+        for row in Store.objects.filter(is_active=True).order_by('id').values_list(*STORE_FIELDS)
+    ]
+    unavailable = {}
+    through = Store.unavailable_products.through.objects.filter(store__is_active=True)
+    for store_id, product_id in through.values_list('store_id', 'product_id'):
+        unavailable.setdefault(store_id, set()).add(product_id)
+    return StoreIndex(stores, unavailable)
+
+
+# ===== VERSIONING =====
+def stores_version():
+    version = cache.get(STORES_VERSION_KEY)
+    if version is None:
+        cache.add(STORES_VERSION_KEY, time.time_ns() // 1000, None)
+        version = cache.get(STORES_VERSION_KEY)
+    return version
+
+
+def bump_stores_version():
+    cache.set(STORES_VERSION_KEY, time.time_ns() // 1000, None)
+
+
+def schedule_stores_bump():
+    transaction.on_commit(bump_stores_version)
+
+
+def store_index():
+    """This process's index, rebuilt if the stores changed since it was built."""
+    global _index
+    version = stores_version()
+    if _index is None or _index[0] != version:
+        _index = (version, build_index())
+    return _index[1]
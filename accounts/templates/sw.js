@@ -0,0 +1,111 @@
+// Generated by accounts/serviceworker.py; see its docstring.
+const CONFIG = {{ config|safe }};
+
+const STATIC_CACHE = `wendywoo-static-${CONFIG.version}`;
+const PAGES_CACHE = `wendywoo-pages-${CONFIG.version}`;
+const MEDIA_CACHE = 'wendywoo-media';  // content-hashed names never go stale
+const CURRENT = [STATIC_CACHE, PAGES_CACHE, MEDIA_CACHE];
+
+const HASHED_RE = /\.[0-9a-f]{12}\.\w+$/;
+const catalog = CONFIG.catalog.map(source => new RegExp(source));
+const state = CONFIG.state.map(source => new RegExp(source));
+
+// Bumped whenever cached pages are dropped. A revalidation that started in
+// an earlier generation may hold a page from before the change, so its
+// response is not stored.
+let generation = 0;
+
+function dropPages() {
+    generation += 1;
+    return caches.delete(PAGES_CACHE);
+}
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(STATIC_CACHE)
+            .then(cache => cache.addAll(CONFIG.precache))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(names => Promise.all(
+                names.filter(name => name.startsWith('wendywoo-') && !CURRENT.includes(name))
+                    .map(name => caches.delete(name))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+function cacheable(response) {
+    return response && response.ok && response.type === 'basic' && !response.redirected
+        && !(response.headers.get('Cache-Control') || '').includes('no-store');
+}
+
+function cacheFirst(request, cacheName, maxEntries) {
+    return caches.open(cacheName).then(cache =>
+        cache.match(request).then(cached => {
+            if (cached) return cached;
+            return fetch(request).then(response => {
+                if (cacheable(response)) {
+                    cache.put(request, response.clone()).then(() => maxEntries && trim(cache, maxEntries));
+                }
+                return response;
+            });
+        })
+    );
+}
+
+function staleWhileRevalidate(event, cacheName) {
+    const request = event.request;
+    const started = generation;
+    return caches.open(cacheName).then(cache =>
+        cache.match(request).then(cached => {
+            const network = fetch(request).then(response => {
+                if (cacheable(response) && generation === started) cache.put(request, response.clone());
+                return response;
+            });
+            if (cached) {
+                event.waitUntil(network.catch(() => undefined));
+                return cached;
+            }
+            return network;
+        })
+    );
+}
+
+// Oldest entries first: cache.keys() lists them in insertion order.
+function trim(cache, maxEntries) {
+    return cache.keys().then(keys =>
+        Promise.all(keys.slice(0, Math.max(keys.length - maxEntries, 0)).map(key => cache.delete(key)))
+    );
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) return;
+
+    // Sign-in, sign-out and cart changes make cached pages wrong. The pages
+    // are dropped before the request goes out, so nothing served afterwards
+    // comes from before it, and again once it is answered, in case a page
+    // was fetched while it was in flight.
+    if (request.method !== 'GET' || state.some(re => re.test(url.pathname))) {
+        event.respondWith(
+            dropPages()
+                .then(() => fetch(request))
+                .then(response => dropPages().then(() => response))
+        );
+        return;
+    }
+
+    if (url.pathname.startsWith(CONFIG.staticUrl) && HASHED_RE.test(url.pathname)) {
+        event.respondWith(cacheFirst(request, STATIC_CACHE));
+    } else if (url.pathname.startsWith(CONFIG.mediaUrl) && HASHED_RE.test(url.pathname)) {
+        event.respondWith(cacheFirst(request, MEDIA_CACHE, CONFIG.mediaEntries));
+    } else if (catalog.some(re => re.test(url.pathname))) {
+        event.respondWith(staleWhileRevalidate(event, PAGES_CACHE));
+    }
+});
@@ -0,0 +1,87 @@
+import functools
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from ..assets import bundle_path, bundle_sources, critical_path
+from ..hints import add_preload
+
+register = template.Library()
+
+
+def bundle_files(name, kind):
+    """The bundle when collectstatic has built it, otherwise its source files (runserver, tests)."""
+    path = bundle_path(name, kind)
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None)
+    if hashed_files and path in hashed_files:
+        return [path]
+    return bundle_sources(name, kind)
+
+
+@functools.lru_cache(maxsize=None)
+def _read_critical(hashed_name):
+    with staticfiles_storage.open(hashed_name) as fh:
+        # Nothing in a stylesheet may close the <style> element early.
+        return fh.read().decode('utf-8').replace('</', '<\\/')
+
+
+def critical_css(name):
+    """The bundle's critical CSS written by collectstatic, or None."""
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None)
+    path = critical_path(name)
+    if not hashed_files or path not in hashed_files:
+        return None
+    return _read_critical(hashed_files[path])
+
+
+@register.simple_tag(takes_context=True)
+def css_bundle(context, name):
+    """
+    Once collectstatic has run: the bundle's critical CSS inline, and the
+    full bundle fetched without blocking rendering (plain <link> without
+    JavaScript). Before that: a <link> per source file.
+    """
+    urls = [static(path) for path in bundle_files(name, 'css')]
+    for url in urls:
+        add_preload(context.get('request'), url, 'style')
+    critical = critical_css(name)
+    if critical is None:
+        return format_html_join('\n', '<link rel="stylesheet" href="{}">', ((url,) for url in urls))
+    return format_html(
+        '<style>{}</style>\n'
+        '<link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+        '<noscript><link rel="stylesheet" href="{}"></noscript>',
+        mark_safe(critical), urls[0], urls[0],
+    )
+
+
+@register.simple_tag(takes_context=True)
+def js_bundle(context, name):
+    urls = [static(path) for path in bundle_files(name, 'js')]
+    for url in urls:
+        add_preload(context.get('request'), url, 'script')
+    return format_html_join('\n', '<script src="{}"></script>', ((url,) for url in urls))
+
+
+@register.simple_tag(takes_context=True)
+def preload_static(context, path, kind):
+    """{% static %} for an asset the browser should fetch early (kind: image, font, ...)."""
+    url = static(path)
+    add_preload(context.get('request'), url, kind)
+    return url
+
+
+@register.simple_tag
+def service_worker():
+    """Registers /sw.js (accounts/serviceworker.py) once collectstatic has hashed the assets it precaches."""
+    if not getattr(settings, 'SERVICE_WORKER_ENABLED', False) or not getattr(staticfiles_storage, 'hashed_files', None):
+        return ''
+    return format_html(
+        "<script>if ('serviceWorker' in navigator) {{ navigator.serviceWorker.register('{}'); }}</script>",
+        reverse('service_worker'),
+    )
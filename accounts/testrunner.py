@@ -0,0 +1,34 @@
+# accounts/testrunner.py
+"""
+`manage.py test` runner that keeps the suite away from live state.
+
+The shared cache is a file (CACHES in settings) that the running site
+uses too, and the tests clear it freely. For the run, the default cache
+is the same backend on a throwaway file in a temporary directory, removed
+afterwards. Static snapshots are off, and written under that directory if
+a test turns them on without choosing its own SNAPSHOT_ROOT.
+"""
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class IsolatedTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._scratch = tempfile.TemporaryDirectory(prefix='wendywoo-tests-')
+        scratch = Path(self._scratch.name)
+        caches = {alias: dict(config) for alias, config in settings.CACHES.items()}
+        caches['default']['LOCATION'] = scratch / 'cache.sqlite3'
+        self._overrides = override_settings(
+            CACHES=caches, SNAPSHOTS_ENABLED=False, SNAPSHOT_ROOT=scratch / 'snapshots',
+        )
+        self._overrides.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._overrides.disable()
+        self._scratch.cleanup()
+        super().teardown_test_environment(**kwargs)
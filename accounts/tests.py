@@ -1,3 +1,1597 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import json
+import multiprocessing
+import os
+import re
+import runpy
+import smtplib
+import tempfile
+import unittest
+from unittest import mock
+from contextlib import redirect_stdout
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+import brotli
+from django.conf import settings
+from django.contrib.auth.hashers import MD5PasswordHasher
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count
+from django.template import Context, Template
+from django.templatetags.static import static
+from django.test import LiveServerTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import empty
+
+from . import api, catalog_io, hints, urls
+from .admin import EstimatedCountPaginator
+from .assets import _markup_names, critical_css, minify_css, minify_js
+from .benchmark import _set_cart, clear_seed_data, compare_reports, seed_catalog
+from .bootstats import child_pids, process_memory
+from .checks import check_password_hasher
+from .catalog import SHOP_PAGE_SIZE, bump_catalog_version, catalog_version, shop_categories, shop_page
+from .catalog_io import export_catalog, import_catalog
+from .enquiries import MAX_ATTEMPTS, send_enquiry_mail
+from .loadtest import STEPS, run_load_test
+from .maintenance import (
+    abandoned_carts, delete_carts, delete_sessions, expired_sessions, run_job, session_store,
+)
+from .models import (
+    CatalogChange, Category, CategoryBestseller, Enquiry, Product, ProductReview, Promotion, RelatedProduct, Store,
+)
+from .pricing import compile_promotions, price_cart, promotion_rules
+from .recommendations import co_occurrences, rebuild_recommendations, recommendations_for
+from .serviceworker import CATALOG_URLS, STATE_URLS, precache_urls, url_pattern
+from .snapshots import code_fingerprint, snapshot_key
+from .sqlite_cache import SQLiteCache
+from .startup import measure_startup, parse_importtime, slowest
+from .stores import KDTree, bump_stores_version, chord_to_km, store_index, unit_vector
+from .throttling import hit, parse_rate
+from .storage import HashedMediaStorage
+from .templatetags.assets import bundle_files
+from .warmup import project_template_names, warm_templates
+
+
+# ===== BENCHMARK SUITE =====
+class SeedCatalogTests(TestCase):
+    def test_seed_is_reproducible(self):
+        seed_catalog(categories=3, products=20, reviews=50, users=5, seed=7)
+        first = list(Product.objects.order_by('id').values_list('name', 'price', 'category__name'))
+
+        call_command('seed_catalog', categories=3, products=20, reviews=50, users=5, seed=7, clear=True,
+                     stdout=StringIO())
+        second = list(Product.objects.order_by('id').values_list('name', 'price', 'category__name'))
+
+        self.assertEqual(first, second)
+        self.assertEqual(Category.objects.count(), 3)
+        self.assertEqual(ProductReview.objects.count(), 50)
+
+
+class BenchmarkViewsTests(TestCase):
+    def test_writes_json_report(self):
+        cache.clear()  # no on_commit version bump under TestCase
+        seed_catalog(categories=2, products=10, reviews=30, users=3)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.json')
+            call_command('benchmark_views', repeat=2, cart_sizes='1,3', output=path, stdout=StringIO())
+            with open(path) as fh:
+                report = json.load(fh)
+
+        names = {row['name'] for row in report['results']}
+        self.assertIn('shopnow', names)
+        self.assertIn('payment_page[cart=3]', names)
+        self.assertEqual(report['meta']['dataset']['products'], 10)
+        for row in report['results']:
+            self.assertEqual(row['status'], 200, row['name'])
+
+    def test_compare_flags_query_growth(self):
+        baseline = {'results': [{'name': 'shopnow', 'queries': 3, 'p50_ms': 10.0}]}
+        current = {'results': [{'name': 'shopnow', 'queries': 5, 'p50_ms': 10.5}]}
+        self.assertEqual(compare_reports(baseline, current), ['shopnow: queries 3 -> 5'])
+
+
+MD5_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@override_settings(THROTTLE_ENABLED=False, SNAPSHOTS_ENABLED=False)
+class LoginTests(TestCase):
+    def test_password_is_hashed_once_per_login(self):
+        with override_settings(PASSWORD_HASHERS=MD5_HASHERS):
+            User.objects.create_user('baker@example.com', 'baker@example.com', 'Croissant-42')
+            verify = MD5PasswordHasher.verify
+            with mock.patch.object(MD5PasswordHasher, 'verify', autospec=True, side_effect=verify) as spy:
+                response = self.client.post(
+                    reverse('login'), {'username': 'baker@example.com', 'password': 'Croissant-42'}
+                )
+        self.assertRedirects(response, reverse('main'), fetch_redirect_response=False)
+        self.assertEqual(spy.call_count, 1)
+        self.assertIn('_auth_user_id', self.client.session)
+
+    def test_inactive_account_is_refused(self):
+        with override_settings(PASSWORD_HASHERS=MD5_HASHERS):
+            User.objects.create_user('new@example.com', 'new@example.com', 'Croissant-42', is_active=False)
+            response = self.client.post(reverse('login'), {'username': 'new@example.com', 'password': 'Croissant-42'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'check your email for a verification link')
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_outdated_hash_is_upgraded_on_login(self):
+        user = User.objects.create(username='old@example.com', password=MD5PasswordHasher().encode('Croissant-42', 'oldsalt'))
+        hashers = settings.PASSWORD_HASHER_PROFILES['scrypt'] + MD5_HASHERS
+        with override_settings(PASSWORD_HASHERS=hashers):
+            self.client.post(reverse('login'), {'username': 'old@example.com', 'password': 'Croissant-42'})
+            user.refresh_from_db()
+            self.assertTrue(user.password.startswith('scrypt$'))
+            self.assertTrue(user.check_password('Croissant-42'))
+
+    def test_missing_hasher_library_fails_the_system_check(self):
+        self.assertEqual(check_password_hasher(None), [])
+        with override_settings(PASSWORD_HASHERS=settings.PASSWORD_HASHER_PROFILES['argon2']), \
+                mock.patch('accounts.benchmark.hasher_available', return_value=False):
+            [error] = check_password_hasher(None)
+        self.assertEqual(error.id, 'accounts.E001')
+        self.assertIn('Argon2PasswordHasher', error.msg)
+
+    def test_benchmark_reports_cpu_per_login(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'logins.json')
+            call_command('benchmark_login', repeat=1, profiles='scrypt', output=path, stdout=StringIO())
+            with open(path) as fh:
+                [row] = json.load(fh)['results']
+        self.assertEqual((row['profile'], row['hasher'], row['status']), ('scrypt', 'scrypt', 302))
+        self.assertGreater(row['logins_per_sec_per_core'], 0)
+        # One hash per login, plus request overhead that is small next to it.
+        self.assertLess(row['login_cpu_ms'], row['check_cpu_ms'] * 1.8)
+
+
+# ===== QUERY BUDGETS =====
+# Maximum SQL queries per URL name in accounts/urls.py, for a logged-in user
+# with a non-empty cart. QueryBudgetTests measures every URL at two catalog
+# and cart sizes: the count must stay within budget AND must not grow with
+# the data, so per-product or per-cart-item queries (N+1) fail here.
+QUERY_BUDGETS = {
+    'main': 3,
+    'service_worker': 0,
+    'menu': 3,
+    'shopnow': 5,
+    'shopnow_products': 2,
+    'login': 3,
+    'signup': 3,
+    'logout': 4,
+    'forgot_password': 3,
+    'verify_email': 1,
+    'profile': 3,
+    'add_to_cart': 6,
+    'location': 4,  # +2 building the store index
+    'checkout': 2,
+    'check_auth': 2,
+    'payment_page': 4,
+    'update_cart_item': 5,
+    'remove_cart_item': 5,
+    'cart_data_api': 2,
+    'cart_page': 4,
+    'product_detail': 7,  # +2 for the recommendation lists on a cold cache
+    'add_review': 4,
+    'enquiries': 3,
+    'enquiry_success': 3,
+    'search_ajax': 1,
+    'api_categories': 1,
+    'api_products': 1,
+    'api_product': 1,
+    'api_product_reviews': 1,
+    'api_changes': 5,  # one read per kind of object changed
+    'api_nearest_stores': 2,  # building the store index
+    'password_reset': 3,
+    'password_reset_confirm': 4,
+    'password_reset_complete': 3,
+    'debug_cart': 2,
+    'request_profiles': 2,
+    'request_profile_download': 2,
+}
+
+# URLs whose templates are not in the tree; they cannot be rendered at all.
+UNRENDERABLE_URLS = {
+    'search_results': 'search_results.html does not exist',
+    'password_reset_done': 'password_reset_done.html does not exist',
+}
+
+
+class QueryBudgetTests(TestCase):
+    SIZES = [
+        # (categories, products, reviews, cart size)
+        (2, 6, 10, 2),
+        (6, 60, 400, 25),
+    ]
+
+    def requests_for(self, product_id, category_id, cart_item_id):
+        """(url name, method, args, body) for every budgeted URL."""
+        item = {'item_id': cart_item_id, 'quantity': 2}
+        return [
+            ('main', 'GET', [], None),
+            ('service_worker', 'GET', [], None),
+            ('menu', 'GET', [], None),
+            ('shopnow', 'GET', [], None),
+            ('shopnow_products', 'GET', [category_id], {'after': product_id}),
+            ('login', 'GET', [], None),
+            ('signup', 'GET', [], None),
+            ('logout', 'GET', [], None),
+            ('forgot_password', 'GET', [], None),
+            ('verify_email', 'GET', ['MQ', 'bad-token'], None),
+            ('profile', 'GET', [], None),
+            ('add_to_cart', 'GET', [product_id], None),
+            ('location', 'GET', [], None),
+            ('checkout', 'GET', [], None),
+            ('check_auth', 'GET', [], None),
+            ('payment_page', 'GET', [], None),
+            ('update_cart_item', 'POST', [], item),
+            ('remove_cart_item', 'POST', [], item),
+            ('cart_data_api', 'GET', [], None),
+            ('cart_page', 'GET', [], None),
+            ('product_detail', 'GET', [product_id], None),
+            ('add_review', 'GET', [product_id], None),
+            ('enquiries', 'GET', [], None),
+            ('enquiry_success', 'GET', [], None),
+            ('search_ajax', 'GET', [], {'q': 'Butter'}),
+            ('api_categories', 'GET', [], None),
+            ('api_products', 'GET', [], {'fields': 'id,name,rating,review_count'}),
+            ('api_product', 'GET', [product_id], None),
+            ('api_product_reviews', 'GET', [product_id], None),
+            ('api_changes', 'GET', [], None),
+            ('api_nearest_stores', 'GET', [], {'lat': 36.56, 'lon': 139.88, 'product': product_id}),
+            ('password_reset', 'GET', [], None),
+            ('password_reset_confirm', 'GET', ['MQ', 'bad-token'], None),
+            ('password_reset_complete', 'GET', [], None),
+            ('debug_cart', 'GET', [], None),
+            ('request_profiles', 'GET', [], None),
+            ('request_profile_download', 'GET', ['missing.prof'], None),
+        ]
+
+    def measure_all(self, cart_size):
+        # Budgets are for a cold catalog cache (TestCase never runs the
+        # on_commit hook that would invalidate it after seeding anyway).
+        cache.clear()
+        user = User.objects.get(username='budget_user')
+        product_ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+        busiest = Product.objects.annotate(n=Count('reviews')).order_by('-n').first()
+
+        counts = {}
+        for name, method, args, body in self.requests_for(busiest.id, busiest.category_id, product_ids[0]):
+            client = self.client_class()
+            client.force_login(user)
+            _set_cart(client, product_ids, cart_size)
+            url = reverse(name, args=args)
+            # redirect_stdout: debug_cart prints the cart
+            with CaptureQueriesContext(connection) as queries, redirect_stdout(StringIO()):
+                if method == 'POST':
+                    response = client.post(url, data=body, content_type='application/json')
+                else:
+                    response = client.get(url, data=body)
+            self.assertLess(response.status_code, 400, name)
+            counts[name] = len(queries)
+        return counts
+
+    def test_every_url_has_a_budget(self):
+        names = {pattern.name for pattern in urls.urlpatterns if pattern.name}
+        missing = names - set(QUERY_BUDGETS) - set(UNRENDERABLE_URLS)
+        self.assertFalse(missing, f'Add a query budget for: {sorted(missing)}')
+
+    def test_query_counts_are_bounded_and_constant(self):
+        User.objects.create_user('budget_user', 'budget@example.com', 'x')
+        measured = []
+        for categories, products, reviews, cart_size in self.SIZES:
+            clear_seed_data()
+            seed_catalog(categories=categories, products=products, reviews=reviews, users=5)
+            rebuild_recommendations()
+            measured.append(self.measure_all(cart_size))
+
+        small, large = measured
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(url=name):
+                self.assertLessEqual(large[name], budget, f'{name} is over its query budget')
+                self.assertEqual(small[name], large[name], f'{name} query count grows with data size')
+
+
+# ===== CATALOG CACHE AND WARM-UP =====
+class CatalogCacheTests(TransactionTestCase):
+    # Real commits, so the on_commit version bumps actually run.
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Bread')
+        Product.objects.create(name='Shokupan', category=self.category, price=500, image='products/a.jpg')
+
+    def test_shop_pages_are_cached_until_the_catalog_changes(self):
+        self.assertEqual(len(shop_categories()), 1)
+        self.assertEqual([p.name for p in shop_page(self.category.id)[0]], ['Shokupan'])
+        with self.assertNumQueries(0):
+            shop_categories()
+            products, more = shop_page(self.category.id)
+        self.assertFalse(more)
+
+        version = catalog_version()
+        with transaction.atomic():
+            Product.objects.create(name='Melon Pan', category=self.category, price=300, image='products/b.jpg')
+            Product.objects.create(name='Tart', category=self.category, price=400, image='products/c.jpg')
+            self.assertEqual(catalog_version(), version)
+        self.assertEqual(catalog_version(), version + 1)  # one bump per transaction
+        self.assertEqual(len(shop_page(self.category.id)[0]), 3)
+
+
+class WarmupTests(TestCase):
+    def test_every_template_compiles_with_base_first(self):
+        names = project_template_names()
+        self.assertEqual(names[0], 'base.html')
+        compiled, failed = warm_templates()
+        self.assertEqual(failed, {})
+        self.assertEqual(compiled, names)
+
+    def test_warmup_command(self):
+        out = StringIO()
+        call_command('warmup', stdout=out)
+        self.assertIn('templates', out.getvalue())
+
+
+# ===== SHOP PAGE =====
+PRODUCT_CARD_RE = re.compile(r'href="/product/(\d+)/" class="product-link">\s*<div')
+NEXT_PAGE_RE = re.compile(r'class="shop-more" data-url="([^"]+)"')
+
+
+@override_settings(SNAPSHOTS_ENABLED=False)
+class ShopPageTests(TestCase):
+    def setUp(self):
+        self.bread, self.cakes = Category.objects.bulk_create([Category(name='Bread'), Category(name='Cakes')])
+        Product.objects.bulk_create(
+            Product(name=f'Loaf {i}', category=self.bread, price=300, image='products/a.jpg') for i in range(30)
+        )
+        self.bread_ids = list(self.bread.product_set.order_by('id').values_list('id', flat=True))
+
+    def test_page_renders_only_the_first_page_of_the_first_tab(self):
+        html = self.client.get(reverse('shopnow')).content.decode()
+        self.assertEqual([int(pk) for pk in PRODUCT_CARD_RE.findall(html)], self.bread_ids[:SHOP_PAGE_SIZE])
+        self.assertEqual(NEXT_PAGE_RE.findall(html), [
+            f"{reverse('shopnow_products', args=[self.bread.id])}?after={self.bread_ids[SHOP_PAGE_SIZE - 1]}",
+            reverse('shopnow_products', args=[self.cakes.id]),
+        ])
+        self.assertEqual(html.count('fetchpriority="high"'), 3)
+        self.assertEqual(html.count('loading="lazy"'), SHOP_PAGE_SIZE - 3)
+        self.assertEqual(html.count('width="400" height="300"'), SHOP_PAGE_SIZE)
+
+    def test_fragments_page_through_a_category(self):
+        url = NEXT_PAGE_RE.findall(self.client.get(reverse('shopnow')).content.decode())[0]
+        seen = self.bread_ids[:SHOP_PAGE_SIZE]
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('public', response['Cache-Control'])
+            self.assertFalse(response.cookies)
+            html = response.content.decode()
+            self.assertNotIn('fetchpriority', html)
+            seen += [int(pk) for pk in PRODUCT_CARD_RE.findall(html)]
+            url = (NEXT_PAGE_RE.findall(html) or [None])[0]
+        self.assertEqual(seen, self.bread_ids)
+
+        response = self.client.get(reverse('shopnow_products', args=[self.cakes.id]))
+        self.assertEqual(response.content.decode().strip(), '')
+        self.assertEqual(
+            self.client.get(reverse('shopnow_products', args=[self.bread.id]), HTTP_IF_NONE_MATCH=response['ETag'])
+            .status_code, 304,
+        )
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get(reverse('shopnow_products', args=[self.cakes.id + 1])).status_code, 404)
+        url = reverse('shopnow_products', args=[self.bread.id])
+        self.assertEqual(self.client.get(url, {'after': 'x'}).status_code, 400)
+
+
+
+# ===== CART PRICING =====
+class PricingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.bread, self.cakes = Category.objects.bulk_create([Category(name='Bread'), Category(name='Cakes')])
+        self.loaf = Product.objects.create(name='Loaf', category=self.bread, price=300)
+        self.bun = Product.objects.create(name='Bun', category=self.bread, price=120)
+        self.tart = Product.objects.create(name='Tart', category=self.cakes, price=450)
+
+    def promote(self, products=(), categories=(), **fields):
+        promotion = Promotion.objects.create(**fields)
+        promotion.products.set(products)
+        promotion.categories.set(categories)
+        cache.clear()
+        return promotion
+
+    def lines(self, cart):
+        return {line['product'].name: line for line in price_cart(cart)['lines']}
+
+    def test_without_promotions_prices_at_list_price(self):
+        pricing = price_cart({str(self.loaf.id): 2, str(self.tart.id): 1, '999': 1, 'x': 1})
+        self.assertEqual(pricing['total_items'], 3)
+        self.assertEqual((pricing['subtotal'], pricing['discount'], pricing['total']), (1050, 0, 1050))
+        with self.assertNumQueries(0):
+            self.assertEqual(price_cart({})['total'], 0)
+
+    def test_best_single_promotion_per_line(self):
+        self.promote(name='Bread week', kind=Promotion.PERCENT, percent_off=10, categories=[self.bread])
+        self.promote(name='3 buns for 300', kind=Promotion.MULTIBUY, bundle_quantity=3, bundle_price=300,
+                     products=[self.bun])
+        self.promote(name='Tart 5%', kind=Promotion.PERCENT, percent_off=5)
+
+        lines = self.lines({str(self.loaf.id): 2, str(self.bun.id): 7, str(self.tart.id): 1})
+        self.assertEqual((lines['Loaf']['discount'], lines['Loaf']['promotion']), (60, 'Bread week'))
+        # Two bundles (600) plus one bun at list price beats 10% off 840.
+        self.assertEqual((lines['Bun']['item_total'], lines['Bun']['promotion']), (720, '3 buns for 300'))
+        self.assertEqual((lines['Tart']['discount'], lines['Tart']['promotion']), (22, 'Tart 5%'))
+
+        lines = self.lines({str(self.bun.id): 2})
+        self.assertEqual((lines['Bun']['discount'], lines['Bun']['promotion']), (24, 'Bread week'))
+
+    def test_only_live_promotions_apply(self):
+        now = timezone.now()
+        self.promote(name='Later', kind=Promotion.PERCENT, percent_off=50, starts_at=now + timezone.timedelta(hours=1))
+        self.promote(name='Over', kind=Promotion.PERCENT, percent_off=50, ends_at=now - timezone.timedelta(hours=1))
+        self.promote(name='Off', kind=Promotion.PERCENT, percent_off=50, is_active=False)
+        later = Promotion.objects.get(name='Later')
+        self.assertEqual(price_cart({str(self.loaf.id): 1})['discount'], 0)
+
+        # Rules are cached, but start times are checked on every pricing.
+        with mock.patch('accounts.pricing.timezone.now', return_value=later.starts_at):
+            self.assertEqual(self.lines({str(self.loaf.id): 1})['Loaf']['promotion'], 'Later')
+
+    def test_rules_are_compiled_once_per_catalog_version(self):
+        self.promote(name='Bread week', kind=Promotion.PERCENT, percent_off=10, categories=[self.bread])
+        with self.assertNumQueries(1):
+            promotion_rules()
+        with self.assertNumQueries(0):
+            promotion_rules()
+
+        with mock.patch('accounts.signals.schedule_catalog_bump') as bump:
+            Promotion.objects.get(name='Bread week').products.add(self.tart)
+        bump.assert_called()
+        self.assertEqual(self.lines({str(self.tart.id): 1})['Tart']['discount'], 0)
+        bump_catalog_version()
+        self.assertEqual(self.lines({str(self.tart.id): 1})['Tart']['discount'], 45)
+
+    def test_incomplete_promotions_never_price_a_cart(self):
+        draft = self.promote(name='Draft', kind=Promotion.MULTIBUY, bundle_quantity=3, is_active=False)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Promotion.objects.filter(pk=draft.pk).update(is_active=True)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Promotion.objects.create(name='No percent', kind=Promotion.PERCENT)
+        # and should one get past the database, it is left out when compiling
+        rule = (1, 'Broken', Promotion.MULTIBUY, None, 3, None, None, None)
+        with mock.patch('accounts.pricing.Promotion.objects') as objects:
+            objects.filter.return_value.exclude.return_value.order_by.return_value.values_list.return_value = [
+                (*rule, None, None),
+            ]
+            self.assertEqual(compile_promotions(), {'products': {}, 'categories': {}, 'all': []})
+
+    def test_cart_pages_show_promoted_prices(self):
+        self.promote(name='Bread week', kind=Promotion.PERCENT, percent_off=10, categories=[self.bread])
+        _set_cart(self.client, [self.loaf.id, self.tart.id], 2)
+
+        data = self.client.get(reverse('cart_data_api')).json()
+        self.assertEqual((data['subtotal'], data['discount'], data['total_price']), (1200, 30, 1170))
+        self.assertEqual(data['items'][0]['promotion'], 'Bread week')
+        self.assertContains(self.client.get(reverse('cart_page')), '¥1170')
+
+        User.objects.create_user('buyer', 'buyer@example.com', 'x')
+        self.client.force_login(User.objects.get(username='buyer'))
+        _set_cart(self.client, [self.loaf.id, self.tart.id], 2)
+        response = self.client.get(reverse('payment_page'))
+        self.assertContains(response, 'PLACE ORDER - ¥1170')
+        self.assertContains(response, '-¥30')
+
+
+
+# ===== STORE LOCATOR =====
+class StoreLocatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.loaf = Product.objects.create(name='Loaf', category=Category.objects.create(name='Bread'), price=300)
+        self.utsunomiya, self.tokyo, self.osaka = Store.objects.bulk_create([
+            Store(name='Utsunomiya', address='Higashishukugo 2-5-4', latitude=36.5551, longitude=139.8828,
+                  weekday_hours='9:00 AM - 8:00 PM'),
+            Store(name='Tokyo', address='Marunouchi 1-1', latitude=35.6812, longitude=139.7671),
+            Store(name='Osaka', address='Umeda 3-1', latitude=34.7025, longitude=135.4959),
+        ])
+        Store.objects.create(name='Closed', address='-', latitude=36.56, longitude=139.88, is_active=False)
+
+    def test_tree_matches_a_full_scan(self):
+        import random
+        rng = random.Random(3)
+        points = [unit_vector(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(500)]
+        tree = KDTree(points)
+        for _ in range(50):
+            query = unit_vector(rng.uniform(-90, 90), rng.uniform(-180, 180))
+            scan = sorted((sum((a - b) ** 2 for a, b in zip(query, point)), i) for i, point in enumerate(points))
+            self.assertEqual(tree.nearest(query, 5), scan[:5])
+            self.assertEqual(tree.nearest(query, 3, accept=lambda i: i % 2), [d for d in scan if d[1] % 2][:3])
+        self.assertEqual(KDTree([]).nearest(query, 3), [])
+
+    def test_distances_wrap_around_the_date_line(self):
+        east, west = unit_vector(0, 179.5), unit_vector(0, -179.5)
+        distance = chord_to_km(sum((a - b) ** 2 for a, b in zip(east, west)))
+        self.assertAlmostEqual(distance, 111.2, places=0)
+
+    def test_nearest_stores(self):
+        url = reverse('api_nearest_stores')
+        response = self.client.get(url, {'lat': 35.69, 'lon': 139.70, 'limit': 2})
+        data = response.json()['data']
+        self.assertEqual([store['name'] for store in data], ['Tokyo', 'Utsunomiya'])
+        self.assertLess(data[0]['distance_km'], 10)
+        self.assertEqual(self.client.get(url, {'lat': 35.69, 'lon': 139.70}, HTTP_IF_NONE_MATCH=response['ETag'])
+                         .status_code, 304)
+
+        self.tokyo.unavailable_products.add(self.loaf)
+        bump_stores_version()  # on commit, outside a TestCase
+        data = self.client.get(url, {'lat': 35.69, 'lon': 139.70, 'product': self.loaf.id}).json()['data']
+        self.assertEqual([store['name'] for store in data], ['Utsunomiya', 'Osaka'])
+
+        for params in ({'lat': 35.69}, {'lat': 'x', 'lon': 1}, {'lat': 91, 'lon': 1}, {'lat': 1, 'lon': 1, 'limit': 0}):
+            self.assertEqual(self.client.get(url, params).status_code, 400)
+
+    def test_index_is_rebuilt_when_stores_change(self):
+        self.assertEqual(len(store_index().stores), 3)
+        with self.assertNumQueries(0):
+            store_index()
+        with mock.patch('accounts.signals.schedule_stores_bump') as bump, \
+                mock.patch('accounts.signals.schedule_catalog_bump') as catalog_bump:
+            Store.objects.filter(name='Closed').get().save()
+        bump.assert_called()
+        catalog_bump.assert_called()
+        bump_stores_version()
+        Store.objects.filter(name='Closed').update(is_active=True)
+        bump_stores_version()
+        self.assertEqual(len(store_index().stores), 4)
+
+    def test_location_page_lists_stores(self):
+        response = self.client.get(reverse('location'))
+        self.assertContains(response, 'data-store-id', count=3)
+        self.assertContains(response, '9:00 AM - 8:00 PM')
+        Store.objects.all().delete()
+        bump_stores_version()
+        bump_catalog_version()  # for the snapshot
+        self.assertContains(self.client.get(reverse('location')), 'Operation Hours')
+
+
+# ===== ADMIN =====
+class AdminChangelistTests(TestCase):
+    CHANGELISTS = ['admin:accounts_product_changelist', 'admin:accounts_category_changelist',
+                   'admin:accounts_productreview_changelist']
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('boss', 'boss@example.com', 'x'))
+
+    def count_queries(self):
+        counts = {}
+        product = Product.objects.order_by('id').first()
+        review = ProductReview.objects.order_by('id').first()
+        pages = [(name, []) for name in self.CHANGELISTS] + [
+            ('admin:accounts_product_change', [product.id]),
+            ('admin:accounts_productreview_change', [review.id]),
+        ]
+        for name, args in pages:
+            for query in ({}, {'q': 'Butter'}, {'is_available__exact': '1'}):
+                if query and not name.endswith('product_changelist'):
+                    continue
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(reverse(name, args=args), query)
+                self.assertEqual(response.status_code, 200, name)
+                counts[name, tuple(query)] = len(queries)
+        return counts
+
+    def test_changelists_do_not_query_per_row(self):
+        seed_catalog(categories=2, products=6, reviews=12, users=3)
+        self.count_queries()  # fills the content type cache
+        small = self.count_queries()
+        clear_seed_data()
+        seed_catalog(categories=8, products=120, reviews=600, users=20)
+        self.assertEqual(self.count_queries(), small)
+
+    def test_product_columns_come_from_annotations(self):
+        seed_catalog(categories=1, products=3, reviews=30, users=3)
+        response = self.client.get(reverse('admin:accounts_product_changelist'))
+        product = response.context['cl'].result_list[0]
+        self.assertEqual(product.num_reviews, product.reviews.count())
+
+    def test_estimated_count_for_unfiltered_large_tables(self):
+        seed_catalog(categories=1, products=30, reviews=0, users=1)
+        Product.objects.filter(id__in=list(Product.objects.values_list('id', flat=True)[:5])).delete()
+        with mock.patch.object(EstimatedCountPaginator, 'EXACT_BELOW', 10):
+            with CaptureQueriesContext(connection) as queries:
+                estimated = EstimatedCountPaginator(Product.objects.order_by('id'), 10).count
+            self.assertNotIn('COUNT', queries[0]['sql'])
+            self.assertEqual(estimated, Product.objects.order_by('-id').first().id)
+            filtered = EstimatedCountPaginator(Product.objects.filter(price__gte=0).order_by('id'), 10).count
+        self.assertEqual(filtered, 25)
+
+
+# ===== CATALOG IMPORT / EXPORT =====
+class CatalogImportExportTests(TestCase):
+    CSV = (
+        'id,name,category,price,description,image,is_available\n'
+        ',Shokupan,Bread,500,Soft milk bread,products/shokupan.jpg,true\n'
+        ',Melon Pan,Bread,300,Crisp top,melon.jpg,yes\n'
+        ',Matcha Roll,Cakes,450,,products/roll.jpg,0\n'
+        ',No Price,Cakes,,,products/x.jpg,true\n'
+        ',No Image,Cakes,200,,,true\n'
+    )
+
+    def run_import(self, text, fmt='csv', **kwargs):
+        return import_catalog(StringIO(text), fmt, **kwargs)
+
+    def test_import_creates_categories_products_and_ingests_images(self):
+        media, images = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.addCleanup(images.cleanup)
+        with open(os.path.join(images.name, 'melon.jpg'), 'wb') as fh:
+            fh.write(b'not really a jpeg')
+
+        with self.settings(MEDIA_ROOT=media.name), self.captureOnCommitCallbacks() as callbacks:
+            stats = self.run_import(self.CSV, images_dir=images.name, batch_size=2)
+        self.assertEqual((stats['created'], stats['updated'], stats['categories'], stats['images']), (3, 0, 2, 1))
+        self.assertEqual(stats['errors'], [
+            (5, "price must be a whole number, got ''"), (6, 'image is required for a new product'),
+        ])
+        # bulk writes send no signals: one cache bump for the whole import
+        self.assertEqual([c for c in callbacks if c is bump_catalog_version], [bump_catalog_version])
+
+        melon = Product.objects.get(name='Melon Pan')
+        self.assertRegex(melon.image.name, r'^products/melon\.[0-9a-f]{12}\.jpg$')
+        self.assertTrue(os.path.exists(os.path.join(media.name, melon.image.name)))
+        roll = Product.objects.get(name='Matcha Roll')
+        self.assertEqual((roll.image.name, roll.is_available, roll.category.name), ('products/roll.jpg', False, 'Cakes'))
+
+    def test_updates_match_on_id_or_category_and_name(self):
+        self.run_import(self.CSV)
+        shokupan = Product.objects.get(name='Shokupan')
+        jsonl = '\n'.join(json.dumps(row) for row in [
+            {'id': shokupan.id, 'name': 'Shokupan Loaf', 'category': 'Bread', 'price': 550},
+            {'name': 'Melon Pan', 'category': 'Bread', 'price': 320, 'is_available': False},
+            'not an object',
+        ]) + '\n{broken'
+        stats = self.run_import(jsonl, 'jsonl')
+        self.assertEqual((stats['created'], stats['updated'], len(stats['errors'])), (0, 2, 2))
+        self.assertEqual(Product.objects.get(id=shokupan.id).price, 550)
+        # an update without an image keeps the stored one
+        self.assertEqual(Product.objects.get(id=shokupan.id).image.name, 'products/shokupan.jpg')
+        self.assertFalse(Product.objects.get(name='Melon Pan').is_available)
+        self.assertEqual(Product.objects.count(), 3)
+
+    def test_queries_grow_per_batch_not_per_row(self):
+        def rows(n, offset=0):
+            return 'name,category,price,image\n' + ''.join(
+                f'Item {offset + i},Bulk,{100 + i},products/{i}.jpg\n' for i in range(n)
+            )
+
+        Category.objects.create(name='Bulk')
+        with CaptureQueriesContext(connection) as small:
+            self.run_import(rows(5))
+        with CaptureQueriesContext(connection) as large:
+            self.run_import(rows(100, offset=5))
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(Product.objects.filter(category__name='Bulk').count(), 105)
+
+    def test_batches_commit_separately_unless_atomic(self):
+        rows = 'name,category,price,image\n' + ''.join(f'Item {i},Bulk,100,products/{i}.jpg\n' for i in range(4))
+        real_batch = catalog_io._import_batch
+
+        def failing_second(rows, *args):
+            if rows[0][1]['name'] == 'Item 2':
+                raise RuntimeError('disk full')
+            return real_batch(rows, *args)
+
+        with mock.patch('accounts.catalog_io._import_batch', failing_second):
+            with self.assertRaises(RuntimeError):
+                self.run_import(rows, batch_size=2, atomic=True)
+            self.assertFalse(Product.objects.exists())
+            with self.captureOnCommitCallbacks() as callbacks, self.assertRaises(RuntimeError):
+                self.run_import(rows, batch_size=2)
+        self.assertEqual(sorted(Product.objects.values_list('name', flat=True)), ['Item 0', 'Item 1'])
+        # what was committed is still announced
+        self.assertIn(bump_catalog_version, callbacks)
+
+    def test_dry_run_rolls_back(self):
+        stats = self.run_import(self.CSV, dry_run=True)
+        self.assertEqual(stats['created'], 3)
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(Category.objects.exists())
+
+    def test_export_round_trips_through_import(self):
+        self.run_import(self.CSV)
+        for fmt in ('csv', 'jsonl'):
+            out = StringIO()
+            self.assertEqual(export_catalog(out, fmt, batch_size=2), 3)
+            stats = self.run_import(out.getvalue(), fmt)
+            self.assertEqual((stats['created'], stats['updated'], stats['unchanged'], stats['errors']), (0, 0, 3, []))
+
+        out = StringIO()
+        call_command('export_catalog', stdout=out, stderr=StringIO())
+        self.assertIn('Matcha Roll,Cakes,450,,products/roll.jpg,false', out.getvalue())
+
+
+# ===== RECOMMENDATIONS =====
+class RecommendationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.bread = Category.objects.create(name='Bread')
+        self.products = {
+            name: Product.objects.create(name=name, category=self.bread, price=300, image='products/a.jpg')
+            for name in ['Shokupan', 'Melon Pan', 'Anpan', 'Curry Pan', 'Sold Out']
+        }
+        self.products['Sold Out'].is_available = False
+        self.products['Sold Out'].save()
+
+    def review(self, username, ratings):
+        user, _ = User.objects.get_or_create(username=username)
+        for name, rating in ratings.items():
+            ProductReview.objects.create(product=self.products[name], user=user, rating=rating)
+
+    def test_customers_also_liked_ranks_by_shared_fans(self):
+        # Shokupan fans also like Melon Pan (3 customers) and Anpan (2); a
+        # single shared fan, a 2-star review or an unavailable product don't count.
+        self.review('a', {'Shokupan': 5, 'Melon Pan': 5, 'Anpan': 4, 'Sold Out': 5})
+        self.review('b', {'Shokupan': 4, 'Melon Pan': 4, 'Anpan': 5, 'Sold Out': 5})
+        self.review('c', {'Shokupan': 5, 'Melon Pan': 5, 'Curry Pan': 5, 'Anpan': 2})
+
+        pairs = {(a, b): n for a, b, n in co_occurrences()}
+        shokupan, melon, anpan = (self.products[name].id for name in ['Shokupan', 'Melon Pan', 'Anpan'])
+        self.assertEqual(pairs[shokupan, melon], 3)
+        self.assertEqual(pairs[shokupan, anpan], 2)
+        self.assertNotIn((shokupan, self.products['Curry Pan'].id), pairs)
+
+        counts = rebuild_recommendations()
+        self.assertEqual(counts['bestsellers'], 4)
+        related = recommendations_for(self.products['Shokupan'])['related']
+        self.assertEqual([p.name for p in related], ['Melon Pan', 'Anpan'])
+
+    def test_top_rated_uses_a_bayesian_average_and_skips_the_current_product(self):
+        # One 5-star review must not beat a long run of 4- and 5-star reviews.
+        self.review('a', {'Curry Pan': 5})
+        for i in range(10):
+            self.review(f'fan{i}', {'Anpan': 5 if i % 2 else 4, 'Melon Pan': 3, 'Sold Out': 5})
+        rebuild_recommendations()
+
+        top = recommendations_for(self.products['Shokupan'])['top_rated']
+        self.assertEqual([p.name for p in top], ['Anpan', 'Curry Pan', 'Melon Pan'])
+        top = recommendations_for(self.products['Anpan'])['top_rated']
+        self.assertNotIn('Anpan', [p.name for p in top])
+
+    def test_rebuild_replaces_the_previous_rankings(self):
+        self.review('a', {'Shokupan': 5, 'Melon Pan': 5})
+        self.review('b', {'Shokupan': 5, 'Melon Pan': 5})
+        call_command('rebuild_recommendations', stdout=StringIO())
+        ProductReview.objects.all().delete()
+        call_command('rebuild_recommendations', stdout=StringIO())
+        self.assertFalse(RelatedProduct.objects.exists())
+        self.assertFalse(CategoryBestseller.objects.exists())
+
+    def test_product_page_shows_recommendations(self):
+        self.review('a', {'Shokupan': 5, 'Melon Pan': 5})
+        self.review('b', {'Shokupan': 5, 'Melon Pan': 5})
+        rebuild_recommendations()
+        response = self.client.get(reverse('product_detail', args=[self.products['Shokupan'].id]))
+        self.assertContains(response, 'Customers Also Liked')
+        self.assertContains(response, 'Top Rated in Bread')
+        self.assertContains(response, reverse('product_detail', args=[self.products['Melon Pan'].id]))
+
+
+# ===== CATALOG API =====
+class CatalogApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.bread = Category.objects.create(name='Bread')
+        self.cakes = Category.objects.create(name='Cakes')
+        self.products = [
+            Product.objects.create(name=f'Item {i}', category=self.bread if i % 2 else self.cakes,
+                                   price=100 + i, description='', image=f'products/{i}.jpg')
+            for i in range(5)
+        ]
+        user = User.objects.create_user('api_user')
+        ProductReview.objects.create(product=self.products[0], user=user, rating=4, comment='Good')
+
+    def get(self, name, args=(), **params):
+        return self.client.get(reverse(name, args=args), params)
+
+    def test_sparse_fields_and_keyset_pagination(self):
+        response = self.get('api_products', fields='id,name,rating,review_count', limit=2)
+        body = response.json()
+        self.assertEqual(body['data'][0], {'id': self.products[0].id, 'name': 'Item 0', 'rating': 4.0, 'review_count': 1})
+        self.assertEqual(len(body['data']), 2)
+
+        seen = [row['id'] for row in body['data']]
+        while body['next']:
+            body = self.client.get(body['next']).json()
+            seen += [row['id'] for row in body['data']]
+        self.assertEqual(seen, [p.id for p in self.products])
+
+    def test_filters_detail_and_reviews(self):
+        body = self.get('api_products', category=self.bread.id, available='true').json()
+        self.assertEqual([row['name'] for row in body['data']], ['Item 1', 'Item 3'])
+        self.assertEqual(body['data'][0]['image'], '/media/products/1.jpg')
+
+        product = self.get('api_product', [self.products[0].id], fields='name,price').json()
+        self.assertEqual(product, {'data': {'name': 'Item 0', 'price': 100}})
+        reviews = self.get('api_product_reviews', [self.products[0].id]).json()['data']
+        self.assertEqual([(r['rating'], r['comment'], r['photo']) for r in reviews], [(4, 'Good', None)])
+        self.assertEqual([c['name'] for c in self.get('api_categories').json()['data']], ['Bread', 'Cakes'])
+
+    def test_json_is_the_same_with_or_without_orjson(self):
+        data = {
+            'at': datetime.datetime(2024, 5, 1, 9, 30, 0, 123456, tzinfo=datetime.timezone.utc),
+            'on': datetime.date(2024, 5, 1), 'price': Decimal('1.50'), 'name': 'メロンパン',
+        }
+        fast = api.dumps(data)
+        with mock.patch('accounts.api.orjson', None):
+            self.assertEqual(api.dumps(data), fast)
+        self.assertEqual(json.loads(fast)['at'], '2024-05-01T09:30:00.123Z')
+
+    def test_bad_requests(self):
+        self.assertEqual(self.get('api_products', fields='name,password').status_code, 400)
+        self.assertEqual(self.get('api_products', after='x').status_code, 400)
+        self.assertEqual(self.get('api_product', [999]).status_code, 404)
+        self.assertEqual(self.client.post(reverse('api_products')).status_code, 405)
+
+    def test_conditional_get_until_the_catalog_changes(self):
+        response = self.get('api_products')
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('api_products'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            # and the same URL without the header is served from the cache
+            self.assertEqual(self.get('api_products').content, response.content)
+
+        bump_catalog_version()
+        response = self.client.get(reverse('api_products'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_change_feed_returns_deltas_and_tombstones(self):
+        cursor = self.get('api_changes', since='latest').json()['cursor']
+        self.assertEqual(self.get('api_changes', since=cursor).json()['data'], [])
+
+        first, second = self.products[:2]
+        second_id = second.id
+        first.price = 999
+        first.save()
+        first.save()  # logged twice, returned once
+        second.delete()  # its review goes with it
+        self.cakes.name = 'Cake'
+        self.cakes.save()
+
+        body = self.get('api_changes', since=cursor, limit=2).json()
+        changes = body['data']
+        while body['next']:
+            body = self.client.get(body['next']).json()
+            changes += body['data']
+        self.assertEqual(
+            [(c['type'], c['id'], c['deleted']) for c in changes],
+            [('product', first.id, False), ('product', second_id, True), ('category', self.cakes.id, False)],
+        )
+        self.assertEqual(changes[0]['data']['price'], 999)
+        self.assertIn('updated_at', changes[0]['data'])
+        self.assertEqual(self.get('api_changes', since=body['cursor']).json()['data'], [])
+
+    def test_deleting_a_user_logs_their_reviews(self):
+        cursor = self.get('api_changes', since='latest').json()['cursor']
+        review = ProductReview.objects.get()
+        with mock.patch('accounts.changes.schedule_catalog_bump') as bump:
+            User.objects.get(username='api_user').delete()
+        bump.assert_called_once()
+        changes = self.get('api_changes', since=cursor).json()['data']
+        self.assertEqual([(c['type'], c['id'], c['deleted']) for c in changes], [('review', review.id, True)])
+
+    def test_purged_cursor_asks_for_a_resync(self):
+        cursor = self.get('api_changes', since='latest').json()['cursor']
+        self.products[0].save()
+        self.products[0].save()
+        CatalogChange.objects.filter(id__lte=cursor + 1).delete()
+        self.assertEqual(self.get('api_changes', since=cursor).status_code, 410)
+        self.assertEqual(self.get('api_changes', since=cursor + 1).status_code, 200)
+
+
+# ===== SHARED CACHE BACKEND =====
+def _increment_many(path, times):
+    cache = SQLiteCache(path, {})
+    for _ in range(times):
+        cache.incr('hits')
+
+
+class SharedCacheTests(TestCase):
+    def make_cache(self, **options):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite3')
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_suite_does_not_use_the_live_cache_file(self):
+        self.assertNotEqual(os.path.abspath(cache.path), os.path.abspath(settings.BASE_DIR / 'cache.sqlite3'))
+
+    def test_basic_operations_and_expiry(self):
+        cache = self.make_cache()
+        cache.set('plain', {'a': 1})
+        self.assertEqual(cache.get('plain'), {'a': 1})
+        self.assertFalse(cache.add('plain', 'other'))
+        cache.set('gone', 'x', timeout=0)
+        self.assertIsNone(cache.get('gone'))
+        self.assertTrue(cache.add('gone', 'back'))
+        self.assertEqual(cache.get_many(['plain', 'gone', 'missing']), {'plain': {'a': 1}, 'gone': 'back'})
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        cache.set('text', 'ab')
+        self.assertEqual(cache.incr('text', 'c'), 'abc')
+
+    def test_workers_share_entries_and_invalidations(self):
+        first = self.make_cache()
+        second = SQLiteCache(self.path, {})
+        first.set('catalog:version', 1, None)
+        self.assertEqual(second.incr('catalog:version'), 2)
+        self.assertEqual(first.get('catalog:version'), 2)
+        second.delete('catalog:version')
+        self.assertFalse(first.has_key('catalog:version'))
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs fork')
+    def test_incr_is_atomic_across_processes(self):
+        cache = self.make_cache()
+        cache.set('hits', 0, None)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=_increment_many, args=(self.path, 200)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(cache.get('hits'), 800)
+
+    def test_least_recently_used_entries_are_evicted_first(self):
+        cache = self.make_cache(MAX_ENTRIES=50, CULL_FREQUENCY=5)
+        with mock.patch('accounts.sqlite_cache.ACCESS_RESOLUTION', 0):
+            cache.set('keep', 'me')
+            for i in range(200):
+                cache.set(f'filler:{i}', i)
+                cache.get('keep')
+        cache.cull()
+        self.assertEqual(cache.get('keep'), 'me')
+        self.assertLessEqual(cache.db.execute('SELECT COUNT(*) FROM cache').fetchall()[0][0], 50)
+        self.assertIsNone(cache.get('filler:0'))
+
+    def test_size_bound(self):
+        cache = self.make_cache(MAX_SIZE=10000)
+        for i in range(10):
+            cache.set(f'blob:{i}', b'x' * 2000)
+        cache.cull()
+        self.assertLessEqual(cache.db.execute('SELECT SUM(size) FROM cache').fetchall()[0][0], 10000)
+        self.assertIsNotNone(cache.get('blob:9'))
+
+
+# ===== STATIC SNAPSHOTS =====
+class SnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        overrides = override_settings(SNAPSHOTS_ENABLED=True, SNAPSHOT_ROOT=self.root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        category = Category.objects.create(name='Bread')
+        self.product = Product.objects.create(name='Shokupan', category=category, price=500, image='products/a.jpg')
+
+    def test_anonymous_page_is_written_then_served_from_disk(self):
+        url = reverse('product_detail', args=[self.product.id])
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            second = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(second['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(b''.join(second.streaming_content)), first.content)
+        self.assertEqual(second['X-Frame-Options'], 'DENY')
+        plain = self.client.get(url)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(b''.join(plain.streaming_content), first.content)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=second['ETag']).status_code, 304)
+
+    def test_sessions_query_strings_and_catalog_changes_bypass_the_snapshot(self):
+        url = reverse('main')
+        self.client.get(url)
+        self.assertTrue(self.client.get(url).streaming)
+        self.assertFalse(self.client.get(url, {'q': 'x'}).streaming)
+
+        bump_catalog_version()
+        self.assertFalse(self.client.get(url).streaming)  # re-rendered for the new version
+        self.assertEqual(len(os.listdir(self.root)), 1)  # and the old version pruned
+
+        self.client.force_login(User.objects.create_user('member', 'member@example.com', 'x'))
+        response = self.client.get(url)
+        self.assertFalse(response.streaming)
+        self.assertContains(response, 'MY PROFILE')
+
+    def test_new_release_gets_fresh_snapshots(self):
+        self.addCleanup(code_fingerprint.cache_clear)
+        code_fingerprint.cache_clear()
+        key = snapshot_key()
+        self.assertEqual(snapshot_key(), key)
+        with override_settings(RELEASE_ID='abc123'):
+            code_fingerprint.cache_clear()
+            released = snapshot_key()
+        self.assertNotEqual(released, key)
+        self.assertEqual(released.split('-')[:2], key.split('-')[:2])
+
+    def test_render_snapshot_command(self):
+        out = StringIO()
+        call_command('render_snapshot', stdout=out)
+        self.assertIn('Rendered 5 pages (0 already current)', out.getvalue())
+        call_command('render_snapshot', '--no-products', stdout=out)
+        self.assertIn('Rendered 0 pages (4 already current)', out.getvalue())
+        self.assertTrue(self.client.get(reverse('shopnow')).streaming)
+
+
+# ===== GUNICORN CONFIG =====
+class GunicornConfigTests(TestCase):
+    def load_config(self, **env):
+        with mock.patch.dict(os.environ, env):
+            return runpy.run_path(str(settings.BASE_DIR / 'gunicorn.conf.py'))
+
+    def test_defaults_preload_and_scale_with_cpus(self):
+        config = self.load_config(WEB_CONCURRENCY='', PORT='9000')
+        self.assertTrue(config['preload_app'])
+        self.assertEqual(config['bind'], '0.0.0.0:9000')
+        self.assertEqual(config['workers'], config['default_workers']())
+        self.assertEqual(config['default_workers'](2), 5)
+        self.assertEqual(config['default_workers'](64), 8)
+        self.assertGreater(config['max_requests_jitter'], 0)
+
+    def test_environment_overrides(self):
+        config = self.load_config(WEB_CONCURRENCY='3', GUNICORN_WORKER_CLASS='gthread', GUNICORN_THREADS='8',
+                                  GUNICORN_PRELOAD='0')
+        self.assertEqual((config['workers'], config['worker_class'], config['threads']), (3, 'gthread', 8))
+        self.assertFalse(config['preload_app'])
+        config = self.load_config(GUNICORN_WORKER_CLASS='uvicorn')
+        self.assertEqual(config['wsgi_app'], 'baseproject.asgi:application')
+
+    @unittest.skipUnless(os.path.exists('/proc/self/status'), 'needs /proc')
+    def test_process_memory_reads_proc(self):
+        memory = process_memory(os.getpid())
+        self.assertGreater(memory['rss_kb'], 0)
+        self.assertEqual(child_pids(os.getpid()), [])
+
+
+class StartupReportTests(TestCase):
+    SAMPLE = (
+        'import time: self [us] | cumulative | imported package\n'
+        'import time:       120 |        120 |     email.errors\n'
+        'import time:       300 |        420 |   django.core.mail\n'
+        'import time:       900 |       1320 | accounts.views\n'
+    )
+
+    def test_parse_importtime(self):
+        rows = parse_importtime(self.SAMPLE)
+        self.assertEqual([(r['module'], r['depth']) for r in rows],
+                         [('email.errors', 2), ('django.core.mail', 1), ('accounts.views', 0)])
+        self.assertEqual(slowest(rows, 'self_us', limit=1)[0]['module'], 'accounts.views')
+        self.assertEqual([r['module'] for r in slowest(rows, project_only=True)], ['accounts.views'])
+
+    def test_measure_setup_in_a_fresh_interpreter(self):
+        report = measure_startup('setup', repeat=1)
+        modules = {row['module'] for row in report['imports']}
+        self.assertIn('accounts.signals', modules)
+        self.assertGreater(report['wall_ms'], 0)
+
+
+# ===== THROTTLING =====
+@override_settings(THROTTLE_ENABLED=True, THROTTLE_RATES={
+    'search_ajax': {'ip': '3/m', 'user': '2/m'},
+    'login': {'ip': '2/m', 'methods': ['POST']},
+})
+class ThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('10/m'), (10, 60))
+        self.assertEqual(parse_rate('5/15m'), (5, 900))
+        with self.assertRaises(ValueError):
+            parse_rate('10 per minute')
+
+    def test_sliding_window_counts_the_previous_window(self):
+        self.assertEqual([hit(cache, 'k', 2, 60, now=600 + i)[0] for i in range(3)], [True, True, False])
+        # Halfway through the next window half of the old count still applies.
+        self.assertEqual(hit(cache, 'k', 2, 60, now=690), (False, 30))
+        self.assertTrue(hit(cache, 'k', 2, 60, now=780)[0])
+
+    def test_ip_limit_returns_429_without_touching_the_database(self):
+        url = reverse('search_ajax')
+        for _ in range(3):
+            self.assertEqual(self.client.get(url, {'q': 'cake'}).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'q': 'cake'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertFalse(response.json()['success'])
+        # Another client address has its own bucket.
+        self.assertEqual(self.client.get(url, {'q': 'cake'}, REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    def test_head_and_other_methods_count_too(self):
+        url = reverse('search_ajax')
+        self.client.head(url, {'q': 'cake'})
+        self.client.options(url)
+        self.assertEqual(self.client.get(url, {'q': 'cake'}).status_code, 200)
+        self.assertEqual(self.client.head(url, {'q': 'cake'}).status_code, 429)
+
+    def test_user_limit_follows_the_user_across_addresses(self):
+        self.client.force_login(User.objects.create_user('thrifty', 'thrifty@example.com', 'x'))
+        url = reverse('search_ajax')
+        statuses = [self.client.get(url, {'q': 'cake'}, REMOTE_ADDR=f'10.0.0.{i}').status_code for i in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    def test_clients_behind_the_proxy_get_their_own_buckets(self):
+        self.assertEqual(settings.THROTTLE_PROXY_COUNT, 1)
+        url = reverse('search_ajax')
+        for _ in range(3):
+            self.client.get(url, {'q': 'cake'}, HTTP_X_FORWARDED_FOR='203.0.113.1', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(
+            self.client.get(url, {'q': 'cake'}, HTTP_X_FORWARDED_FOR='203.0.113.1', REMOTE_ADDR='10.0.0.1').status_code,
+            429,
+        )
+        self.assertEqual(
+            self.client.get(url, {'q': 'cake'}, HTTP_X_FORWARDED_FOR='203.0.113.2', REMOTE_ADDR='10.0.0.1').status_code,
+            200,
+        )
+
+    def test_method_filter_and_forwarded_for(self):
+        url = reverse('login')
+        for _ in range(4):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        with self.settings(THROTTLE_PROXY_COUNT=1):
+            statuses = [
+                self.client.post(url, {'username': 'x', 'password': 'y'},
+                                 HTTP_X_FORWARDED_FOR=f'spoofed, 203.0.113.{i // 3}').status_code
+                for i in range(6)
+            ]
+        self.assertEqual(statuses, [200, 200, 429, 200, 200, 429])
+
+
+# ===== LOAD TEST HARNESS =====
+class LoadTestHarnessTests(LiveServerTestCase):
+    def test_journey_hits_every_step(self):
+        seed_catalog(categories=2, products=8, reviews=10, users=2)
+        User.objects.create_user('shopper', 'shopper@example.com', 'load-test-pass')
+
+        report = run_load_test(self.live_server_url, users=2, iterations=1,
+                               username='shopper', password='load-test-pass')
+
+        steps = {row['step']: row for row in report['steps']}
+        self.assertEqual(set(steps), set(STEPS))
+        self.assertEqual(report['errors'], 0, report['steps'])
+        self.assertEqual(report['journeys'], 2)
+        # The second category's tab is only reachable through its fragment.
+        self.assertEqual(steps['shopnow_products']['requests'], 2)
+
+
+# ===== REQUEST PROFILER =====
+class RequestProfilerTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.profile_dir = tmp.name
+        overrides = override_settings(PROFILER_DIR=self.profile_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'x', is_staff=True)
+
+    def test_unflagged_requests_are_not_profiled(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('menu'))
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(os.listdir(self.profile_dir), [])
+
+    def test_flag_is_ignored_for_non_staff(self):
+        self.client.force_login(User.objects.create_user('customer', 'c@example.com', 'x'))
+        response = self.client.get(reverse('menu'), {'__profile': '1'})
+        self.assertNotIn('X-Profile-Id', response)
+
+    def test_staff_flag_records_profile_listed_on_staff_page(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('menu'), {'__profile': '1'})
+        name = response['X-Profile-Id']
+        self.assertEqual(os.listdir(self.profile_dir), [name])
+
+        listing = self.client.get(reverse('request_profiles'))
+        self.assertContains(listing, name)
+        text = self.client.get(reverse('request_profile_download', args=[name]), {'format': 'txt'})
+        self.assertContains(text, 'function calls')
+        download = self.client.get(reverse('request_profile_download', args=[name]))
+        self.assertEqual(download['Content-Disposition'], f'attachment; filename="{name}"')
+
+    def test_download_rejects_unknown_names(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('request_profile_download', args=['..secret.prof']))
+        self.assertEqual(response.status_code, 404)
+
+
+# ===== ASSET PIPELINE =====
+class MinifierTests(TestCase):
+    def test_minify_css_keeps_strings_and_descendant_pseudo_selectors(self):
+        css = "/* don't keep */\n.a :hover ,\n .b > .c {\n  content: ' x  y ';\n  margin : 0 auto;\n}\n"
+        self.assertEqual(minify_css(css), ".a :hover,.b>.c{content:' x  y ';margin :0 auto}")
+
+    def test_minify_js_keeps_newlines_and_strings(self):
+        js = "// comment\nlet a = 1   +  +b; /* block */\nconst url = 'http://x//y';\nreturn a\n"
+        self.assertEqual(minify_js(js), "let a=1+ +b;\nconst url='http://x//y';\nreturn a\n")
+
+
+class AssetBundleTests(TestCase):
+    def test_collectstatic_builds_hashed_compressed_bundles(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(STATIC_ROOT=tmp):
+            call_command('collectstatic', interactive=False, verbosity=0)
+
+            with open(os.path.join(tmp, 'staticfiles.json')) as fh:
+                hashed = json.load(fh)['paths']['bundles/shopnow.css']
+            self.assertRegex(hashed, r'^bundles/shopnow\.[0-9a-f]{12}\.css$')
+            self.assertTrue(os.path.exists(os.path.join(tmp, hashed + '.gz')))
+
+            staticfiles_storage._wrapped = empty  # reload with the new manifest
+            html = Template("{% load assets %}{% css_bundle 'shopnow' %}").render(Context())
+            with open(os.path.join(tmp, 'bundles/shopnow.critical.css')) as fh:
+                critical = fh.read()
+            with open(os.path.join(tmp, 'bundles/shopnow.css')) as fh:
+                full = fh.read()
+            self.assertEqual(html, (
+                f'<style>{critical}</style>\n'
+                f'<link rel="preload" href="/static/{hashed}" as="style" '
+                'onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+                f'<noscript><link rel="stylesheet" href="/static/{hashed}"></noscript>'
+            ))
+            # Product cards come from an {% include %}; hover states wait for the full bundle.
+            self.assertIn('.product-card{', critical)
+            self.assertIn('.category-content.active{', critical)
+            self.assertNotIn(':hover', critical)
+            self.assertLess(len(critical), len(full))
+
+    def test_critical_css_keeps_rules_for_the_markup(self):
+        css = minify_css(
+            '@import url(x.css); .a, .b .c { color: red } .a:hover { color: blue } #d { margin: 0 }'
+            ' @media (max-width: 10px) { .a { top: 0 } .e { top: 1px } } @media print { .e { top: 2px } }'
+            ' @keyframes spin { to { transform: rotate(1turn) } } :is(.a, .e) > p { left: 0 } body { margin: 0 }'
+        )
+        names = _markup_names('<div class="a {% if x %}b{% endif %} alert-{{ tag }}" id="d">'
+                              "<script>el.classList.add('c')</script>")
+        self.assertEqual(names, {('.', 'a'), ('.', 'b'), ('.', 'c'), ('#', 'd')})
+        self.assertEqual(
+            critical_css(css, names),
+            '@import url(x.css);.a,.b .c{color:red}#d{margin:0}@media (max-width:10px){.a{top:0}}body{margin:0}',
+        )
+
+
+# ===== PRELOAD HINTS =====
+@override_settings(SNAPSHOTS_ENABLED=False)
+class PreloadHintTests(TestCase):
+    def setUp(self):
+        hints._learned.clear()
+
+    def test_pages_preload_their_assets(self):
+        response = self.client.get(reverse('location'))
+        links = response['Link'].split(', ')
+        self.assertIn('<https://fonts.gstatic.com>; rel=preconnect; crossorigin', links)
+        for path in bundle_files('location', 'css'):
+            self.assertIn(f'<{static(path)}>; rel=preload; as=style', links)
+        for path in bundle_files('base', 'js'):
+            self.assertIn(f'<{static(path)}>; rel=preload; as=script', links)
+        self.assertIn(f"<{static('Main/others/favicon-32x32.png')}>; rel=preload; as=image", links)
+        self.assertEqual(hints.learned_links(reverse('location')), links)
+
+        self.assertNotIn('Link', self.client.get(reverse('search_ajax'), {'q': 'bun'}))
+
+    def test_snapshots_get_the_links_of_the_rendered_page(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(SNAPSHOTS_ENABLED=True, SNAPSHOT_ROOT=tmp):
+            rendered = self.client.get(reverse('menu'))
+            snapshot = self.client.get(reverse('menu'))
+        self.assertTrue(snapshot.streaming)
+        self.assertEqual(snapshot['Link'], rendered['Link'])
+
+    def run_asgi(self, extensions):
+        sent, calls = [], []
+
+        async def app(scope, receive, send):
+            calls.append(scope['path'])
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'GET', 'path': reverse('menu'), 'extensions': extensions}
+        asyncio.run(hints.EarlyHintsMiddleware(app)(scope, None, send))
+        self.assertEqual(calls, [reverse('menu')])
+        return sent
+
+    def test_early_hints_replay_the_last_links(self):
+        self.assertEqual(self.run_asgi({hints.EARLY_HINT: {}}), [])  # nothing learned yet
+        links = self.client.get(reverse('menu'))['Link'].split(', ')
+        self.assertEqual(
+            self.run_asgi({hints.EARLY_HINT: {}}),
+            [{'type': hints.EARLY_HINT, 'links': [link.encode() for link in links]}],
+        )
+        self.assertEqual(self.run_asgi({}), [])  # the server can't send them
+        with override_settings(EARLY_HINTS_ENABLED=False):
+            self.assertEqual(self.run_asgi({hints.EARLY_HINT: {}}), [])
+
+
+
+# ===== ENQUIRIES =====
+# A 1x1 transparent GIF.
+TINY_GIF = b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,' \
+           b'\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+
+
+@override_settings(THROTTLE_ENABLED=False, ENQUIRY_DIGEST_RECIPIENTS=['staff@example.com'])
+class EnquiryTests(TestCase):
+    def enquire(self, name='Hana', **extra):
+        return self.client.post(reverse('enquiries'), {
+            'inquiry_type': 'orders', 'name': name, 'email': f'{name.lower()}@example.com',
+            'message': 'Can I order 40 melon pan for Saturday?', **extra,
+        })
+
+    def test_enquiry_is_saved_without_sending_mail(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        with self.settings(MEDIA_ROOT=media.name):
+            response = self.enquire(photo=SimpleUploadedFile('cake.gif', TINY_GIF, content_type='image/gif'))
+        self.assertRedirects(response, reverse('enquiry_success'), fetch_redirect_response=False)
+        self.assertEqual(mail.outbox, [])
+        enquiry = Enquiry.objects.get()
+        self.assertEqual((enquiry.name, enquiry.inquiry_type), ('Hana', 'orders'))
+        self.assertTrue(enquiry.photo.name.startswith('enquiry_photos/'))
+        self.assertTrue(os.path.exists(os.path.join(media.name, enquiry.photo.name)))
+
+    def test_mail_is_batched_over_one_connection(self):
+        for name in ('Hana', 'Kenji', 'Yui'):
+            self.enquire(name)
+        with mock.patch('accounts.enquiries.get_connection', wraps=mail.get_connection) as get_connection:
+            counts = send_enquiry_mail(digest=True)
+        get_connection.assert_called_once()
+        self.assertEqual(counts, {'confirmations': 3, 'refused': 0, 'digest': 3})
+        self.assertEqual([m.to for m in mail.outbox], [
+            ['hana@example.com'], ['kenji@example.com'], ['yui@example.com'], ['staff@example.com'],
+        ])
+        digest = mail.outbox[-1]
+        self.assertEqual(digest.subject, '3 new enquiries - WENDY WOO')
+        self.assertIn(reverse('admin:accounts_enquiry_change', args=[Enquiry.objects.get(name='Yui').pk]), digest.body)
+
+        # Nothing waiting: no connection, nothing sent twice.
+        with mock.patch('accounts.enquiries.get_connection') as get_connection:
+            self.assertEqual(send_enquiry_mail(digest=True), {'confirmations': 0, 'refused': 0, 'digest': 0})
+        get_connection.assert_not_called()
+
+        self.enquire('Aoi')
+        out = StringIO()
+        call_command('send_enquiry_mail', stdout=out)
+        self.assertIn('Sent 1 confirmation(s) (0 refused); 0 enquiry(ies) in the digest', out.getvalue())
+        self.assertEqual(Enquiry.objects.filter(notified_at__isnull=True).count(), 1)
+
+    def test_failed_run_resumes_without_duplicates(self):
+        for name in ('Hana', 'Kenji', 'Yui'):
+            self.enquire(name)
+        original = LocmemEmailBackend.send_messages
+        calls = []
+
+        def flaky(backend, messages):
+            calls.append(messages)
+            if len(calls) == 2:
+                raise ConnectionError('connection dropped')
+            return original(backend, messages)
+
+        with mock.patch.object(LocmemEmailBackend, 'send_messages', flaky):
+            with self.assertRaises(ConnectionError):
+                send_enquiry_mail()
+        self.assertEqual(send_enquiry_mail(), {'confirmations': 2, 'refused': 0, 'digest': 0})
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['hana@example.com', 'kenji@example.com', 'yui@example.com'])
+
+    def test_refused_address_does_not_hold_up_the_rest(self):
+        for name in ('Hana', 'Bogus', 'Yui'):
+            self.enquire(name)
+        original = LocmemEmailBackend.send_messages
+
+        def refusing(backend, messages):
+            if 'bogus@example.com' in messages[0].to:
+                raise smtplib.SMTPRecipientsRefused({'bogus@example.com': (550, b'No such user')})
+            return original(backend, messages)
+
+        with mock.patch.object(LocmemEmailBackend, 'send_messages', refusing):
+            self.assertEqual(send_enquiry_mail(digest=True), {'confirmations': 2, 'refused': 1, 'digest': 3})
+            self.assertEqual([m.to for m in mail.outbox], [
+                ['hana@example.com'], ['yui@example.com'], ['staff@example.com'],
+            ])
+            bogus = Enquiry.objects.get(name='Bogus')
+            self.assertEqual(bogus.confirmation_attempts, 1)
+            self.assertIn('No such user', bogus.confirmation_error)
+            for _ in range(MAX_ATTEMPTS - 1):
+                send_enquiry_mail()
+            # Given up on: no further tries, and no connection for it alone.
+            with mock.patch('accounts.enquiries.get_connection') as get_connection:
+                self.assertEqual(send_enquiry_mail(), {'confirmations': 0, 'refused': 0, 'digest': 0})
+            get_connection.assert_not_called()
+        bogus.refresh_from_db()
+        self.assertEqual(bogus.confirmation_attempts, MAX_ATTEMPTS)
+        self.assertIsNone(bogus.confirmation_sent_at)
+
+    def test_staff_inbox_search(self):
+        self.enquire('Hana')
+        self.enquire('Kenji', message='Do your cakes contain nuts?')
+        staff = User.objects.create_superuser('staff', 'staff@example.com', 'x')
+        self.client.force_login(staff)
+        response = self.client.get(reverse('admin:accounts_enquiry_changelist'), {'q': 'nuts'})
+        self.assertContains(response, 'kenji@example.com')
+        self.assertNotContains(response, 'hana@example.com')
+
+
+
+# ===== MAINTENANCE =====
+class PurgeStaleTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+
+    def session(self, key, data, touched_days_ago):
+        """A session last saved `touched_days_ago` days ago."""
+        age = timezone.timedelta(seconds=settings.SESSION_COOKIE_AGE)
+        Session.objects.create(
+            session_key=key, session_data=session_store()().encode(data),
+            expire_date=self.now - timezone.timedelta(days=touched_days_ago) + age,
+        )
+
+    def run_all(self, **kwargs):
+        return {name: run_job(name, pause=0, now=self.now, **kwargs)['deleted']
+                for name in ('sessions', 'carts', 'signups', 'changes')}
+
+    def test_purges_only_what_is_stale(self):
+        for i in range(5):
+            self.session(f'expired{i}', {'cart': {'1': 1}}, touched_days_ago=30)
+        self.session('abandoned', {'cart': {'1': 2}}, touched_days_ago=10)
+        self.session('recent', {'cart': {'1': 2}}, touched_days_ago=1)
+        self.session('member', {'cart': {'1': 2}, '_auth_user_id': '1'}, touched_days_ago=10)
+        self.session('no-cart', {'theme': 'dark'}, touched_days_ago=10)
+
+        old = self.now - timezone.timedelta(days=10)
+        User.objects.create_user('never_verified', 'a@example.com', 'x', is_active=False)
+        User.objects.create_user('just_signed_up', 'b@example.com', 'x', is_active=False)
+        User.objects.create_user('deactivated', 'c@example.com', 'x', is_active=False, last_login=old)
+        User.objects.create_user('customer', 'd@example.com', 'x')
+        User.objects.exclude(username='just_signed_up').update(date_joined=old)
+
+        CatalogChange.objects.bulk_create(CatalogChange(kind='product', object_id=i) for i in range(4))
+        CatalogChange.objects.update(changed_at=self.now - timezone.timedelta(days=60))
+        newest = CatalogChange.objects.create(kind='product', object_id=9)
+
+        self.assertEqual(self.run_all(batch_size=2, dry_run=True), {'sessions': 5, 'carts': 1, 'signups': 1, 'changes': 4})
+        self.assertEqual(Session.objects.count(), 9)
+
+        self.assertEqual(self.run_all(batch_size=2), {'sessions': 5, 'carts': 1, 'signups': 1, 'changes': 4})
+        self.assertEqual(sorted(Session.objects.values_list('session_key', flat=True)), ['member', 'no-cart', 'recent'])
+        self.assertEqual(sorted(User.objects.values_list('username', flat=True)),
+                         ['customer', 'deactivated', 'just_signed_up'])
+        self.assertEqual(list(CatalogChange.objects.values_list('pk', flat=True)), [newest.pk])
+        self.assertEqual(self.run_all(), {'sessions': 0, 'carts': 0, 'signups': 0, 'changes': 0})
+
+        # A client still holding a purged cursor is told to resync.
+        self.assertEqual(self.client.get(reverse('api_changes'), {'since': 1}).status_code, 410)
+
+    def test_sessions_saved_after_selection_are_kept(self):
+        self.session('abandoned', {'cart': {'1': 2}}, touched_days_ago=10)
+        self.session('expired', {'cart': {'1': 2}}, touched_days_ago=30)
+        [carts] = abandoned_carts(self.now, 10, False)
+        [expired] = expired_sessions(self.now, 10, False)
+        # Both visitors come back before the batch is deleted.
+        Session.objects.update(expire_date=self.now + timezone.timedelta(seconds=settings.SESSION_COOKIE_AGE))
+        self.assertEqual((delete_carts(carts, self.now), delete_sessions(expired, self.now)), (0, 0))
+        self.assertEqual(Session.objects.count(), 2)
+
+    def test_newest_change_is_kept(self):
+        CatalogChange.objects.create(kind='product', object_id=1)
+        CatalogChange.objects.update(changed_at=self.now - timezone.timedelta(days=60))
+        self.assertEqual(run_job('changes', pause=0, now=self.now)['deleted'], 0)
+
+    def test_command_reports_progress(self):
+        for i in range(7):
+            self.session(f'expired{i}', {}, touched_days_ago=30)
+        out = StringIO()
+        call_command('purge_stale', 'sessions', batch_size=2, pause=0, progress_every=2, stdout=out)
+        output = out.getvalue()
+        self.assertIn('sessions: 4 so far', output)
+        self.assertIn('sessions: Deleted 7 in 4 batches', output)
+        self.assertFalse(Session.objects.exists())
+        with self.assertRaises(CommandError):
+            call_command('purge_stale', 'tokens', stdout=StringIO())
+
+
+
+# ===== SERVICE WORKER =====
+class ServiceWorkerTests(TestCase):
+    def worker_config(self, response):
+        body = response.content.decode()
+        return json.loads(body.split('const CONFIG = ', 1)[1].split(';\n', 1)[0])
+
+    def test_worker_precaches_every_bundle(self):
+        response = self.client.get(reverse('service_worker'))
+        self.assertEqual(response['Content-Type'], 'application/javascript; charset=utf-8')
+        self.assertIn('no-cache', response['Cache-Control'])
+        config = self.worker_config(response)
+        self.assertEqual(config['precache'], precache_urls())
+        for path in bundle_files('shopnow', 'css') + bundle_files('base', 'js'):
+            self.assertIn(static(path), config['precache'])
+        self.assertEqual(
+            self.client.get(reverse('service_worker'), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304,
+        )
+
+    def test_url_patterns(self):
+        catalog = [re.compile(url_pattern(name)) for name in CATALOG_URLS]
+        state = [re.compile(url_pattern(name)) for name in STATE_URLS]
+        for path in ('/', '/shopnow/', '/shopnow/3/products/', '/product/12/', '/api/cart/data/'):
+            self.assertTrue(any(p.match(path) for p in catalog), path)
+        for path in ('/cart/', '/product/12/add-review/', '/checkout/payment/', '/sw.js'):
+            self.assertFalse(any(p.match(path) for p in catalog), path)
+        for path in ('/add-to-cart/5/', '/logout/'):
+            self.assertTrue(any(p.match(path) for p in state), path)
+
+    @override_settings(SNAPSHOTS_ENABLED=False)
+    def test_pages_register_the_worker_once_assets_are_hashed(self):
+        registration = f"navigator.serviceWorker.register('{reverse('service_worker')}')"
+        storage = 'accounts.templatetags.assets.staticfiles_storage'
+        with mock.patch(storage, mock.Mock(hashed_files={'base.css': 'base.0123456789ab.css'})):
+            self.assertContains(self.client.get(reverse('menu')), registration)
+            with self.settings(SERVICE_WORKER_ENABLED=False):
+                self.assertNotContains(self.client.get(reverse('menu')), registration)
+        with mock.patch(storage, mock.Mock(hashed_files={})):
+            self.assertNotContains(self.client.get(reverse('menu')), registration)
+
+
+# ===== MEDIA SERVING =====
+class MediaServingTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        overrides = override_settings(MEDIA_ROOT=tmp.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.storage = HashedMediaStorage(location=tmp.name)
+        self.name = self.storage.save('products/bun.jpg', ContentFile(b'0123456789'))
+
+    def get(self, **headers):
+        return self.client.get('/media/' + self.name, headers=headers)
+
+    def test_uploads_get_content_hashed_names_and_are_deduplicated(self):
+        self.assertRegex(self.name, r'^products/bun\.[0-9a-f]{12}\.jpg$')
+        self.assertEqual(self.storage.save('products/bun.jpg', ContentFile(b'0123456789')), self.name)
+
+    def test_hashed_file_is_immutable_and_revalidates(self):
+        response = self.get()
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+        self.assertEqual(self.get(if_none_match=response['ETag']).status_code, 304)
+
+    def test_byte_ranges(self):
+        response = self.get(range='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+
+        self.assertEqual(b''.join(self.get(range='bytes=-3').streaming_content), b'789')
+        self.assertEqual(self.get(range='bytes=20-').status_code, 416)
+
+    def test_accel_redirect_hands_the_bytes_to_nginx(self):
+        with override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/'):
+            response = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.name)
+        self.assertEqual(response.content, b'')
+
+    def test_paths_outside_media_root_are_not_served(self):
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
@@ -0,0 +1,130 @@
+# accounts/throttling.py
+"""
+Per-IP and per-user request throttling for the endpoints listed in
+settings.THROTTLE_RATES, checked before the view runs any query or sends
+any mail.
+"""
+import math
+import re
+import time
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+
+RATE_RE = re.compile(r'^(\d+)/(\d*)([smhd])$')
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+def parse_rate(rate):
+    """'10/m' -> (10, 60); '5/15m' -> (5, 900)."""
+    match = RATE_RE.match(rate)
+    if not match:
+        raise ValueError(f'Invalid throttle rate {rate!r}; expected e.g. "10/m" or "5/15m"')
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * PERIODS[unit]
+
+
+def client_ip(request):
+    """
+    The client address. Behind THROTTLE_PROXY_COUNT trusted proxies it is
+    taken that many entries from the right of X-Forwarded-For, the part of
+    the header a client cannot forge.
+    """
+    proxies = getattr(settings, 'THROTTLE_PROXY_COUNT', 0)
+    if proxies:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def hit(cache, key, limit, period, now=None):
+    """
+    Count one request against `key` and return (allowed, retry_after).
+
+    Sliding window over two fixed windows: the previous window's count is
+    weighted by how much of it still overlaps the last `period` seconds.
+    That behaves like a token bucket refilling at limit/period, but every
+    update is a single atomic cache.incr, so concurrent workers sharing the
+    cache never lose a count.
+    """
+    now = time.time() if now is None else now
+    window = int(now // period)
+    current_key = f'{key}:{window}'
+    cache.add(current_key, 0, period * 2)
+    try:
+        current = cache.incr(current_key)
+    except ValueError:  # expired between add() and incr()
+        cache.set(current_key, 1, period * 2)
+        current = 1
+    previous = cache.get(f'{key}:{window - 1}', 0)
+    elapsed = (now % period) / period
+    if previous * (1 - elapsed) + current <= limit:
+        return True, 0
+    return False, max(1, math.ceil(period - now % period))
+
+
+def throttled_methods(rules):
+    """The methods a rule counts: all of them without `methods`, and HEAD wherever GET is."""
+    methods = rules.get('methods')
+    if methods is None:
+        return None
+    methods = {method.upper() for method in methods}
+    if 'GET' in methods:
+        methods.add('HEAD')  # runs the same view
+    return methods
+
+
+def too_many_requests(request, retry_after):
+    message = 'Too many requests. Please wait a moment and try again.'
+    if request.path.startswith('/api/'):
+        response = JsonResponse({'success': False, 'error': message}, status=429)
+    else:
+        response = HttpResponse(message, status=429, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+# ===== MIDDLEWARE =====
+class ThrottleMiddleware:
+    """
+    Rejects requests over their URL's THROTTLE_RATES with a plain 429. The
+    IP bucket is checked first and needs nothing but the cache; the user
+    bucket reads the user id straight from the session, so the users table
+    is never queried.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not getattr(settings, 'THROTTLE_ENABLED', True):
+            return None
+        match = request.resolver_match
+        rules = getattr(settings, 'THROTTLE_RATES', {}).get(match.url_name if match else None)
+        if not rules:
+            return None
+        methods = throttled_methods(rules)
+        if methods is not None and request.method not in methods:
+            return None
+
+        cache = caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+        checks = []
+        if 'ip' in rules:
+            checks.append(('ip', client_ip(request), rules['ip']))
+        if 'user' in rules and settings.SESSION_COOKIE_NAME in request.COOKIES:
+            user_id = request.session.get(SESSION_KEY)
+            if user_id is not None:
+                checks.append(('user', user_id, rules['user']))
+
+        for scope, ident, rate in checks:
+            limit, period = parse_rate(rate)
+            allowed, retry_after = hit(cache, f'throttle:{match.url_name}:{scope}:{ident}', limit, period)
+            if not allowed:
+                return too_many_requests(request, retry_after)
+        return None
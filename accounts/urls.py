@@ -1,11 +1,13 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import api, serviceworker, views
 
 urlpatterns = [
     path('', views.main_page, name='main'),
+    path('sw.js', serviceworker.service_worker, name='service_worker'),
     path('menu/', views.menu_page, name='menu'),
     path('shopnow/', views.shopnow, name='shopnow'), 
+    path('shopnow/<int:category_id>/products/', views.shopnow_products, name='shopnow_products'),
     path('login/', views.SignInView.as_view(), name='login'),
     path('signup/', views.SignUpView.as_view(), name='signup'),
     path('logout/', views.custom_logout, name='logout'),
@@ -41,6 +43,14 @@ path('product/<int:product_id>/add-review/', views.add_review, name='add_review'
     # SEARCH URLs - THESE ARE CRITICAL
     path('search/', views.search_results, name='search_results'),
     path('api/search/', views.search_ajax, name='search_ajax'),  # This is the API endpoint
+
+    # CATALOG API (read-only, see accounts/api.py)
+    path('api/v1/categories/', api.categories, name='api_categories'),
+    path('api/v1/products/', api.products, name='api_products'),
+    path('api/v1/products/<int:product_id>/', api.product, name='api_product'),
+    path('api/v1/products/<int:product_id>/reviews/', api.product_reviews, name='api_product_reviews'),
+    path('api/v1/changes/', api.changes, name='api_changes'),
+    path('api/v1/stores/nearest/', api.nearest_stores, name='api_nearest_stores'),
     
     # PASSWORD RESET
     path('password-reset/', 
@@ -73,5 +83,9 @@ path('password-reset-complete/',
 
 path('debug-cart/', views.debug_cart, name='debug_cart'),
 
+# STAFF TOOLS
+path('staff/profiles/', views.request_profiles, name='request_profiles'),
+path('staff/profiles/<str:name>/', views.request_profile_download, name='request_profile_download'),
+
 ]
 
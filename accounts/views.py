@@ -5,45 +5,44 @@ from django.contrib.auth.models import User
 from django.urls import reverse, reverse_lazy
 from django.contrib import messages
 from django.shortcuts import render, redirect, get_object_or_404
-from django.core.mail import send_mail, EmailMessage
 from django.conf import settings
-from django.contrib.auth.tokens import default_token_generator
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-from django.utils.encoding import force_bytes
-from django.contrib.auth import login, authenticate, logout
+from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.core.cache import cache
 from django.db.models import Q
-from django.views.decorators.http import require_POST
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_POST, require_safe
+import hashlib
 import json
-from .models import Category, Product
+
+# Mail and token helpers are imported inside the views that use them, to keep
+# this module cheap to import (`manage.py startup_report` shows the cost).
 
 # ===== LOCAL IMPORTS =====
+from .api import catalog_etag
+from .catalog import CATALOG_CACHE_TIMEOUT, catalog_key, shop_categories, shop_page
 from .forms import SignUpForm, ReviewForm, EnquiryForm
-from .models import Category, Product, ProductReview
+from .models import Enquiry, Product, ProductReview, with_review_stats
+from .pricing import cart_products, price_cart
+from .recommendations import recommendations_for
+from .stores import store_index
+from .profiling import get_profile_path, list_profiles, profile_as_text
+
+
+# Product images on shopnow loaded eagerly (the first row); the rest are lazy.
+SHOP_EAGER_IMAGES = 3
 
 
 # ===== AUTHENTICATION VIEWS =====
 class SignInView(LoginView):
+    # AuthenticationForm has already checked the password (the expensive
+    # part of a login) and rejected inactive accounts by the time
+    # LoginView.form_valid logs form.get_user() in. Authenticating again
+    # here would hash the password a second time.
     template_name = 'login.html'
-    
-    def form_valid(self, form):
-        username = form.cleaned_data.get('username')
-        password = form.cleaned_data.get('password')
-        user = authenticate(username=username, password=password)
-        
-        if user is not None:
-            if user.is_active:
-                login(self.request, user)
-                return redirect(self.get_success_url())
-            else:
-                messages.error(
-                    self.request,
-                    'Your account is not active. Please check your email for the verification link.'
-                )
-                return self.form_invalid(form)
-        else:
-            return self.form_invalid(form)
 
 
 class SignUpView(CreateView):
@@ -57,6 +56,11 @@ class SignUpView(CreateView):
         user.save()
         
         # Send verification email
+        from django.contrib.auth.tokens import default_token_generator
+        from django.core.mail import send_mail
+        from django.utils.encoding import force_bytes
+        from django.utils.http import urlsafe_base64_encode
+
         try:
             token = default_token_generator.make_token(user)
             uid = urlsafe_base64_encode(force_bytes(user.pk))
@@ -103,6 +107,9 @@ WENDY WOO Team
 
 
 def verify_email(request, uidb64, token):
+    from django.contrib.auth.tokens import default_token_generator
+    from django.utils.http import urlsafe_base64_decode
+
     try:
         uid = urlsafe_base64_decode(uidb64).decode()
         user = User.objects.get(pk=uid)
@@ -129,6 +136,11 @@ def custom_logout(request):
 # ===== PASSWORD RESET =====
 def forgot_password(request):
     if request.method == 'POST':
+        from django.contrib.auth.tokens import default_token_generator
+        from django.core.mail import send_mail
+        from django.utils.encoding import force_bytes
+        from django.utils.http import urlsafe_base64_encode
+
         email = request.POST.get('email')
         try:
             user = User.objects.get(email=email)
@@ -217,51 +229,33 @@ def add_to_cart(request, product_id):
 
 
 def update_cart_summary(request):
-    cart = request.session.get('cart', {})
-    total_items = 0
-    total_price = 0
-    for pid, qty in cart.items():
-        try:
-            product = Product.objects.get(id=int(pid))
-            total_items += qty
-            total_price += product.price * qty
-        except Product.DoesNotExist:
-            continue
-    request.session['cart_count'] = total_items
-    request.session['cart_total'] = total_price
+    pricing = price_cart(request.session.get('cart', {}))
+    request.session['cart_count'] = pricing['total_items']
+    request.session['cart_total'] = pricing['total']
     request.session.modified = True
 
 
 # ===== CART API VIEWS =====
 def get_cart_data(request):
     try:
-        cart = request.session.get('cart', {})
-        
-        total_items = 0
-        total_price = 0
-        cart_items = []
-        
-        for product_id, quantity in cart.items():
-            try:
-                product = Product.objects.get(id=int(product_id))
-                item_total = product.price * quantity
-                total_items += quantity
-                total_price += item_total
-                
-                cart_items.append({
-                    'id': product_id,
-                    'name': product.name,
-                    'price': float(product.price),
-                    'quantity': quantity,
-                    'total_price': float(item_total)
-                })
-            except (Product.DoesNotExist, ValueError):
-                continue
+        pricing = price_cart(request.session.get('cart', {}))
+        cart_items = [{
+            'id': str(line['product'].id),
+            'name': line['product'].name,
+            'price': float(line['unit_price']),
+            'quantity': line['quantity'],
+            'subtotal': float(line['subtotal']),
+            'discount': float(line['discount']),
+            'promotion': line['promotion'],
+            'total_price': float(line['item_total'])
+        } for line in pricing['lines']]
         
         return JsonResponse({
             'success': True,
-            'total_items': total_items,
-            'total_price': float(total_price),
+            'total_items': pricing['total_items'],
+            'subtotal': float(pricing['subtotal']),
+            'discount': float(pricing['discount']),
+            'total_price': float(pricing['total']),
             'items': cart_items
         })
     except Exception as e:
@@ -327,32 +321,6 @@ def remove_cart_item(request):
         return JsonResponse({'success': False, 'error': str(e)})
 
 
-# ===== CONTEXT PROCESSOR =====
-def cart_context(request):
-    cart_count = request.session.get('cart_count', 0)
-    cart_total = request.session.get('cart_total', 0)
-    cart = request.session.get('cart', {})
-    
-    cart_items = []
-    
-    for product_id, quantity in cart.items():
-        try:
-            product = Product.objects.get(id=int(product_id))
-            cart_items.append({
-                'product': product,
-                'quantity': quantity,
-                'total_price': product.price * quantity
-            })
-        except (Product.DoesNotExist, ValueError):
-            continue
-    
-    return {
-        'cart_items_count': cart_count,
-        'cart_total': cart_total,
-        'cart_items': cart_items,
-    }
-
-
 # ===== CHECKOUT VIEWS =====
 # ===== CHECKOUT VIEWS =====
 def checkout(request):
@@ -382,60 +350,24 @@ def check_auth(request):
 @login_required
 def payment_page(request):
     """Payment confirmation page for authenticated users"""
-    cart = request.session.get('cart', {})
-    
-    total_items = 0
-    total_price = 0
-    cart_items = []
-    
-    for product_id, quantity in cart.items():
-        try:
-            product = Product.objects.get(id=int(product_id))
-            item_total = product.price * quantity
-            total_items += quantity
-            total_price += item_total
-            
-            cart_items.append({
-                'product': product,
-                'quantity': quantity,
-                'total_price': item_total
-            })
-        except Product.DoesNotExist:
-            continue
-    
+    pricing = price_cart(request.session.get('cart', {}))
     context = {
-        'cart_items': cart_items,
-        'total_items': total_items,
-        'total_price': total_price,
+        'cart_items': pricing['lines'],
+        'total_items': pricing['total_items'],
+        'subtotal': pricing['subtotal'],
+        'discount': pricing['discount'],
+        'total_price': pricing['total'],
     }
     
     return render(request, 'checkout/payment.html', context)
 
 
 def cart_page(request):
-    cart = request.session.get('cart', {})
-    cart_items = []
-    total_items = 0
-    total_price = 0
-
-    for product_id, quantity in cart.items():
-        try:
-            product = Product.objects.get(id=int(product_id))
-            item_total = product.price * quantity
-            cart_items.append({
-                'product': product,
-                'quantity': quantity,
-                'item_total': item_total,
-            })
-            total_items += quantity
-            total_price += item_total
-        except Product.DoesNotExist:
-            continue
-
+    pricing = price_cart(request.session.get('cart', {}))
     return render(request, 'cart_page.html', {
-        'cart_items': cart_items,
-        'cart_items_count': total_items,
-        'cart_total': total_price,
+        'cart_items': pricing['lines'],
+        'cart_items_count': pricing['total_items'],
+        'cart_total': pricing['total'],
     })
 
 # ===== PAGE VIEWS =====
@@ -447,26 +379,67 @@ def menu_page(request):
     return render(request, 'menu.html')
 
 
+def shop_next_url(category_id, products, more):
+    if not more:
+        return None
+    return f"{reverse('shopnow_products', args=[category_id])}?after={products[-1].id}"
+
+
 def shopnow(request):
-    categories = Category.objects.prefetch_related('product_set').all()
+    # Only the first tab's first page is rendered here, so the page stays
+    # the same size however big the catalog gets. The rest arrives through
+    # shopnow_products as the visitor opens tabs and scrolls.
+    categories = shop_categories()
+    first_page = None
+    if categories:
+        products, more = shop_page(categories[0].id)
+        first_page = {'products': products, 'next_url': shop_next_url(categories[0].id, products, more)}
     return render(request, 'shopnow.html', {
-        'categories': categories
+        'categories': categories,
+        'first_page': first_page,
+        'eager_images': SHOP_EAGER_IMAGES,
     })
 
 
+@require_safe
+@condition(etag_func=catalog_etag)
+def shopnow_products(request, category_id):
+    """The next page of product cards for a shopnow tab, as an HTML fragment."""
+    if category_id not in {category.id for category in shop_categories()}:
+        raise Http404('No such category')
+    try:
+        after = int(request.GET['after']) if request.GET.get('after') else None
+    except ValueError:
+        return HttpResponse('after must be a whole number', status=400, content_type='text/plain')
+    products, more = shop_page(category_id, after)
+    # No request context: the cards are the same for everyone, so the
+    # session is never loaded and the response can be cached publicly.
+    html = render_to_string('shopnow_products.html', {
+        'products': products,
+        'next_url': shop_next_url(category_id, products, more),
+        'eager_images': 0,
+    })
+    response = HttpResponse(html)
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
 def location(request):
-    return render(request, 'location.html')
+    # From the in-memory store index: no queries once it is built.
+    stores = sorted(store_index().stores, key=lambda store: store['name'])
+    return render(request, 'location.html', {'stores': stores})
 
 
 # ===== PRODUCT VIEWS =====
 def product_detail(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
-    reviews = product.reviews.all()
+    product = get_object_or_404(with_review_stats(Product.objects.select_related('category')), id=product_id)
+    reviews = product.reviews.select_related('user')
     
     context = {
         'product': product,
         'reviews': reviews,
         'review_form': ReviewForm(),
+        'recommendations': recommendations_for(product),
     }
     return render(request, 'product_detail.html', context)
 
@@ -508,103 +481,45 @@ def search_ajax(request):
     results = []
     
     if query:
-        products = Product.objects.filter(
-            Q(name__icontains=query) | 
-            Q(description__icontains=query)
-        )[:5]
-        
-        results = [
-            {
-                'id': product.id,
-                'name': product.name,
-                'price': f"¥{product.price}",
-                'url': product.get_absolute_url()
-            }
-            for product in products
-        ]
+        # Shared by every worker until the catalog changes.
+        key = catalog_key('search:' + hashlib.sha1(query.encode()).hexdigest())
+        results = cache.get(key)
+        if results is None:
+            products = Product.objects.filter(
+                Q(name__icontains=query) | 
+                Q(description__icontains=query)
+            )[:5]
+            
+            results = [
+                {
+                    'id': product.id,
+                    'name': product.name,
+                    'price': f"¥{product.price}",
+                    'url': product.get_absolute_url()
+                }
+                for product in products
+            ]
+            cache.set(key, results, CATALOG_CACHE_TIMEOUT)
     
     return JsonResponse({'results': results})
 
 
 # ===== ENQUIRIES =====
 def enquiries(request):
-    INQUIRY_TYPES = [
-        ('', 'Please select one'),
-        ('orders', 'Orders'),
-        ('product_ingredients', 'Product Ingredients'),
-        ('others', 'Others'),
-    ]
-    
     if request.method == 'POST':
         form = EnquiryForm(request.POST, request.FILES)
         
         if form.is_valid():
-            inquiry_type = form.cleaned_data['inquiry_type']
-            name = form.cleaned_data['name']
-            email = form.cleaned_data['email']
-            message = form.cleaned_data['message']
-            photo = form.cleaned_data.get('photo')
-            
-            from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'utm2577239@stu.o-hara.ac.jp')
-            inquiry_type_display = dict(INQUIRY_TYPES).get(inquiry_type, inquiry_type)
-            
-            try:
-                # Send confirmation email to user
-                send_mail(
-                    subject="Thank you for your enquiry - WENDY WOO",
-                    message=f"""Dear {name},
-
-Thank you for contacting WENDY WOO. We have received your enquiry regarding {inquiry_type_display}.
-
-We will get back to you within 24-48 hours.
-
-Your message:
-{message}
-
-Best regards,
-WENDY WOO Team""",
-                    from_email=from_email,
-                    recipient_list=[email],
-                    fail_silently=False,
-                )
-                
-                # Send email to admin with photo attachment
-                admin_subject = f"ENQUIRY WITH PHOTO - {inquiry_type_display}" if photo else f"Enquiry - {inquiry_type_display}"
-                
-                admin_email = EmailMessage(
-                    subject=admin_subject,
-                    body=f"""
-NEW ENQUIRY RECEIVED
-
-Inquiry Type: {inquiry_type_display}
-Name: {name}
-Email: {email}
-Photo Attached: {'YES' if photo else 'No'}
-
-Message:
-{message}
-
----
-Sent from WENDY WOO Contact Form
-""",
-                    from_email=from_email,
-                    to=[from_email],
-                )
-                
-                # Attach photo if available
-                if photo:
-                    try:
-                        photo_content = photo.read()
-                        admin_email.attach(photo.name, photo_content, photo.content_type)
-                    except Exception as e:
-                        print(f"Photo attachment error: {e}")
-                
-                admin_email.send(fail_silently=False)
-                
-                return redirect('enquiry_success')
-                
-            except Exception as e:
-                messages.error(request, 'There was an error sending your enquiry. Please try again.')
+            # Saved only: the confirmation and the staff digest are sent in
+            # batches by `manage.py send_enquiry_mail` (accounts/enquiries.py).
+            Enquiry.objects.create(
+                inquiry_type=form.cleaned_data['inquiry_type'],
+                name=form.cleaned_data['name'],
+                email=form.cleaned_data['email'],
+                message=form.cleaned_data['message'],
+                photo=form.cleaned_data.get('photo'),
+            )
+            return redirect('enquiry_success')
         else:
             messages.error(request, 'Please correct the errors below.')
     
@@ -629,11 +544,28 @@ def debug_cart(request):
     print(f"Cart count: {cart_count}")
     print(f"Cart total: {cart_total}")
     
+    products = cart_products(cart)
     for product_id in cart.keys():
-        try:
-            product = Product.objects.get(id=int(product_id))
+        product = products.get(product_id)
+        if product is not None:
             print(f"Product {product_id}: {product.name} - exists")
-        except Product.DoesNotExist:
+        else:
             print(f"Product {product_id}: DOES NOT EXIST")
     
-    return redirect('shopnow')
\ No newline at end of file
+    return redirect('shopnow')
+
+
+# ===== STAFF TOOLS =====
+@staff_member_required
+def request_profiles(request):
+    return render(request, 'request_profiles.html', {'profiles': list_profiles()[:50]})
+
+
+@staff_member_required
+def request_profile_download(request, name):
+    path = get_profile_path(name)
+    if path is None:
+        raise Http404('Profile not found')
+    if request.GET.get('format') == 'txt':
+        return HttpResponse(profile_as_text(path), content_type='text/plain; charset=utf-8')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
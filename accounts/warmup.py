@@ -0,0 +1,73 @@
+# accounts/warmup.py
+"""Work done once per worker before it takes traffic, so first requests aren't slow."""
+import logging
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.db import DatabaseError, connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def template_root():
+    return Path(apps.get_app_config('accounts').path) / 'templates'
+
+
+def project_template_names():
+    """Every template shipped in accounts/templates, base.html first."""
+    root = template_root()
+    names = sorted(p.relative_to(root).as_posix() for p in root.rglob('*.html'))
+    if 'base.html' in names:
+        names.remove('base.html')
+        names.insert(0, 'base.html')
+    return names
+
+
+def warm_templates():
+    """Compile the templates into the cached loader. Returns (compiled names, failures)."""
+    compiled, failed = [], {}
+    for name in project_template_names():
+        try:
+            get_template(name)
+        except (TemplateDoesNotExist, TemplateSyntaxError) as e:
+            failed[name] = str(e)
+        else:
+            compiled.append(name)
+    return compiled, failed
+
+
+def prime_catalog():
+    from .catalog import shop_categories, shop_page
+
+    try:
+        categories = shop_categories()
+        if categories:
+            shop_page(categories[0].id)  # the products shopnow renders
+        return len(categories)
+    except DatabaseError as e:  # e.g. database not migrated yet
+        logger.warning('Catalog cache not primed: %s', e)
+        return None
+    finally:
+        # Never hand an open connection to forked workers.
+        connections.close_all()
+
+
+def load_urlconf():
+    """Import the URLconf and with it every view module. Returns the number of URL patterns."""
+    return len(get_resolver().url_patterns)
+
+
+def warm_up(prime=True):
+    start = time.perf_counter()
+    load_urlconf()
+    compiled, failed = warm_templates()
+    for name, error in failed.items():
+        logger.warning('Template %s failed to compile: %s', name, error)
+    categories = prime_catalog() if prime else None
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.info('Warm-up: %d templates, %s categories cached in %.0f ms', len(compiled), categories, elapsed_ms)
+    return {'templates': compiled, 'failed': failed, 'categories': categories, 'elapsed_ms': elapsed_ms}
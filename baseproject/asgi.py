@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'baseproject.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after setup: sends 103 Early Hints where the server supports them.
+from accounts.hints import EarlyHintsMiddleware  # noqa: E402
+
+application = EarlyHintsMiddleware(django_application)
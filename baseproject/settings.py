@@ -6,6 +6,8 @@ WENDY WOO BAKERY - DEPLOYMENT VERSION
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -59,25 +61,73 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # ← MOVED HERE
+    'accounts.hints.PreloadMiddleware',  # ← Link: rel=preload for the page's CSS/JS
+    'accounts.snapshots.SnapshotMiddleware',  # ← before sessions: anonymous pages come off disk
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'accounts.throttling.ThrottleMiddleware',  # ← before CSRF: rejected bots count too
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'accounts.profiling.RequestProfilerMiddleware',  # ← after auth: needs request.user
 ]
 
 STATIC_ROOT = BASE_DIR / "staticfiles"
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# STATICFILES_STORAGE was removed in Django 5.1, so storages go through STORAGES.
+# collectstatic builds the ASSET_BUNDLES below, hashes every file name and
+# writes .gz/.br copies; WhiteNoise then serves hashed names as immutable.
+STORAGES = {
+    'default': {
+        'BACKEND': 'accounts.storage.HashedMediaStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'accounts.storage.BundledManifestStaticFilesStorage',
+    },
+}
+
+# ===== ASSET BUNDLES =====
+# One minified CSS file per page group (base.css + the page's own sheet) and
+# one site script. Rendered with {% css_bundle %} / {% js_bundle %}.
+ASSET_BUNDLES = {
+    'base': {'css': ['base.css'], 'js': ['script.js']},
+    'main': {'css': ['base.css', 'Main/main.css']},
+    'menu': {'css': ['base.css', 'Menu/menu.css']},
+    'shopnow': {'css': ['base.css', 'shopnow.css']},
+    'product_detail': {'css': ['base.css', 'product_detail.css']},
+    'cart_page': {'css': ['base.css', 'cart_page.css']},
+    'checkout': {'css': ['base.css', 'checkout.css']},
+    'location': {'css': ['base.css', 'location.css']},
+    'enquiries': {'css': ['base.css', 'enquiries.css']},
+    'enquiry_success': {'css': ['base.css', 'enquiry_success.css']},
+    'login': {'css': ['base.css', 'login.css']},
+    'signup': {'css': ['base.css', 'signup.css']},
+    'forgot_password': {'css': ['base.css', 'forgot_password.css']},
+    'password_reset': {'css': ['base.css', 'password_reset.css']},
+    'profile': {'css': ['base.css', 'profile.css']},
+}
+
+# Offline-capable service worker at /sw.js (accounts/serviceworker.py),
+# registered by base.html once collectstatic has run.
+SERVICE_WORKER_ENABLED = os.environ.get('SERVICE_WORKER_ENABLED', '1') == '1'
 
 ROOT_URLCONF = 'baseproject.urls'
 
+# Templates are only looked up in the app template directories (accounts/templates
+# included) through an explicit cached loader: each template is read and compiled
+# once per process, and baseproject/wsgi.py compiles all of them at boot.
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [BASE_DIR / 'accounts' / 'templates'],
-        'APP_DIRS': True,
+        'DIRS': [],
+        'APP_DIRS': False,
         'OPTIONS': {
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
@@ -101,6 +151,35 @@ DATABASES = {
     }
 }
 
+# ===== CACHE =====
+# One SQLite file (WAL mode) shared by every gunicorn worker on the box, so
+# the catalog cache, throttle counters and sessions are warm in all of them
+# and an invalidation in one worker is seen by the rest. No cache server
+# needed; see accounts/sqlite_cache.py. MAX_SIZE is in bytes.
+CACHES = {
+    'default': {
+        'BACKEND': 'accounts.sqlite_cache.SQLiteCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', BASE_DIR / 'cache.sqlite3'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '20000')),
+            'MAX_SIZE': int(os.environ.get('CACHE_MAX_SIZE', str(256 * 1024 * 1024))),
+        },
+    },
+}
+# Sessions are read from the shared cache and written through to the database.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+# `manage.py test` uses a throwaway cache file instead of the one above.
+TEST_RUNNER = 'accounts.testrunner.IsolatedTestRunner'
+
+# ===== MAINTENANCE =====
+# `manage.py purge_stale` (nightly) deletes expired sessions and, in
+# seconds: anonymous carts untouched this long, never-verified signups this
+# old, and change log entries this old (accounts/maintenance.py).
+ABANDONED_CART_AGE = 7 * 24 * 60 * 60
+UNVERIFIED_SIGNUP_AGE = 7 * 24 * 60 * 60
+CATALOG_CHANGES_RETENTION = 30 * 24 * 60 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -120,6 +199,35 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# ===== PASSWORD HASHING =====
+# The first hasher of the profile hashes new passwords; the others only
+# verify existing hashes. On a successful login, a password stored with
+# another hasher (or older parameters) is rehashed with the first one, so
+# switching profiles upgrades users as they sign in. Compare the CPU cost
+# per login of each profile with `manage.py benchmark_login`.
+_KNOWN_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',  # needs argon2-cffi
+]
+PASSWORD_HASHER_PROFILES = {
+    # Django's default: PBKDF2-SHA256, 1,000,000 iterations.
+    'pbkdf2': _KNOWN_HASHERS,
+    # Memory-hard, and about half the CPU per login of PBKDF2; stdlib only.
+    'scrypt': ['django.contrib.auth.hashers.ScryptPasswordHasher', *_KNOWN_HASHERS],
+    # The OWASP first choice; requires `pip install argon2-cffi`.
+    'argon2': ['django.contrib.auth.hashers.Argon2PasswordHasher', *_KNOWN_HASHERS],
+}
+PASSWORD_HASHER_PROFILE = os.environ.get('PASSWORD_HASHER_PROFILE', 'pbkdf2')
+if PASSWORD_HASHER_PROFILE not in PASSWORD_HASHER_PROFILES:
+    raise ImproperlyConfigured(
+        f'PASSWORD_HASHER_PROFILE={PASSWORD_HASHER_PROFILE!r} is not one of '
+        f'{", ".join(PASSWORD_HASHER_PROFILES)}.'
+    )
+# accounts/checks.py stops manage.py commands if the profile's library is missing.
+PASSWORD_HASHERS = list(dict.fromkeys(PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -156,10 +264,83 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = 'utm2577239@stu.o-hara.ac.jp'
 EMAIL_HOST_PASSWORD = '5098@Nino'  # Your actual Outlook password
 DEFAULT_FROM_EMAIL = 'utm2577239@stu.o-hara.ac.jp'
+# Enquiry mail is sent in batches by `manage.py send_enquiry_mail` (cron:
+# every minute; with --digest hourly). The digest goes to these addresses
+# (DEFAULT_FROM_EMAIL when empty) and links to the inbox under SITE_URL.
+ENQUIRY_DIGEST_RECIPIENTS = [
+    address for address in os.environ.get('ENQUIRY_DIGEST_RECIPIENTS', '').split(',') if address
+]
+SITE_URL = os.environ.get('SITE_URL', '')
 
 
 # ===== MEDIA FILES CONFIGURATION =====
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-
-LOGIN_REDIRECT_URL = 'main'
\ No newline at end of file
+# Uploads get content-hashed names (accounts.storage.HashedMediaStorage) and are
+# cached for a year; anything else is revalidated after MEDIA_MAX_AGE seconds.
+MEDIA_MAX_AGE = 60 * 60
+# Behind nginx, set this to an `internal` location aliased to MEDIA_ROOT (see
+# deploy/nginx.conf) so nginx streams the bytes instead of a Python worker.
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '')
+
+LOGIN_REDIRECT_URL = 'main'
+
+# ===== REQUEST PROFILING =====
+# Staff can profile a single request with ?__profile=1 or an X-Profile header;
+# set PROFILER_SAMPLE_RATE (0.0-1.0) to also profile a random share of traffic.
+PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', '0'))
+PROFILER_DIR = BASE_DIR / 'profiles'
+PROFILER_KEEP = 50  # newest .prof files kept on disk
+
+# ===== PRELOAD AND EARLY HINTS =====
+# HTML responses carry a Link header preloading the page's CSS/JS bundles
+# and logo, and preconnecting to these origins (with crossorigin for the
+# ones fetched through CORS, like web fonts). Under an ASGI server with the
+# early hint extension, the same links go out in a 103 response before the
+# view runs (accounts/hints.py).
+PRECONNECT_ORIGINS = [
+    ('https://fonts.googleapis.com', False),
+    ('https://fonts.gstatic.com', True),
+    ('https://cdnjs.cloudflare.com', False),
+]
+EARLY_HINTS_ENABLED = os.environ.get('EARLY_HINTS_ENABLED', '1') == '1'
+
+# ===== STATIC SNAPSHOTS =====
+# Visitors without a session get main/menu/location/shopnow/product pages
+# as pre-rendered, precompressed files (accounts/snapshots.py). Pages are
+# written on first view after each catalog change, or all at once with
+# `manage.py render_snapshot`.
+SNAPSHOTS_ENABLED = os.environ.get('SNAPSHOTS_ENABLED', '1') == '1'
+SNAPSHOT_ROOT = os.environ.get('SNAPSHOT_ROOT', BASE_DIR / 'snapshots')
+# Set per deploy (e.g. the git commit) so snapshots from older code are
+# never served. Unset, the templates and app source are hashed at startup.
+RELEASE_ID = os.environ.get('RELEASE_ID', '')
+
+# ===== THROTTLING =====
+# Requests allowed per client IP and per signed-in user, by URL name
+# ("N/s", "N/m", "N/h", "N/d", or e.g. "N/15m"). A rule counts every method
+# unless `methods` limits it (HEAD counts wherever GET does), so the login
+# and contact forms still load freely. A `user`
+# rule reads the session, so it only goes on views that load it anyway.
+THROTTLE_ENABLED = os.environ.get('THROTTLE_ENABLED', '1') == '1'
+THROTTLE_CACHE = 'default'
+# Number of reverse proxies in front of Django that append to X-Forwarded-For.
+# The site runs behind one (Render's, or deploy/nginx.conf); with 0 every
+# visitor would share the proxy's address and its bucket. Set 0 only where
+# clients reach gunicorn directly, or they could pick their own address.
+THROTTLE_PROXY_COUNT = int(os.environ.get('THROTTLE_PROXY_COUNT', '1'))
+THROTTLE_RATES = {
+    'search_ajax': {'ip': '120/m'},
+    'shopnow_products': {'ip': '300/m'},
+    'api_categories': {'ip': '300/m'},
+    'api_products': {'ip': '300/m'},
+    'api_product': {'ip': '300/m'},
+    'api_product_reviews': {'ip': '300/m'},
+    'api_changes': {'ip': '300/m'},
+    'api_nearest_stores': {'ip': '120/m'},
+    'update_cart_item': {'ip': '120/m', 'user': '60/m'},
+    'login': {'ip': '10/m', 'methods': ['POST']},
+    'signup': {'ip': '5/15m', 'methods': ['POST']},
+    'forgot_password': {'ip': '5/h', 'methods': ['POST']},
+    'enquiries': {'ip': '5/h', 'user': '5/h', 'methods': ['POST']},
+}
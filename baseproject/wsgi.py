@@ -9,4 +9,11 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'baseproject.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Compile every template and fill the catalog cache before the first request
+# (set WARMUP_ON_BOOT=0 to skip).
+if os.environ.get('WARMUP_ON_BOOT', '1') == '1':
+    from accounts.warmup import warm_up
+
+    warm_up()
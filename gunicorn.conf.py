@@ -0,0 +1,90 @@
+# gunicorn.conf.py
+"""
+Production gunicorn settings. gunicorn reads this file automatically when
+started from the project root:
+
+    gunicorn baseproject.wsgi:application
+
+Every setting can be overridden from the environment (Render sets PORT):
+
+    WEB_CONCURRENCY          number of workers (default: 2 x CPUs + 1, capped at 8)
+    GUNICORN_WORKER_CLASS    sync (default), gthread, or uvicorn
+    GUNICORN_THREADS         threads per gthread worker (default 4)
+    GUNICORN_PRELOAD         1 (default) to import Django once in the master
+    GUNICORN_MAX_REQUESTS    recycle a worker after this many requests (0 = never)
+    GUNICORN_MAX_REQUESTS_JITTER, GUNICORN_TIMEOUT, GUNICORN_KEEPALIVE, GUNICORN_BIND
+
+`manage.py measure_boot` starts gunicorn with this file and reports the
+cold start time and the memory of every worker.
+"""
+import gc
+import os
+import random
+
+
+def env_int(name, default):
+    value = os.environ.get(name, '')
+    return int(value) if value.strip() else default
+
+
+def default_workers(cpus=None):
+    cpus = cpus or os.cpu_count() or 1
+    return min(2 * cpus + 1, 8)
+
+
+bind = os.environ.get('GUNICORN_BIND') or f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = env_int('WEB_CONCURRENCY', default_workers())
+
+# sync suits the current views (short, DB-bound). gthread lets one worker
+# overlap slow clients and SMTP calls; uvicorn runs the ASGI application and
+# needs `pip install uvicorn`, which is not in requirements.txt.
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'uvicorn': 'uvicorn.workers.UvicornWorker',
+}
+worker_class = WORKER_CLASSES[os.environ.get('GUNICORN_WORKER_CLASS', 'sync')]
+threads = env_int('GUNICORN_THREADS', 4) if worker_class == 'gthread' else 1
+if worker_class == WORKER_CLASSES['uvicorn']:
+    wsgi_app = 'baseproject.asgi:application'
+else:
+    wsgi_app = 'baseproject.wsgi:application'
+
+# Import Django, compile templates and prime the catalog cache once in the
+# master (baseproject/wsgi.py does the warm-up); workers share those pages
+# copy-on-write instead of each repeating the work.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Recycling bounds slow memory growth; the jitter stops all workers from
+# restarting at the same moment.
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10)
+
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+# Heartbeat files on tmpfs, so a slow disk can't get workers killed.
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-') or None  # empty: no access log
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+# ===== SERVER HOOKS =====
+def when_ready(server):
+    if preload_app:
+        # Move everything loaded so far out of the collector's reach: the
+        # cyclic GC would otherwise write to those objects in every worker
+        # and un-share their pages.
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    # Connections and random state inherited from the master must not be
+    # shared between workers. Without preload Django isn't loaded yet.
+    random.seed()
+    if preload_app:
+        from django.db import connections
+
+        connections.close_all()
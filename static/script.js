@@ -17,6 +17,8 @@ console.log('🚀 Starting full initialization');
     initCartFunctionality(); // This will handle cart initialization
     initHamburgerMenu();
     initCategorySwitcher();
+    initShopLoader();
+    initStoreLocator();
     initProfileDropdown();
     initPasswordToggle();
     
@@ -668,6 +670,106 @@ function initCategorySwitcher() {
     });
 }
 
+// =========================
+// 6b. SHOP PAGE LOADER
+// =========================
+// shopnow.html only contains the first page of the first tab. Every other
+// page is a .shop-more placeholder holding the URL of an HTML fragment,
+// fetched when it comes within a screen of the viewport. Placeholders in
+// hidden tabs never intersect, so a tab loads when it is opened.
+function initShopLoader() {
+    if (!document.querySelector('.shop-more')) return;
+
+    let observer = null;
+
+    function load(sentinel) {
+        if (sentinel.dataset.loading) return;
+        sentinel.dataset.loading = 'true';
+        fetch(sentinel.dataset.url)
+            .then(response => {
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                return response.text();
+            })
+            .then(html => {
+                const grid = sentinel.parentNode;
+                if (observer) observer.unobserve(sentinel);
+                sentinel.remove();
+                grid.insertAdjacentHTML('beforeend', html);
+                grid.querySelectorAll('.shop-more').forEach(watch);
+            })
+            .catch(error => {
+                console.error('Error loading products:', error);
+                delete sentinel.dataset.loading;  // retried when it next scrolls into view
+            });
+    }
+
+    function watch(sentinel) {
+        if (observer) {
+            observer.observe(sentinel);
+        } else {
+            load(sentinel);  // no IntersectionObserver: just load everything
+        }
+    }
+
+    if ('IntersectionObserver' in window) {
+        observer = new IntersectionObserver(entries => {
+            entries.forEach(entry => {
+                if (entry.isIntersecting) load(entry.target);
+            });
+        }, { rootMargin: '100% 0px' });
+    }
+    document.querySelectorAll('.shop-more').forEach(watch);
+}
+
+// =========================
+// 6c. STORE LOCATOR
+// =========================
+// location.html lists every shop by name; with the visitor's permission
+// the list is reordered nearest first by /api/v1/stores/nearest/.
+function initStoreLocator() {
+    const locator = document.querySelector('.store-locator');
+    if (!locator) return;
+    const button = locator.querySelector('.locate-btn');
+    const status = locator.querySelector('.locate-status');
+    const list = locator.querySelector('.store-list');
+
+    if (!navigator.geolocation) {
+        button.hidden = true;
+        return;
+    }
+
+    button.addEventListener('click', function() {
+        status.textContent = 'Finding your location...';
+        navigator.geolocation.getCurrentPosition(position => {
+            const params = new URLSearchParams({
+                lat: position.coords.latitude,
+                lon: position.coords.longitude,
+                limit: list.children.length,
+            });
+            fetch(`${locator.dataset.url}?${params}`)
+                .then(response => {
+                    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                    return response.json();
+                })
+                .then(result => {
+                    result.data.slice().reverse().forEach(store => {
+                        const card = list.querySelector(`[data-store-id="${store.id}"]`);
+                        if (!card) return;
+                        card.querySelector('.store-distance').textContent = `${store.distance_km} km`;
+                        list.prepend(card);
+                    });
+                    status.textContent = 'Nearest shop first.';
+                })
+                .catch(error => {
+                    console.error('Error finding stores:', error);
+                    status.textContent = 'Could not find the nearest shop.';
+                });
+        }, () => {
+            status.textContent = 'Location permission is needed to find the nearest shop.';
+        });
+    });
+}
+
 // =========================
 // 7. PROFILE DROPDOWN
 // =========================